@@ -0,0 +1,54 @@
+"""
+Compara o tempo de Jogo.carregar_mundo com o mapa em JSON (formato do gerador)
+e com o mesmo mapa compilado (mapa_binario.py). Os mapas são gerados com o
+gerador do tabuleiro, um por quantidade de camadas pedida.
+
+Uso: python benchmarks/carga_mapa.py [repetições] [camadas ...]
+"""
+import contextlib
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import mapa_binario
+from engine import Jogo
+from gerador_tabuleiro import Grafo, exportar_mapa_para_json
+
+def _medir(caminho, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        Jogo().carregar_mundo(caminho)
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos)
+
+def main():
+    repeticoes = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    tamanhos = [int(c) for c in sys.argv[2:]] or [4, 8, 16, 32]
+    print(f"Mediana de {repeticoes} cargas por mapa (ms):")
+    print(f"{'Cidades':>8}{'Arestas':>9}{'JSON':>10}{'compilado':>11}{'ganho':>8}{'bytes JSON':>12}{'compilado':>11}")
+    with tempfile.TemporaryDirectory() as diretorio:
+        for tamanho in tamanhos:
+            grafo = Grafo()
+            grafo.gerar_grafo(camadas=[tamanho] * 6, seed=7, num_jogadores=4)
+            caminho_json = os.path.join(diretorio, f"mapa_{tamanho}.json")
+            caminho_binario = os.path.join(diretorio, f"mapa_{tamanho}.mapabin")
+            with contextlib.redirect_stdout(io.StringIO()):  # O exportador avisa no console
+                exportar_mapa_para_json(grafo, caminho_json)
+            mapa_binario.compilar(caminho_json, caminho_binario)
+
+            jogo = Jogo()
+            jogo.carregar_mundo(caminho_binario)
+            tempo_json = _medir(caminho_json, repeticoes)
+            tempo_binario = _medir(caminho_binario, repeticoes)
+            print(f"{len(jogo.mapa.cidades):>8}{len(jogo.mapa.arestas):>9}{tempo_json * 1000:>10.2f}"
+                  f"{tempo_binario * 1000:>11.2f}{tempo_json / tempo_binario:>7.1f}x"
+                  f"{os.path.getsize(caminho_json):>12}{os.path.getsize(caminho_binario):>11}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""
+Mede quantas partidas por segundo o torneio (src/torneio.py) roda com 1, 2, 4, ...
+processos, até o número de núcleos da máquina, sempre com a mesma matriz de partidas.
+
+Uso: python benchmarks/escala_torneio.py [sementes] [mapa]
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import torneio
+from ias.ia_perseus import Perseus
+
+def main():
+    sementes = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    mapa = sys.argv[2] if len(sys.argv) > 2 else os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'mapa_debug.json')
+    participantes = [(f"Perseus#{i + 1}", Perseus) for i in range(torneio.numero_de_jogadores(mapa))]
+    partidas = torneio.montar_partidas([mapa], participantes, range(sementes))
+
+    processos, contagens = 1, []
+    while processos < (os.cpu_count() or 1):
+        contagens.append(processos)
+        processos *= 2
+    contagens.append(os.cpu_count() or 1)
+
+    print(f"{len(partidas)} partidas por rodada:")
+    print(f"{'Processos':>10}{'partidas/s':>12}{'aceleração':>12}")
+    base = None
+    for processos in contagens:
+        _, duracao = torneio.rodar_torneio(partidas, processos)
+        taxa = len(partidas) / duracao
+        base = base or taxa
+        print(f"{processos:>10}{taxa:>12.1f}{taxa / base:>11.2f}x")
+
+if __name__ == "__main__":
+    main()
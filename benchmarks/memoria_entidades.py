@@ -0,0 +1,99 @@
+"""
+Mede a memória ocupada por unidade (Tropa, Transporte, Cidade e Aresta) na
+representação atual da engine (__slots__, deques e Comando) e na representação
+antiga (objetos com __dict__, listas e comandos em dicionários).
+
+Uso: python benchmarks/memoria_entidades.py [quantidade]
+"""
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from comandos import Comando, MOVER, ATACAR, PERMANECER
+from engine import Aresta, Cidade, Jogador, Transporte, Tropa
+
+CAMINHO = ['c1_0', 'c2_0', 'c3_0', 'c4_0', 'c5_0']
+
+# Representação anterior, reproduzida aqui apenas para comparação
+class CidadeAntiga:
+    def __init__(self, id, populacao):
+        self.id = id
+        self.populacao = populacao
+        self.dono = None
+        self.tropas_estacionadas = []
+
+class TropaAntiga:
+    def __init__(self, id, dono, forca, fila_de_comandos=None):
+        self.id = id
+        self.dono = dono
+        self.forca = forca
+        self.localizacao = dono.id_base
+        self.fila_de_comandos = fila_de_comandos if fila_de_comandos is not None else []
+        self.estado = 'ociosa'
+        self.caminho_atual = []
+        self.alvo_de_ataque = None
+
+class TransporteAntigo:
+    def __init__(self, dono):
+        self.dono = dono
+        self.localizacao = dono.id_base
+        self.carga_populacao = 0
+        self.fila_de_comandos = []
+        self.estado = 'ocioso'
+        self.quantidade_solicitada = 0
+        self.caminho_atual = []
+        self.timer_respawn = 0
+
+class ArestaAntiga:
+    def __init__(self, cidade1_id, cidade2_id, peso):
+        self.cidades = (cidade1_id, cidade2_id)
+        self.peso = peso
+
+def _tropas_antigas(jogador, n):
+    tropas = []
+    for i in range(n):
+        comandos = [{'tipo': 'MOVER', 'alvo': 'c5_0'}, {'tipo': 'ATACAR', 'alvo': 'c6_0'}, {'tipo': 'PERMANECER'}]
+        tropa = TropaAntiga(f"t{i}", jogador, 10, comandos)
+        tropa.caminho_atual = list(CAMINHO)
+        tropas.append(tropa)
+    return tropas
+
+def _tropas_novas(jogador, n):
+    tropas = []
+    for i in range(n):
+        comandos = [Comando(MOVER, 'c5_0'), Comando(ATACAR, 'c6_0'), Comando(PERMANECER)]
+        tropa = Tropa(f"t{i}", jogador, 10, comandos)
+        tropa.caminho_atual = CAMINHO
+        tropas.append(tropa)
+    return tropas
+
+def _medir(fabrica, n):
+    tracemalloc.start()
+    antes = tracemalloc.take_snapshot()
+    objetos = fabrica(n)
+    depois = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    total = sum(stat.size_diff for stat in depois.compare_to(antes, 'filename'))
+    del objetos
+    return total / n
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    jogador = Jogador('0', 'basej_0')
+    casos = [
+        ("Tropa (3 comandos, caminho de 5)", lambda k: _tropas_antigas(jogador, k), lambda k: _tropas_novas(jogador, k)),
+        ("Transporte", lambda k: [TransporteAntigo(jogador) for _ in range(k)], lambda k: [Transporte(jogador) for _ in range(k)]),
+        ("Cidade", lambda k: [CidadeAntiga(f"c{i}", 100) for i in range(k)], lambda k: [Cidade(f"c{i}", 100) for i in range(k)]),
+        ("Aresta", lambda k: [ArestaAntiga('a', 'b', i) for i in range(k)], lambda k: [Aresta('a', 'b', i) for i in range(k)]),
+    ]
+    print(f"Bytes por unidade ({n} unidades):")
+    print(f"{'Entidade':<35}{'antes':>10}{'depois':>10}{'redução':>10}")
+    for nome, antiga, nova in casos:
+        bytes_antes = _medir(antiga, n)
+        bytes_depois = _medir(nova, n)
+        print(f"{nome:<35}{bytes_antes:>10.0f}{bytes_depois:>10.0f}{1 - bytes_depois / bytes_antes:>10.0%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Compara, por processo trabalhador, a memória própria e o tempo de carga de um mapa
+grande quando cada processo lê o JSON por conta própria e quando o mapa é publicado
+uma vez em memória compartilhada (mapa_compartilhado.py) e os processos se anexam a ele.
+
+A memória própria é a soma de Private_Clean e Private_Dirty de /proc/self/smaps_rollup
+(Linux), medida antes e depois de carregar o mapa e montar um Jogo sobre ele; as
+páginas do bloco compartilhado não entram nessa conta.
+
+Uso: python benchmarks/memoria_mapa_compartilhado.py [processos] [camadas]
+"""
+import contextlib
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import mapa_compartilhado
+from engine import Jogo
+from gerador_tabuleiro import Grafo, exportar_mapa_para_json
+
+def _memoria_propria():
+    """KB de memória privada (não compartilhada) do processo."""
+    total = 0
+    with open("/proc/self/smaps_rollup") as f:
+        for linha in f:
+            if linha.startswith(("Private_Clean:", "Private_Dirty:")):
+                total += int(linha.split()[1])
+    return total
+
+def _carregar(caminho, referencia):
+    antes = _memoria_propria()
+    inicio = time.perf_counter()
+    if referencia is not None:
+        mapa_compartilhado.anexar_mapa(*referencia)
+    jogo = Jogo()
+    jogo.carregar_mundo(caminho)
+    duracao = time.perf_counter() - inicio
+    return _memoria_propria() - antes, duracao, len(jogo.mapa.cidades)
+
+def _medir(caminho, processos, referencia):
+    # Cada processo do pool faz exatamente uma carga (max_tasks_per_child=1)
+    with ProcessPoolExecutor(max_workers=processos, max_tasks_per_child=1) as executor:
+        medidas = list(executor.map(_carregar, [caminho] * processos, [referencia] * processos))
+    memorias = [memoria for memoria, _, _ in medidas]
+    return statistics.median(memorias), sum(memorias), statistics.median(d for _, d, _ in medidas), medidas[0][2]
+
+def main():
+    processos = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    camadas = int(sys.argv[2]) if len(sys.argv) > 2 else 512
+    with tempfile.TemporaryDirectory() as diretorio:
+        grafo = Grafo()
+        grafo.gerar_grafo(camadas=[camadas] * 6, seed=7, num_jogadores=4)
+        caminho = os.path.join(diretorio, "mapa.json")
+        with contextlib.redirect_stdout(io.StringIO()):  # O exportador avisa no console
+            exportar_mapa_para_json(grafo, caminho)
+
+        por_arquivo = _medir(caminho, processos, None)
+        inicio = time.perf_counter()
+        with mapa_compartilhado.publicar_mapa(caminho) as publicado:
+            publicacao = time.perf_counter() - inicio
+            compartilhado = _medir(caminho, processos, publicado.referencia())
+
+    print(f"Mapa com {por_arquivo[3]} cidades, {processos} processos "
+          f"(bloco compartilhado: {publicado.tamanho / 1024:.0f} KB, publicado em {publicacao * 1000:.0f} ms)")
+    print(f"{'':<26}{'KB/processo':>12}{'KB no total':>13}{'carga (ms)':>12}")
+    for nome, (memoria, total, duracao, _) in (("cada um lê o JSON", por_arquivo),
+                                                ("memória compartilhada", compartilhado)):
+        print(f"{nome:<26}{memoria:>12.0f}{total:>13.0f}{duracao * 1000:>12.1f}")
+    print(f"Economia por processo: {por_arquivo[0] - compartilhado[0]:.0f} KB "
+          f"({1 - compartilhado[0] / por_arquivo[0]:.0%})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Compara o custo de preparar e encerrar as IAs a cada partida de uma sequência:
+criadas no processo do simulador, em processos novos a cada partida (sandbox.IAIsolada)
+e em processos reaproveitados entre as partidas (sandbox.PoolDeIAs).
+
+A IA do teste imita uma IA com pré-processamento caro: um "livro de aberturas" que
+não depende do mapa, montado na criação, e uma tabela de distâncias a partir da base,
+que depende do mapa. Com o pool, nova_partida guarda o livro e só refaz a tabela
+quando o mapa muda.
+
+Uso: python benchmarks/pool_de_ias.py [partidas] [mapa]
+"""
+import contextlib
+import hashlib
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from ias.ia_perseus import Perseus
+from sandbox import PoolDeIAs
+from simulador import Simulador
+
+def _livro_de_aberturas():
+    livro = {}
+    for i in range(60000):
+        livro[i] = hashlib.sha256(str(i).encode()).hexdigest()[:8]
+    return livro
+
+class PerseusComTabelas(Perseus):
+    def __init__(self, jogador_id):
+        super().__init__(jogador_id)
+        self.livro = _livro_de_aberturas()
+        self.cidades_do_mapa = None
+        self.distancias = None
+
+    def nova_partida(self, jogador_id, mapa):
+        livro, cidades_do_mapa, distancias = self.livro, self.cidades_do_mapa, self.distancias
+        Perseus.__init__(self, jogador_id)
+        self.livro = livro
+        # A tabela é da base do jogador no mapa: só vale se os dois forem os mesmos
+        mesmo_mapa = cidades_do_mapa == (tuple(mapa.get_cidades()), jogador_id)
+        self.cidades_do_mapa, self.distancias = (cidades_do_mapa, distancias) if mesmo_mapa else (None, None)
+
+    def decidir_acoes(self, estado_do_jogo, mapa):
+        if self.distancias is None:
+            base = f"basej_{self.jogador_id}"
+            self.cidades_do_mapa = (tuple(mapa.get_cidades()), self.jogador_id)
+            self.distancias = {cidade_id: mapa.distancia(base, cidade_id) for cidade_id in mapa.get_cidades()}
+        return super().decidir_acoes(estado_do_jogo, mapa)
+
+def _rodar(partidas, mapa, modo):
+    preparo, encerramento, total = [], [], []
+    with PoolDeIAs() as pool:
+        for partida in range(partidas):
+            random.seed(partida)
+            inicio = time.perf_counter()
+            simulador = Simulador(mapa, {'0': PerseusComTabelas, '1': PerseusComTabelas}, turno_maximo=20,
+                                  salvar_estados=False, pool_de_ias=pool if modo == "pool" else None,
+                                  prazo_por_turno=None if modo == "no processo" else 10)
+            simulador.run()
+            total.append(time.perf_counter() - inicio)
+            preparo.append(simulador.tempo_de_preparo_das_ias)
+            encerramento.append(simulador.tempo_de_encerramento_das_ias)
+    return statistics.median(preparo), statistics.median(encerramento), statistics.median(total)
+
+def main():
+    partidas = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    mapa = sys.argv[2] if len(sys.argv) > 2 else os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'mapa_debug.json')
+    print(f"Mediana por partida, em {partidas} partidas seguidas de 20 turnos (ms):")
+    print(f"{'IAs':<22}{'preparo':>10}{'encerramento':>14}{'partida':>10}")
+    for modo in ("no processo", "processos novos", "pool"):
+        with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):  # A Perseus imprime no console
+            preparo, encerramento, total = _rodar(partidas, mapa, modo)
+        print(f"{modo:<22}{preparo * 1000:>10.1f}{encerramento * 1000:>14.1f}{total * 1000:>10.1f}")
+
+if __name__ == "__main__":
+    main()
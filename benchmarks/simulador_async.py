@@ -0,0 +1,65 @@
+"""
+Partidas por segundo com IAs que passam a maior parte do turno esperando (um serviço
+externo simulado com uma pausa fixa): uma partida por vez no Simulador, e muitas ao
+mesmo tempo em um só laço de eventos (simulador_async.rodar_partidas), com limites
+diferentes de partidas simultâneas.
+
+Uso: python benchmarks/simulador_async.py [partidas] [espera_em_ms] [mapa]
+"""
+import asyncio
+import contextlib
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from ias.ia_perseus import Perseus
+from simulador import Simulador
+from simulador_async import rodar_partidas
+
+ESPERA = 0.005
+
+class PerseusRemota(Perseus):
+    """Perseus que, antes de decidir, espera a resposta de um serviço (bloqueando o processo)."""
+    def decidir_acoes(self, estado_do_jogo, mapa):
+        time.sleep(ESPERA)
+        return super().decidir_acoes(estado_do_jogo, mapa)
+
+class PerseusRemotaAssincrona(Perseus):
+    """A mesma espera, com decidir_acoes assíncrono."""
+    async def decidir_acoes(self, estado_do_jogo, mapa):
+        await asyncio.sleep(ESPERA)
+        return super().decidir_acoes(estado_do_jogo, mapa)
+
+def main():
+    global ESPERA
+    partidas = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    ESPERA = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else ESPERA
+    mapa = sys.argv[3] if len(sys.argv) > 3 else os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'mapa_debug.json')
+    turnos = 20
+
+    print(f"Partidas de {turnos} turnos, IAs esperando {ESPERA * 1000:.0f} ms por turno:")
+    print(f"{'Modo':<32}{'partidas/s':>12}{'aceleração':>12}")
+    with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):  # A Perseus imprime no console
+        sequenciais = max(1, partidas // 40)  # Uma por vez é lento demais para rodar todas
+        inicio = time.perf_counter()
+        for semente in range(sequenciais):
+            random.seed(semente)
+            Simulador(mapa, {'0': PerseusRemota, '1': PerseusRemota}, turno_maximo=turnos, salvar_estados=False).run()
+        base = sequenciais / (time.perf_counter() - inicio)
+    print(f"{'Simulador, uma por vez':<32}{base:>12.1f}{1:>11.2f}x")
+
+    for simultaneas in (1, 10, 100, partidas):
+        configuracoes = [{"mapa_json_path": mapa, "bots": {'0': PerseusRemotaAssincrona, '1': PerseusRemotaAssincrona},
+                          "turno_maximo": turnos, "salvar_estados": False, "semente": semente}
+                         for semente in range(partidas if simultaneas > 1 else sequenciais)]
+        with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+            inicio = time.perf_counter()
+            resultados = asyncio.run(rodar_partidas(configuracoes, simultaneas))
+            taxa = len(resultados) / (time.perf_counter() - inicio)
+        print(f"{f'assíncrono, {simultaneas} de cada vez':<32}{taxa:>12.1f}{taxa / base:>11.2f}x")
+
+if __name__ == "__main__":
+    main()
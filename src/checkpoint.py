@@ -0,0 +1,84 @@
+"""
+Checkpoints de partidas longas: o estado completo da engine (Jogo.snapshot), o estado
+do simulador e, opcionalmente, o estado interno das IAs, para retomar a partida do
+ponto em que parou em vez de começar do turno 0.
+
+Cada checkpoint é um arquivo checkpoint_turno_N.ckpt com MAGICA seguida de um pickle
+comprimido com zlib. A gravação é atômica (arquivo temporário + os.replace), então
+um processo interrompido no meio da gravação não deixa um checkpoint corrompido.
+
+Os checkpoints usam pickle: só carregue arquivos gerados por você mesmo.
+"""
+import glob
+import os
+import pickle
+import re
+import zlib
+from engine import Instantaneo
+
+MAGICA = b"CKPT1\n"
+VERSAO = 1
+_CAMPOS_DO_JOGO = tuple(campo for campo in Instantaneo.__slots__ if campo != 'topologia')
+_PADRAO_DO_ARQUIVO = re.compile(r"checkpoint_turno_(\d+)\.ckpt$")
+
+def instantaneo_para_dict(instantaneo):
+    """Campos de um Instantaneo, sem a topologia (que é recarregada do arquivo do mapa)."""
+    return {campo: getattr(instantaneo, campo) for campo in _CAMPOS_DO_JOGO}
+
+def instantaneo_do_dict(campos, topologia):
+    """Refaz o Instantaneo sobre a topologia do mapa carregado."""
+    return Instantaneo(topologia=topologia, **campos)
+
+def caminho_do_checkpoint(diretorio, turno):
+    return os.path.join(diretorio, f"checkpoint_turno_{turno}.ckpt")
+
+def gravar_checkpoint(caminho, dados, nivel_compressao=6):
+    """Grava o dicionário 'dados' de forma atômica. Retorna o tamanho do arquivo em bytes."""
+    conteudo = MAGICA + zlib.compress(pickle.dumps(dados, protocol=pickle.HIGHEST_PROTOCOL), nivel_compressao)
+    diretorio = os.path.dirname(caminho)
+    if diretorio:
+        os.makedirs(diretorio, exist_ok=True)
+    temporario = caminho + ".tmp"
+    with open(temporario, 'wb') as f:
+        f.write(conteudo)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporario, caminho)
+    return len(conteudo)
+
+def ler_checkpoint(caminho):
+    """Lê um checkpoint gravado por gravar_checkpoint."""
+    with open(caminho, 'rb') as f:
+        conteudo = f.read()
+    if not conteudo.startswith(MAGICA):
+        raise ValueError(f"'{caminho}' não é um checkpoint.")
+    dados = pickle.loads(zlib.decompress(conteudo[len(MAGICA):]))
+    if dados.get("versao") != VERSAO:
+        raise ValueError(f"Versão {dados.get('versao')} do checkpoint não é suportada.")
+    return dados
+
+def listar_checkpoints(diretorio):
+    """Caminhos dos checkpoints do diretório, do turno mais antigo para o mais recente."""
+    encontrados = []
+    for caminho in glob.glob(os.path.join(diretorio, "checkpoint_turno_*.ckpt")):
+        correspondencia = _PADRAO_DO_ARQUIVO.search(caminho)
+        if correspondencia:
+            encontrados.append((int(correspondencia.group(1)), caminho))
+    return [caminho for _, caminho in sorted(encontrados)]
+
+def ultimo_checkpoint(diretorio):
+    """
+    Dados do checkpoint mais recente que puder ser lido, ou None se não houver nenhum.
+    Um arquivo ilegível (por exemplo, de outra versão) é pulado em favor do anterior.
+    """
+    for caminho in reversed(listar_checkpoints(diretorio)):
+        try:
+            return ler_checkpoint(caminho)
+        except (OSError, ValueError, EOFError, zlib.error, pickle.UnpicklingError):
+            continue
+    return None
+
+def remover_antigos(diretorio, manter):
+    """Apaga os checkpoints mais antigos, deixando só os 'manter' mais recentes."""
+    for caminho in listar_checkpoints(diretorio)[:-manter] if manter > 0 else []:
+        os.remove(caminho)
@@ -0,0 +1,44 @@
+import sys
+from collections import namedtuple
+
+# Tipos de comando (as mesmas strings de sempre, definidas uma única vez)
+MOVER = 'MOVER'
+ATACAR = 'ATACAR'
+PERMANECER = 'PERMANECER'
+RECUAR = 'RECUAR'
+COLETAR = 'COLETAR'
+ENTREGAR = 'ENTREGAR'
+
+class Comando(namedtuple('Comando', ['tipo', 'alvo', 'quantidade'], defaults=(None, None))):
+    """
+    Comando imutável de uma unidade, guardado como uma tupla pequena em vez de um dicionário.
+    Continua aceitando o acesso no estilo de dicionário (comando['alvo'], comando.get('quantidade'))
+    usado pelos bots e pelo formato documentado no manual; campos vazios se comportam como chaves ausentes.
+    """
+    __slots__ = ()
+
+    def __new__(cls, tipo, alvo=None, quantidade=None):
+        if alvo is not None:
+            alvo = sys.intern(alvo)
+        return super().__new__(cls, tipo, alvo, quantidade)
+
+    def __getitem__(self, chave):
+        if isinstance(chave, str):
+            valor = getattr(self, chave) if chave in self._fields else None
+            if valor is None:
+                raise KeyError(chave)
+            return valor
+        return super().__getitem__(chave)
+
+    def get(self, chave, padrao=None):
+        try:
+            return self[chave]
+        except KeyError:
+            return padrao
+
+    @classmethod
+    def de(cls, comando):
+        """Converte um comando no formato antigo (dicionário) em Comando; Comandos passam direto."""
+        if isinstance(comando, cls):
+            return comando
+        return cls(comando['tipo'], comando.get('alvo'), comando.get('quantidade'))
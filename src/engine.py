@@ -1,218 +1,953 @@
 import os
 import json
 import heapq
-from collections import deque
+import functools
+import math
+import threading
+import weakref
+import mapa_binario
+from collections import OrderedDict
+from itertools import islice
+from comandos import Comando, MOVER, ATACAR, PERMANECER, RECUAR
+from grafo_csr import GrafoCSR
+from roteamento import TabelaDeRotas, RotasDeTerritorio
+from persistencia import GravadorDeEstados
+from estado_do_jogo import EstadoDoJogo
+from eventos import (
+    EmissorDeEventos, FASE, TURNO, ESTADO_SALVO, FIM_DE_JOGO, AVANCO_RAPIDO, CIDADE_DUPLICADA,
+    ARESTA_DUPLICADA, MOVIMENTO_INICIADO, MOVIMENTO_SEM_ROTA, MOVIMENTO, CHEGADA, ESTACIONAMENTO,
+    JA_ESTACIONADA, COMANDO_INVALIDO, ATAQUE_ORDENADO, ATAQUE_INVALIDO, RECUO_VOLUNTARIO, RECUO,
+    ENCURRALADA, RETORNO_A_BASE, TENTATIVA_DE_CONQUISTA, CONQUISTA, CONQUISTA_FALHOU,
+    ATAQUE_A_BASE, COMBATE, VITORIA_NO_COMBATE, DEFESA_VITORIOSA, PERMANENCIA_APOS_VITORIA,
+    RAID_VITORIOSO, CUSTO_DE_SUPRIMENTO, CUSTO_DO_TURNO, ISOLAMENTO, FALENCIA,
+    TRANSPORTE_RECONSTRUIDO, TRANSPORTE_EM_MISSAO, TRANSPORTE_SEM_ROTA, TRANSPORTE_EM_CAMINHO,
+    TRANSPORTE_PERDEU_CARGA, TRANSPORTE_DESTRUIDO, TRANSPORTE_MOVEU, COLETA, ENTREGA,
+    CONVERSAO_EM_TROPAS, TRANSPORTE_RETORNANDO, TRANSPORTE_NA_BASE, TROPA_CRIADA, TROPA_DUPLICADA,
+    TROPAS_INSUFICIENTES, MOTIVO_FORCA_INSUFICIENTE, MOTIVO_CIDADE_NO_CAMINHO, MOTIVO_ARESTA_ESTREITA,
+    MOTIVO_RAID_CONCLUIDO, MOTIVO_ORDEM_DE_RECUO, MOTIVO_CIDADE_NEUTRA, MOTIVO_SEM_CAMINHO,
+    MOTIVO_COLETA_CONCLUIDA
+)
 
 class Cidade:
     """Representa uma cidade no mapa do jogo (apenas dados lógicos)."""
+    __slots__ = ('id', 'populacao', 'dono', 'tropas_estacionadas')
+
     def __init__(self, id, populacao):
         self.id = id
         self.populacao = populacao
         self.dono = None
         self.tropas_estacionadas = []
 
-class Tropa:
+class FilaCompacta:
+    """
+    Fila de consumo sobre uma tupla: popleft apenas avança um cursor (O(1)) e
+    appendleft do item recém-consumido apenas recua o cursor. Ocupa bem menos
+    memória que uma deque (que reserva um bloco de 64 posições por instância),
+    o que importa com milhares de unidades vivas em várias partidas.
+    """
+    __slots__ = ('_itens', '_inicio')
+
+    def __init__(self, itens=()):
+        self._itens = itens if type(itens) is tuple else tuple(itens)
+        self._inicio = 0
+
+    def __len__(self):
+        return len(self._itens) - self._inicio
+
+    def __bool__(self):
+        return self._inicio < len(self._itens)
+
+    def __iter__(self):
+        return islice(self._itens, self._inicio, None)
+
+    def __getitem__(self, indice):
+        tamanho = len(self)
+        if indice < 0:
+            indice += tamanho
+        if not 0 <= indice < tamanho:
+            raise IndexError("índice fora da fila")
+        return self._itens[self._inicio + indice]
+
+    def __repr__(self):
+        return repr(list(self))
+
+    def popleft(self):
+        if not self:
+            raise IndexError("fila vazia")
+        item = self._itens[self._inicio]
+        self._inicio += 1
+        if self._inicio == len(self._itens):
+            self._itens = ()  # Libera a tupla assim que a fila esvazia
+            self._inicio = 0
+        return item
+
+    def appendleft(self, item):
+        if self._inicio > 0 and self._itens[self._inicio - 1] is item:
+            self._inicio -= 1
+        else:
+            self._itens = (item,) + self._itens[self._inicio:]
+            self._inicio = 0
+
+    def append(self, item):
+        self._itens = self._itens[self._inicio:] + (item,)
+        self._inicio = 0
+
+    def clear(self):
+        self._itens = ()
+        self._inicio = 0
+
+class _UnidadeComFila:
+    """Base das unidades que executam uma fila de comandos ao longo de um caminho."""
+    __slots__ = ('_fila_de_comandos', '_caminho_atual')
+
+    @property
+    def fila_de_comandos(self):
+        return self._fila_de_comandos
+
+    @fila_de_comandos.setter
+    def fila_de_comandos(self, comandos):
+        # Filas de Comando: consumir e devolver o primeiro comando custa O(1)
+        self._fila_de_comandos = FilaCompacta(Comando.de(c) for c in comandos)
+
+    @property
+    def caminho_atual(self):
+        return self._caminho_atual
+
+    @caminho_atual.setter
+    def caminho_atual(self, caminho):
+        self._caminho_atual = FilaCompacta(caminho)
+
+class Tropa(_UnidadeComFila):
     """Representa uma tropa no jogo."""
+    __slots__ = ('id', 'dono', 'forca', 'localizacao', '_estado', 'alvo_de_ataque', '_registro', '_sequencia')
+
     def __init__(self, id, dono, forca, fila_de_comandos=None):
+        self._registro = None # RegistroDeTropas que acompanha as mudanças de estado desta tropa
+        self._sequencia = 0 # Ordem de entrada no registro, para iterar na ordem de criação
+        self._estado = None
         self.id = id
         self.dono = dono
         self.forca = forca
         self.localizacao = dono.id_base
-        self.fila_de_comandos = fila_de_comandos if fila_de_comandos is not None else []
+        self.fila_de_comandos = fila_de_comandos if fila_de_comandos is not None else ()
         # Estados possíveis: 'ociosa', 'movendo', 'atacando', 'recuando', 'encurralada', 'vitoriosa'
         self.estado = 'ociosa'
-        self.caminho_atual = []
+        self.caminho_atual = ()
         self.alvo_de_ataque = None # Para guardar o alvo do comando ATACAR
 
-class Transporte:
+    @property
+    def estado(self):
+        return self._estado
+
+    @estado.setter
+    def estado(self, novo_estado):
+        antigo_estado = self._estado
+        self._estado = novo_estado
+        if self._registro is not None and antigo_estado != novo_estado:
+            self._registro._mudou_estado(self, antigo_estado, novo_estado)
+
+class Transporte(_UnidadeComFila):
     """Representa o transporte de um jogador, que serve para mover população entre cidades
     ou converter em tropas na base."""
+    __slots__ = ('dono', 'localizacao', 'carga_populacao', 'estado', 'quantidade_solicitada', 'timer_respawn')
+
     def __init__(self, dono):
         self.dono = dono
         self.localizacao = dono.id_base
         self.carga_populacao = 0
-        self.fila_de_comandos = []
+        self.fila_de_comandos = ()
         # Estados: 'ocioso', 'indo_coletar', 'transportando', 'retornando', 'destruido'
         self.estado = 'ocioso'
         self.quantidade_solicitada = 0 # Para saber quanto coletar
-        self.caminho_atual = []
+        self.caminho_atual = ()
         self.timer_respawn = 0 # Para quando for destruído (nasce novamente na base após 1 turno)
 
+class RegistroDeTropas:
+    """
+    Tropas em campo de um jogador, indexadas pelo ID. Mantém a ordem de inserção
+    (para iterar de forma determinística) e permite remover e buscar em O(1).
+    Aceita as mesmas operações de lista que a engine já usava (append, remove, clear).
+
+    Também funciona como agenda das fases do turno: guarda as tropas separadas
+    por estado (atualizado a cada mudança de Tropa.estado), para que cada fase
+    percorra apenas as tropas que podem agir.
+    """
+    def __init__(self):
+        self._por_id = {}
+        self._por_estado = {}
+        self._estacionadas_com_comandos = {}
+        self._proxima_sequencia = 0
+
+    def __iter__(self):
+        return iter(self._por_id.values())
+
+    def __len__(self):
+        return len(self._por_id)
+
+    def __contains__(self, tropa):
+        return self._por_id.get(tropa.id) is tropa
+
+    def __repr__(self):
+        return f"RegistroDeTropas({list(self._por_id)})"
+
+    def contem_id(self, tropa_id):
+        return tropa_id in self._por_id
+
+    def get(self, tropa_id, padrao=None):
+        return self._por_id.get(tropa_id, padrao)
+
+    def append(self, tropa):
+        if tropa.id in self._por_id:
+            raise ValueError(f"Tropa {tropa.id} já está registrada.")
+        self._por_id[tropa.id] = tropa
+        tropa._registro = self
+        tropa._sequencia = self._proxima_sequencia
+        self._proxima_sequencia += 1
+        self._mudou_estado(tropa, None, tropa.estado)
+
+    def remove(self, tropa):
+        if tropa not in self:
+            raise ValueError(f"Tropa {tropa.id} não está registrada.")
+        del self._por_id[tropa.id]
+        self._mudou_estado(tropa, tropa.estado, None)
+        tropa._registro = None
+
+    def clear(self):
+        for tropa in self._por_id.values():
+            tropa._registro = None
+        self._por_id.clear()
+        self._por_estado.clear()
+        self._estacionadas_com_comandos.clear()
+
+    def _mudou_estado(self, tropa, antigo_estado, novo_estado):
+        if antigo_estado is not None:
+            self._por_estado[antigo_estado].pop(tropa, None)
+            if antigo_estado == 'estacionada':
+                self._estacionadas_com_comandos.pop(tropa, None)
+        if novo_estado is not None:
+            self._por_estado.setdefault(novo_estado, {})[tropa] = None
+            # Uma tropa estacionada só volta a agir se ainda tiver comandos na fila
+            if novo_estado == 'estacionada' and tropa.fila_de_comandos:
+                self._estacionadas_com_comandos[tropa] = None
+
+    def _em_ordem(self, tropas):
+        return sorted(tropas, key=lambda tropa: tropa._sequencia)
+
+    def no_estado(self, estado):
+        """Tropas em um estado, na ordem em que foram criadas."""
+        return self._em_ordem(self._por_estado.get(estado, ()))
+
+    def com_movimento_pendente(self):
+        """
+        Tropas que podem agir na fase de movimento (em trânsito, ociosas com comandos
+        ou estacionadas com comandos), na ordem em que foram criadas.
+        """
+        ativas = [tropa for estado in ('movendo', 'recuando') for tropa in self._por_estado.get(estado, ())]
+        ativas.extend(tropa for tropa in self._por_estado.get('ociosa', ()) if tropa.fila_de_comandos)
+        for tropa in list(self._estacionadas_com_comandos):
+            if tropa.fila_de_comandos:
+                ativas.append(tropa)
+            else:
+                del self._estacionadas_com_comandos[tropa]
+        return self._em_ordem(ativas)
+
 class Jogador:
     """Representa um jogador no jogo."""
     def __init__(self, id, id_base):
         self.id = id
         self.id_base = id_base
-        self.tropas = []
+        self.tropas = RegistroDeTropas()
         self.tropas_na_base = 100
         self.transporte = Transporte(self) # Cada jogador tem um transporte associado
 
 class Aresta:
     """Representa uma aresta lógica entre duas cidades."""
+    __slots__ = ('cidades', 'peso')
+
     def __init__(self, cidade1_id, cidade2_id, peso):
         self.cidades = (cidade1_id, cidade2_id)
         self.peso = peso
 
+class Topologia:
+    """
+    Parte imutável de um mapa: IDs e populações iniciais das cidades, arestas,
+    lista de adjacência, o núcleo CSR e as rotas calculadas sobre ele. Uma mesma
+    topologia pode ser usada por muitos jogos ao mesmo tempo (ver carregar_topologia);
+    o que muda durante a partida (donos, populações, tropas) fica no Mapa de cada jogo.
+    Nada aqui deve ser alterado depois de criado.
+    """
+    def __init__(self, populacao_inicial, arestas, lista_adjacencia, grafo=None, arestas_por_par=None):
+        self.populacao_inicial = populacao_inicial  # cidade_id -> população, na ordem do mapa
+        self.arestas = arestas
+        self.lista_adjacencia = lista_adjacencia
+        self.ordem_das_cidades = {cidade_id: i for i, cidade_id in enumerate(populacao_inicial)}
+        if grafo is None:
+            grafo = GrafoCSR.da_lista_de_adjacencia(populacao_inicial.keys(), lista_adjacencia)
+        self.grafo = grafo
+        n = len(grafo)
+        if arestas_por_par is None:
+            arestas_por_par = {}  # i * n + j -> Aresta, nos dois sentidos
+            for (cidade1_id, cidade2_id), aresta in arestas.items():
+                i, j = grafo.indice.get(cidade1_id), grafo.indice.get(cidade2_id)
+                if i is not None and j is not None:
+                    arestas_por_par[i * n + j] = aresta
+                    arestas_por_par[j * n + i] = aresta
+        self.arestas_por_par = arestas_por_par
+        self.rotas = TabelaDeRotas(self)  # Só depende da topologia, então também é compartilhada
+
+    @classmethod
+    def do_compilado(cls, compilado, eventos=None):
+        """
+        Topologia sobre um mapa compilado (mapa_binario.MapaCompilado), sem copiar os arrays:
+        'arestas' e 'lista_adjacencia' são visões que montam cada Aresta e cada linha na
+        primeira consulta. Com o mapa em memória compartilhada, só isso e os índices de IDs
+        ocupam memória própria de cada processo (ver mapa_compartilhado.py).
+        """
+        # Importado aqui: topologia_compilada usa a Aresta deste módulo
+        from topologia_compilada import ArestasCompiladas, AdjacenciaCompilada, ArestasPorParCompiladas
+        eventos = eventos if eventos is not None else EmissorDeEventos()
+        grafo = compilado.grafo()
+        ids, populacoes = compilado.ids, compilado.populacoes
+        populacao_inicial = {ids[i]: populacoes[i] for i in range(compilado.n_cidades)}
+        arestas = ArestasCompiladas(compilado, grafo, eventos)
+        return cls(populacao_inicial, arestas, AdjacenciaCompilada(compilado, grafo),
+                   grafo, ArestasPorParCompiladas(arestas, len(grafo)))
+
+    @classmethod
+    def do_arquivo(cls, caminho, eventos=None):
+        """Lê um mapa (JSON do gerador ou compilado) e devolve sua topologia."""
+        if mapa_binario.eh_mapa_binario(caminho):
+            return cls.do_compilado(mapa_binario.carregar(caminho), eventos)
+        mapa = Mapa(eventos)
+        with open(caminho, 'r') as f:
+            dados_mapa = json.load(f)
+        for cidade_data in dados_mapa.get('cidades', []):
+            # A engine agora ignora a informação de 'pos'
+            mapa.adicionar_cidade(Cidade(cidade_data['id'], cidade_data['populacao']))
+        for aresta_data in dados_mapa.get('arestas', []):
+            mapa.adicionar_aresta(aresta_data['de'], aresta_data['para'], aresta_data['peso'])
+        for adj in dados_mapa['lista_adjacencia']:
+            cidade = adj['cidade']
+            vizinhos = [(v['id'], v['peso']) for v in adj['vizinhos']]
+            mapa.definir_vizinhos(cidade, vizinhos)
+        return mapa.congelar_topologia()
+
+# Topologias já lidas, por arquivo: (caminho, mtime, tamanho) -> Topologia, da mais antiga para a mais recente
+_TOPOLOGIAS = OrderedDict()
+MAX_TOPOLOGIAS_EM_CACHE = 16
+
+def carregar_topologia(caminho, eventos=None):
+    """
+    Topologia do mapa no arquivo, lida uma vez só enquanto o arquivo não mudar.
+    Os avisos da leitura (cidades ou arestas repetidas) só são emitidos na primeira vez.
+    """
+    chave = _chave_do_arquivo(caminho)
+    topologia = _TOPOLOGIAS.get(chave)
+    if topologia is None:
+        topologia = registrar_topologia(caminho, Topologia.do_arquivo(caminho, eventos))
+    else:
+        _TOPOLOGIAS.move_to_end(chave)
+    return topologia
+
+def registrar_topologia(caminho, topologia):
+    """
+    Faz carregar_topologia devolver 'topologia' para o arquivo (enquanto ele não mudar),
+    por exemplo uma topologia montada sobre memória compartilhada.
+    """
+    chave = _chave_do_arquivo(caminho)
+    _TOPOLOGIAS[chave] = topologia
+    _TOPOLOGIAS.move_to_end(chave)
+    if len(_TOPOLOGIAS) > MAX_TOPOLOGIAS_EM_CACHE:
+        _TOPOLOGIAS.popitem(last=False)
+    return topologia
+
+def _chave_do_arquivo(caminho):
+    info = os.stat(caminho)
+    return (os.path.realpath(caminho), info.st_mtime_ns, info.st_size)
+
 class Mapa:
-    """Representa a estrutura lógica do mapa do jogo."""
-    def __init__(self):
+    """
+    Representa a estrutura lógica do mapa do jogo. A topologia pode vir pronta
+    (usar_topologia), compartilhada com outros jogos; nesse caso, só as cidades
+    e os índices de donos e tropas são deste mapa.
+    """
+    def __init__(self, eventos=None):
+        self.eventos = eventos if eventos is not None else EmissorDeEventos()
         self.cidades = {}
         self.arestas = {}
         self.lista_adjacencia = {}  # Para consultas rápidas de vizinhos
+        self.rotas = TabelaDeRotas(self)  # Distâncias e próximos passos, calculados sob demanda
+        self.rotas_por_dono = {}  # Rotas restritas ao território de cada jogador, criadas sob demanda
+        self.versao_territorio = {}  # dono -> contador incrementado a cada cidade ganha ou perdida
+        self.cidades_por_dono = {}  # dono -> {cidade_id: None}, na ordem em que as cidades foram ganhas
+        self.cidades_sem_base_por_dono = {}  # dono -> quantidade de cidades que não são bases
+        self._ordem_das_cidades = {}  # cidade_id -> posição no mapa, para exportar na ordem original
+        self.tropas_por_cidade = {}  # cidade_id -> {tropa: None}, atualizado a cada mudança de localização
+        # Núcleo CSR com índices inteiros, montado a partir dos dados acima (ver compilar_topologia)
+        self._grafo = None
+        self.dono_por_indice = []  # índice da cidade no CSR -> dono
+        self._arestas_por_par = {}  # i * n + j -> Aresta, nos dois sentidos
+        self._topologia = None  # Topologia compartilhada em uso, se houver
+
+    def usar_topologia(self, topologia):
+        """
+        Passa a usar uma topologia pronta (compartilhada, sem cópia) e cria as cidades
+        com as populações iniciais dela, sem donos nem tropas.
+        """
+        self._topologia = topologia
+        self.arestas = topologia.arestas
+        self.lista_adjacencia = topologia.lista_adjacencia
+        self._ordem_das_cidades = topologia.ordem_das_cidades
+        self.rotas = topologia.rotas
+        self._grafo = topologia.grafo
+        self._arestas_por_par = topologia.arestas_por_par
+        self.cidades = {cidade_id: Cidade(cidade_id, populacao)
+                        for cidade_id, populacao in topologia.populacao_inicial.items()}
+        self._limpar_estado_da_partida()
+
+    def congelar_topologia(self):
+        """Topologia com as cidades, arestas e adjacência atuais; o mapa passa a usá-la."""
+        if self._topologia is None:
+            populacao_inicial = {cidade_id: cidade.populacao for cidade_id, cidade in self.cidades.items()}
+            grafo = self.grafo
+            self._topologia = Topologia(populacao_inicial, self.arestas, self.lista_adjacencia, grafo)
+            self.rotas = self._topologia.rotas
+        return self._topologia
+
+    def reiniciar(self):
+        """
+        Volta ao início da partida: populações iniciais, nenhuma cidade com dono e
+        nenhuma tropa. Custa O(cidades) e não toca na topologia.
+        """
+        if self._topologia is None:
+            raise RuntimeError("O mapa não tem uma topologia carregada para reiniciar.")
+        for cidade_id, populacao in self._topologia.populacao_inicial.items():
+            cidade = self.cidades[cidade_id]
+            cidade.populacao = populacao
+            cidade.dono = None
+            cidade.tropas_estacionadas.clear()
+        self._limpar_estado_da_partida()
+
+    def _limpar_estado_da_partida(self):
+        self.rotas_por_dono = {}
+        self.versao_territorio = {}
+        self.cidades_por_dono = {}
+        self.cidades_sem_base_por_dono = {}
+        self.tropas_por_cidade = {}
+        self.dono_por_indice = [None] * len(self._grafo)
+
+    def _desanexar_topologia(self):
+        """Antes de mudar a topologia, deixa de compartilhá-la (cópia rasa das partes alteráveis)."""
+        if self._topologia is not None:
+            self._topologia = None
+            self.arestas = dict(self.arestas)
+            self.lista_adjacencia = dict(self.lista_adjacencia)
+            self._ordem_das_cidades = dict(self._ordem_das_cidades)
+            self.rotas = TabelaDeRotas(self)
 
     def adicionar_cidade(self, cidade):
         """Adiciona uma cidade ao mapa."""
+        self._desanexar_topologia()
         if cidade.id in self.cidades:
-            print(f"AVISO: Cidade {cidade.id} já existe no mapa. Ignorando.")
+            self.eventos.emitir(CIDADE_DUPLICADA, cidade=cidade.id)
             return
         self.cidades[cidade.id] = cidade
+        self._ordem_das_cidades[cidade.id] = len(self._ordem_das_cidades)
+        if cidade.dono is not None:
+            self._registrar_posse(cidade.id, cidade.dono)
+        self._invalidar_topologia()
 
     def adicionar_aresta(self, cidade1_id, cidade2_id, peso):
         """Adiciona uma aresta entre duas cidades."""
+        self._desanexar_topologia()
         chave = tuple(sorted((cidade1_id, cidade2_id)))
         if chave in self.arestas:
-            print(f"AVISO: Aresta {chave} já existe. Ignorando.")
+            self.eventos.emitir(ARESTA_DUPLICADA, aresta=chave)
             return
         self.arestas[chave] = Aresta(cidade1_id, cidade2_id, peso)
+        self._invalidar_topologia()
+
+    def definir_vizinhos(self, cidade_id, vizinhos):
+        """Define a lista de adjacência de uma cidade: [(vizinho_id, peso), ...]."""
+        self._desanexar_topologia()
+        self.lista_adjacencia[cidade_id] = vizinhos
+        self._invalidar_topologia()
+
+    def _invalidar_topologia(self):
+        """Descarta as estruturas derivadas da topologia (núcleo CSR e rotas)."""
+        self._grafo = None
+        self.rotas.invalidar()
+        for rotas in self.rotas_por_dono.values():
+            rotas.invalidar()
+
+    @property
+    def grafo(self):
+        """Núcleo CSR da topologia (GrafoCSR), montado na primeira consulta após uma mudança."""
+        if self._grafo is None:
+            self.compilar_topologia()
+        return self._grafo
+
+    def compilar_topologia(self):
+        """Interna os IDs das cidades em inteiros e monta a adjacência CSR. Chamado ao carregar o mundo."""
+        return self._instalar_grafo(GrafoCSR.da_lista_de_adjacencia(self.cidades.keys(), self.lista_adjacencia))
+
+    def _instalar_grafo(self, grafo):
+        """Passa a usar o GrafoCSR dado e monta os índices que dependem dele."""
+        n = len(grafo)
+        self.dono_por_indice = [self.cidades[c].dono if c in self.cidades else None for c in grafo.ids]
+        self._arestas_por_par = {}
+        for (cidade1_id, cidade2_id), aresta in self.arestas.items():
+            i, j = grafo.indice.get(cidade1_id), grafo.indice.get(cidade2_id)
+            if i is not None and j is not None:
+                self._arestas_por_par[i * n + j] = aresta
+                self._arestas_por_par[j * n + i] = aresta
+        self._grafo = grafo
+        return grafo
+
+    def carregar_compilado(self, compilado):
+        """
+        Preenche o mapa a partir de um mapa compilado (mapa_binario.MapaCompilado), usando
+        o CSR do arquivo em vez de recalculá-lo. O resultado é o mesmo de carregar o JSON.
+        """
+        # Preenche os dicionários direto, invalidando a topologia uma vez só no fim
+        self._desanexar_topologia()
+        ids, populacoes = compilado.ids, compilado.populacoes
+        for i in range(compilado.n_cidades):  # Cidades repetidas já foram descartadas na compilação
+            cidade = Cidade(ids[i], populacoes[i])
+            self.cidades[cidade.id] = cidade
+            self._ordem_das_cidades[cidade.id] = len(self._ordem_das_cidades)
+        for de, para, peso in zip(compilado.arestas_de, compilado.arestas_para, compilado.arestas_peso):
+            cidade1_id, cidade2_id = ids[de], ids[para]
+            chave = (cidade1_id, cidade2_id) if cidade1_id <= cidade2_id else (cidade2_id, cidade1_id)
+            if chave in self.arestas:
+                self.eventos.emitir(ARESTA_DUPLICADA, aresta=chave)
+                continue
+            self.arestas[chave] = Aresta(cidade1_id, cidade2_id, peso)
+        inicio, vizinhos, pesos = compilado.inicio, compilado.vizinhos, compilado.pesos
+        for i in compilado.ordem_adjacencia:
+            self.lista_adjacencia[ids[i]] = [(ids[vizinhos[k]], pesos[k]) for k in range(inicio[i], inicio[i + 1])]
+        self._invalidar_topologia()
+        return self._instalar_grafo(compilado.grafo())
+
+    def definir_dono(self, cidade_id, novo_dono):
+        """Troca o dono de uma cidade. Toda mudança de dono deve passar por aqui."""
+        cidade = self.cidades[cidade_id]
+        antigo_dono = cidade.dono
+        if antigo_dono == novo_dono:
+            return
+        cidade.dono = novo_dono
+        if self._grafo is not None:
+            self.dono_por_indice[self._grafo.indice[cidade_id]] = novo_dono
+        if antigo_dono is not None:
+            self._remover_posse(cidade_id, antigo_dono)
+            if antigo_dono in self.rotas_por_dono:
+                self.rotas_por_dono[antigo_dono].remover(cidade_id)
+        if novo_dono is not None:
+            self._registrar_posse(cidade_id, novo_dono)
+            if novo_dono in self.rotas_por_dono:
+                self.rotas_por_dono[novo_dono].adicionar(cidade_id)
+
+    def _registrar_posse(self, cidade_id, dono):
+        self.cidades_por_dono.setdefault(dono, {})[cidade_id] = None
+        if "base" not in cidade_id:
+            self.cidades_sem_base_por_dono[dono] = self.cidades_sem_base_por_dono.get(dono, 0) + 1
+        self.versao_territorio[dono] = self.versao_territorio.get(dono, 0) + 1
+
+    def _remover_posse(self, cidade_id, dono):
+        del self.cidades_por_dono[dono][cidade_id]
+        if "base" not in cidade_id:
+            self.cidades_sem_base_por_dono[dono] -= 1
+        self.versao_territorio[dono] = self.versao_territorio.get(dono, 0) + 1
+
+    def get_cidades_do_dono(self, dono):
+        """Retorna os IDs das cidades de um dono (visão somente leitura do índice, O(1))."""
+        return self.cidades_por_dono.get(dono, {}).keys()
+
+    def contar_cidades(self, dono, incluir_bases=True):
+        """Quantidade de cidades de um dono, em O(1)."""
+        if incluir_bases:
+            return len(self.cidades_por_dono.get(dono, ()))
+        return self.cidades_sem_base_por_dono.get(dono, 0)
+
+    def registrar_tropa(self, tropa):
+        """Inclui uma tropa no índice de localização."""
+        self.tropas_por_cidade.setdefault(tropa.localizacao, {})[tropa] = None
+
+    def remover_tropa(self, tropa):
+        """Retira uma tropa do índice de localização."""
+        tropas_na_cidade = self.tropas_por_cidade.get(tropa.localizacao)
+        if tropas_na_cidade is not None:
+            tropas_na_cidade.pop(tropa, None)
+
+    def mover_tropa(self, tropa, destino_id):
+        """Atualiza a localização de uma tropa mantendo o índice de localização em dia."""
+        self.remover_tropa(tropa)
+        tropa.localizacao = destino_id
+        self.registrar_tropa(tropa)
+
+    def get_tropas_em(self, cidade_id):
+        """Retorna as tropas (de qualquer jogador) que estão em uma cidade, em O(1)."""
+        return self.tropas_por_cidade.get(cidade_id, {}).keys()
+
+    def ordenar_como_no_mapa(self, cidades_ids):
+        """Ordena IDs de cidades na mesma ordem em que aparecem no mapa."""
+        return sorted(cidades_ids, key=self._ordem_das_cidades.__getitem__)
 
     def get_aresta(self, cidade1_id, cidade2_id):
         """Retorna a aresta entre duas cidades, se existir."""
-        chave = tuple(sorted((cidade1_id, cidade2_id)))
-        return self.arestas.get(chave)
+        grafo = self.grafo
+        i, j = grafo.indice.get(cidade1_id), grafo.indice.get(cidade2_id)
+        if i is None or j is None:
+            return self.arestas.get(tuple(sorted((cidade1_id, cidade2_id))))
+        return self._arestas_por_par.get(i * len(grafo) + j)
+
+    def sao_vizinhos(self, cidade1_id, cidade2_id):
+        """Indica se existe ligação direta entre duas cidades, sem montar a lista de vizinhos."""
+        grafo = self.grafo
+        i, j = grafo.indice.get(cidade1_id), grafo.indice.get(cidade2_id)
+        return i is not None and j is not None and grafo.posicao_da_aresta(i, j) is not None
 
     def get_vizinhos(self, cidade_id):
         """Retorna uma lista de IDs de cidades vizinhas a uma cidade específica."""
-        # Agora usa a lista de adjacência
-        vizinhos = [vizinho for vizinho, _ in self.lista_adjacencia.get(cidade_id, [])]
-        return vizinhos
+        grafo = self.grafo
+        i = grafo.indice.get(cidade_id)
+        if i is None:
+            return []
+        ids, vizinhos = grafo.ids, grafo.vizinhos
+        return [ids[vizinhos[k]] for k in range(grafo.inicio[i], grafo.inicio[i + 1])]
     
     def encontrar_caminho_bfs(self, inicio_id, fim_id):
         """Encontra o caminho mais curto entre duas cidades usando BFS."""
-        if inicio_id == fim_id: return [inicio_id]
-        fila = deque([[inicio_id]])
-        visitados = {inicio_id}
-        while fila:
-            caminho = fila.popleft()
-            ultimo_no = caminho[-1]
-            if ultimo_no == fim_id: return caminho
-            for vizinho in self.get_vizinhos(ultimo_no):
-                if vizinho not in visitados:
-                    visitados.add(vizinho)
-                    novo_caminho = list(caminho)
-                    novo_caminho.append(vizinho)
-                    fila.append(novo_caminho)
-        return None
+        # A BFS de cada origem é feita uma vez só e reaproveitada pela tabela de rotas
+        return self.rotas.caminho(inicio_id, fim_id)
+
+    def encontrar_caminho_no_territorio(self, dono, inicio_id, fim_id):
+        """
+        Encontra o caminho mais curto entre duas cidades passando apenas por cidades
+        do dono informado (a cidade de origem pode ser de qualquer um).
+        Retorna None se não houver caminho dentro do território.
+        """
+        rotas = self.rotas_por_dono.get(dono)
+        if rotas is None:
+            rotas = self.rotas_por_dono[dono] = RotasDeTerritorio(self, dono)
+        return rotas.caminho(inicio_id, fim_id)
+
+    def distancia(self, inicio_id, fim_id):
+        """Retorna o número de saltos entre duas cidades, ou None se não houver caminho."""
+        return self.rotas.distancia(inicio_id, fim_id)
+
+    def proximo_passo(self, inicio_id, fim_id):
+        """Retorna a próxima cidade no caminho mais curto entre duas cidades."""
+        return self.rotas.proximo_passo(inicio_id, fim_id)
 
 class MapaSomenteLeitura:
     def __init__(self, mapa):
         self._mapa = mapa
     def get_vizinhos(self, cidade_id):
         return self._mapa.get_vizinhos(cidade_id)
+    def sao_vizinhos(self, cidade1_id, cidade2_id):
+        return self._mapa.sao_vizinhos(cidade1_id, cidade2_id)
     def get_cidades(self):
         return self._mapa.cidades
     def get_arestas(self):
         return self._mapa.arestas
+    def get_cidades_do_dono(self, dono):
+        return list(self._mapa.get_cidades_do_dono(dono))
+    def get_tropas_em(self, cidade_id):
+        return [{"id": t.id, "dono": t.dono.id, "forca": t.forca, "localizacao": t.localizacao}
+                for t in self._mapa.get_tropas_em(cidade_id)]
     def get_lista_adjacencia(self):
         return self._mapa.lista_adjacencia
     def encontrar_caminho_bfs(self, inicio_id, fim_id):
         return self._mapa.encontrar_caminho_bfs(inicio_id, fim_id)
+    def encontrar_caminho_no_territorio(self, dono, inicio_id, fim_id):
+        return self._mapa.encontrar_caminho_no_territorio(dono, inicio_id, fim_id)
+    def distancia(self, inicio_id, fim_id):
+        return self._mapa.distancia(inicio_id, fim_id)
+    def proximo_passo(self, inicio_id, fim_id):
+        return self._mapa.proximo_passo(inicio_id, fim_id)
+
+def _fila(fila):
+    """Itens restantes de uma FilaCompacta, como tupla."""
+    return fila._itens[fila._inicio:] if fila._inicio else fila._itens
+
+class Instantaneo:
+    """
+    Estado completo de um Jogo em um turno (ver Jogo.snapshot), em tuplas planas e
+    imutáveis. A topologia não é copiada: o instantâneo guarda só a referência a ela,
+    então muitos instantâneos e forks do mesmo jogo compartilham o mapa estático.
+
+    As tropas ficam todas em 'tropas' e são referenciadas pela posição nessa tupla:
+    (id, dono, forca, localizacao, estado, alvo_de_ataque, sequencia, fila_de_comandos, caminho_atual).
+    """
+    __slots__ = ('topologia', 'turno_atual', 'turno_maximo', 'versao_do_estado', 'jogadores_derrotados',
+                 'suprimento_por_jogador', 'suprimento_estavel', 'populacoes', 'donos', 'estacionadas',
+                 'cidades_por_dono', 'cidades_sem_base_por_dono', 'versao_territorio', 'tropas_por_cidade',
+                 'jogadores', 'tropas')
+
+    def __init__(self, **campos):
+        for campo, valor in campos.items():
+            setattr(self, campo, valor)
+
+# Cópia do jogo de cada thread que monta estados de instantâneos, reaproveitada de um pedido para outro
+_COPIAS = threading.local()
+
+def _estado_do_instantaneo(instantaneo):
+    """Dicionário de Jogo.gerar_estado_json para um instantâneo, montado em uma cópia do jogo."""
+    jogo = getattr(_COPIAS, 'jogo', None)
+    if jogo is None:
+        jogo = _COPIAS.jogo = Jogo()
+        jogo.salvar_estados = False
+    jogo.restore(instantaneo)
+    return EstadoDoJogo(jogo).para_dict()
 
 class Jogo:
     """Classe principal da engine, gerencia a lógica e o estado do jogo."""
-    def __init__(self):
-        self.mapa = Mapa()
+    def __init__(self, eventos=None, gravador=None):
+        # Sem destinos, os eventos são descartados antes de serem montados (ver eventos.py)
+        self.eventos = eventos if eventos is not None else EmissorDeEventos()
+        # Os arquivos de estado são gravados em segundo plano (ver persistencia.py)
+        self.gravador = gravador if gravador is not None else GravadorDeEstados()
+        self.salvar_estados = True # Se False, a engine não grava os arquivos estado_turno_N.json
+        self.versao_do_estado = 0 # Incrementada sempre que a engine altera o jogo (ver EstadoDoJogo)
+        self._estados_entregues = [] # Referências fracas aos EstadoDoJogo desta versão (ver _alterar_estado)
+        self.mapa = Mapa(self.eventos)
         self.mapa_somente_leitura = MapaSomenteLeitura(self.mapa)
         self.jogadores = {}
         self.turno_atual = 0
         self.turno_maximo = 100
         self.jogadores_derrotados = [] # Para guardar qualquer jogador derrotado
+        self.suprimento_por_jogador = {} # jogador_id -> (versao do território, custo, cidades conectadas, arestas da MST)
+        self._suprimento_estavel = False # True se a última fase de suprimento não mudou dono de nenhuma cidade
+
+    @property
+    def turno_atual(self):
+        return self._turno_atual
+
+    @turno_atual.setter
+    def turno_atual(self, turno):
+        self._turno_atual = turno
+        self.eventos.turno = turno
 
     def carregar_mundo(self, mapa_json):
-        """Carrega a estrutura lógica do mundo a partir do JSON do gerador."""
-        with open(mapa_json, 'r') as f:
-            dados_mapa = json.load(f)
-            for cidade_data in dados_mapa.get('cidades', []):
-                # A engine agora ignora a informação de 'pos'
-                self.mapa.adicionar_cidade(Cidade(cidade_data['id'], cidade_data['populacao']))
-            for aresta_data in dados_mapa.get('arestas', []):
-                self.mapa.adicionar_aresta(aresta_data['de'], aresta_data['para'], aresta_data['peso'])
-            for adj in dados_mapa['lista_adjacencia']:
-                cidade = adj['cidade']
-                vizinhos = [(v['id'], v['peso']) for v in adj['vizinhos']]
-                self.mapa.lista_adjacencia[cidade] = vizinhos
+        """
+        Carrega o mundo a partir do JSON do gerador ou de um mapa compilado. A topologia
+        fica em cache (ver carregar_topologia): carregar de novo o mesmo arquivo não o relê.
+        """
+        self.mapa.usar_topologia(carregar_topologia(mapa_json, self.eventos))
 
-    def gerar_estado_json(self, nome_arquivo, salvar_arquivo=True, diretorio="estados"):
+    def reiniciar(self):
+        """Volta ao turno 0 no mesmo mapa, sem jogadores, reaproveitando a topologia já carregada."""
+        self._alterar_estado()
+        self.mapa.reiniciar()
+        self.jogadores = {}
+        self.turno_atual = 0
+        self.jogadores_derrotados = []
+        self.suprimento_por_jogador = {}
+        self._suprimento_estavel = False
+
+    def aplicar_ordens(self, ordens_por_jogador):
         """
-        Cria o dicionário com o estado completo do jogo e, opcionalmente, o salva.
-        Retorna o dicionário de estado.
-        """
-        # Estrutura principal do JSON de estado
-        estado_atual = {
-            "turno_atual": self.turno_atual,
-            "mapa": { "cidades": [], "arestas": [] },
-            "jogadores": [],
-            "tropas_em_campo": [],
-            "transportes": []
-        }
-
-        # Serializa a estrutura do mapa e coleta informações das cidades possuídas
-        cidades_possuidas_por_jogador = {j_id: [] for j_id in self.jogadores}
-
-        for cidade in self.mapa.cidades.values():
-            # Adiciona a cidade à lista do mapa no JSON
-            estado_atual["mapa"]["cidades"].append({
-                "id": cidade.id,
-                "populacao": cidade.populacao,
-                "dono": cidade.dono,
-                "tropas_estacionadas": [{"id": tropa.id, "forca": tropa.forca} for tropa in cidade.tropas_estacionadas]
-            })
-            # Ao mesmo tempo, se a cidade tiver um dono, adiciona à lista de contagem
-            if cidade.dono is not None and cidade.dono in cidades_possuidas_por_jogador:
-                cidades_possuidas_por_jogador[cidade.dono].append(cidade.id)
-
-        for aresta in self.mapa.arestas.values():
-            estado_atual["mapa"]["arestas"].append({
-                "de": aresta.cidades[0],
-                "para": aresta.cidades[1],
-                "peso": aresta.peso
-            })
-        
-        # Serializa os jogadores e suas unidades
+        Valida e injeta as ordens já interpretadas pelo parser ({jogador_id: {"novas_tropas": [...],
+        "transporte": [...]}}). As listas recebidas não são alteradas, então o mesmo conjunto de
+        ordens pode ser aplicado a vários jogos (ver modelo_de_avanco.py).
+        """
+        self._alterar_estado()
+        for jogador_id, ordens in ordens_por_jogador.items():
+            jogador = self.jogadores[jogador_id]
+
+            # Injeta ordens de novas tropas de forma segura
+            for ordem_tropa in ordens.get("novas_tropas", []):
+                forca_desejada = ordem_tropa['forca']
+                if jogador.tropas.contem_id(ordem_tropa['id']):
+                    self.eventos.emitir(TROPA_DUPLICADA, jogador=jogador_id, tropa=ordem_tropa['id'])
+                elif jogador.tropas_na_base >= forca_desejada:
+                    jogador.tropas_na_base -= forca_desejada
+                    nova_tropa = Tropa(
+                        id=ordem_tropa['id'], dono=jogador,
+                        forca=forca_desejada, fila_de_comandos=ordem_tropa['comandos']
+                    )
+                    self.adicionar_tropa(jogador, nova_tropa)
+                    self.eventos.emitir(TROPA_CRIADA, jogador=jogador_id, tropa=nova_tropa.id, forca=forca_desejada)
+                else:
+                    self.eventos.emitir(TROPAS_INSUFICIENTES, jogador=jogador_id, tropa=ordem_tropa['id'], forca=forca_desejada)
+
+            # Injeta ordens do transporte
+            ordem_transporte = ordens.get("transporte")
+            if ordem_transporte:
+                jogador.transporte.fila_de_comandos = ordem_transporte
+                comando_coleta = ordem_transporte[0] 
+                jogador.transporte.quantidade_solicitada = comando_coleta.get('quantidade', 'MAX')
+
+    def snapshot(self):
+        """
+        Instantâneo do estado atual (Instantaneo), para voltar a ele com restore ou
+        criar cópias independentes com fork. Custa O(cidades + tropas) e não copia o mapa estático.
+        """
+        mapa = self.mapa
+        topologia = mapa.congelar_topologia()
+        tropas, posicao = [], {}
+
+        def ref(tropa):
+            k = posicao.get(tropa)
+            if k is None:
+                k = posicao[tropa] = len(tropas)
+                tropas.append((tropa.id, tropa.dono.id, tropa.forca, tropa.localizacao, tropa._estado,
+                               tropa.alvo_de_ataque, tropa._sequencia, _fila(tropa._fila_de_comandos),
+                               _fila(tropa._caminho_atual)))
+            return k
+
+        jogadores = []
         for jogador in self.jogadores.values():
-            # Adiciona as informações do jogador
-            estado_atual["jogadores"].append({
-                "id": jogador.id,
-                "tropas_na_base": jogador.tropas_na_base,
-                "cidades_possuidas": cidades_possuidas_por_jogador[jogador.id]
-            })
-
-            # Adiciona as tropas em campo daquele jogador
-            for tropa in jogador.tropas:
-                estado_atual["tropas_em_campo"].append({
-                    "id": tropa.id,
-                    "dono": jogador.id,
-                    "forca": tropa.forca,
-                    "localizacao": tropa.localizacao
-                })
-            
-            # Adiciona o estado do transporte daquele jogador
+            registro, transporte = jogador.tropas, jogador.transporte
+            jogadores.append((
+                jogador.id, jogador.id_base, jogador.tropas_na_base, registro._proxima_sequencia,
+                tuple(ref(tropa) for tropa in registro._por_id.values()),
+                tuple(ref(tropa) for tropa in registro._estacionadas_com_comandos),
+                (transporte.localizacao, transporte.carga_populacao, transporte.estado, transporte.quantidade_solicitada,
+                 transporte.timer_respawn, _fila(transporte._fila_de_comandos), _fila(transporte._caminho_atual)),
+            ))
+        cidades = mapa.cidades.values()
+        return Instantaneo(
+            topologia=topologia,
+            turno_atual=self.turno_atual,
+            turno_maximo=self.turno_maximo,
+            versao_do_estado=self.versao_do_estado,
+            jogadores_derrotados=tuple(self.jogadores_derrotados),
+            suprimento_por_jogador=tuple(self.suprimento_por_jogador.items()),
+            suprimento_estavel=self._suprimento_estavel,
+            populacoes=tuple(cidade.populacao for cidade in cidades),
+            donos=tuple(cidade.dono for cidade in cidades),
+            estacionadas=tuple((cidade.id, tuple(ref(t) for t in cidade.tropas_estacionadas))
+                               for cidade in cidades if cidade.tropas_estacionadas),
+            cidades_por_dono=tuple((dono, tuple(ids)) for dono, ids in mapa.cidades_por_dono.items()),
+            cidades_sem_base_por_dono=tuple(mapa.cidades_sem_base_por_dono.items()),
+            versao_territorio=tuple(mapa.versao_territorio.items()),
+            tropas_por_cidade=tuple((cidade_id, tuple(ref(t) for t in tropas_na_cidade))
+                                    for cidade_id, tropas_na_cidade in mapa.tropas_por_cidade.items()),
+            jogadores=tuple(jogadores),
+            tropas=tuple(tropas),
+        )
+
+    def restore(self, instantaneo):
+        """Volta exatamente ao estado de um instantâneo (do próprio jogo ou de outro no mesmo mapa)."""
+        self._alterar_estado()
+        mapa = self.mapa
+        if mapa._topologia is not instantaneo.topologia:
+            mapa.usar_topologia(instantaneo.topologia)
+        for cidade, populacao, dono in zip(mapa.cidades.values(), instantaneo.populacoes, instantaneo.donos):
+            cidade.populacao = populacao
+            cidade.dono = dono
+            cidade.tropas_estacionadas = []
+
+        self.jogadores = {}
+        for jogador_id, id_base, tropas_na_base, _, _, _, estado_transporte in instantaneo.jogadores:
+            jogador = self.jogadores[jogador_id] = Jogador(jogador_id, id_base)
+            jogador.tropas_na_base = tropas_na_base
             transporte = jogador.transporte
-            estado_atual["transportes"].append({
-                "dono": jogador.id,
-                "localizacao": transporte.localizacao,
-                "carga_populacao": transporte.carga_populacao,
-                "estado": transporte.estado
-            })
+            (transporte.localizacao, transporte.carga_populacao, transporte.estado, transporte.quantidade_solicitada,
+             transporte.timer_respawn, fila, caminho) = estado_transporte
+            transporte._fila_de_comandos = FilaCompacta(fila)
+            transporte._caminho_atual = FilaCompacta(caminho)
+
+        # Tropas montadas direto nos slots, sem passar pelo __init__ e pelos setters
+        tropas = []
+        for tropa_id, dono, forca, localizacao, estado, alvo, sequencia, fila, caminho in instantaneo.tropas:
+            tropa = Tropa.__new__(Tropa)
+            tropa.id, tropa.dono, tropa.forca, tropa.localizacao = tropa_id, self.jogadores[dono], forca, localizacao
+            tropa._estado, tropa.alvo_de_ataque, tropa._sequencia, tropa._registro = estado, alvo, sequencia, None
+            tropa._fila_de_comandos = FilaCompacta(fila)
+            tropa._caminho_atual = FilaCompacta(caminho)
+            tropas.append(tropa)
+        for jogador_id, _, _, proxima_sequencia, registradas, estacionadas_com_comandos, _ in instantaneo.jogadores:
+            registro = self.jogadores[jogador_id].tropas
+            por_estado = registro._por_estado
+            for k in registradas:
+                tropa = tropas[k]
+                tropa._registro = registro
+                registro._por_id[tropa.id] = tropa
+                por_estado.setdefault(tropa._estado, {})[tropa] = None
+            registro._estacionadas_com_comandos = {tropas[k]: None for k in estacionadas_com_comandos}
+            registro._proxima_sequencia = proxima_sequencia
+        for cidade_id, refs in instantaneo.estacionadas:
+            mapa.cidades[cidade_id].tropas_estacionadas = [tropas[k] for k in refs]
+
+        mapa.rotas_por_dono = {}
+        mapa.cidades_por_dono = {dono: dict.fromkeys(ids) for dono, ids in instantaneo.cidades_por_dono}
+        mapa.cidades_sem_base_por_dono = dict(instantaneo.cidades_sem_base_por_dono)
+        mapa.versao_territorio = dict(instantaneo.versao_territorio)
+        mapa.tropas_por_cidade = {cidade_id: {tropas[k]: None for k in refs}
+                                  for cidade_id, refs in instantaneo.tropas_por_cidade}
+        grafo = mapa.grafo
+        mapa.dono_por_indice = [None] * len(grafo)
+        for cidade_id, dono in zip(mapa.cidades, instantaneo.donos):
+            mapa.dono_por_indice[grafo.indice[cidade_id]] = dono
+
+        self.turno_atual = instantaneo.turno_atual
+        self.turno_maximo = instantaneo.turno_maximo
+        self.jogadores_derrotados = list(instantaneo.jogadores_derrotados)
+        self.suprimento_por_jogador = dict(instantaneo.suprimento_por_jogador)
+        self._suprimento_estavel = instantaneo.suprimento_estavel
+        # A versão nunca volta atrás, nem ao restaurar um instantâneo antigo (ver EstadoDoJogo)
+        self.versao_do_estado = max(self.versao_do_estado, instantaneo.versao_do_estado) + 1
+
+    def fork(self, eventos=None):
+        """
+        Cópia independente do jogo no estado atual, para simular jogadas sem afetar este.
+        A cópia compartilha o mapa estático, não grava arquivos de estado e, sem 'eventos', fica em silêncio.
+        """
+        copia = Jogo(eventos)
+        copia.salvar_estados = False
+        copia.restore(self.snapshot())
+        return copia
+
+    def _alterar_estado(self):
+        """
+        Chamado antes de a engine mudar o jogo. Os EstadoDoJogo entregues e ainda vivos (de uma IA
+        que guardou o estado do turno, por exemplo) passam a ler de um instantâneo deste turno.
+        """
+        if self._estados_entregues:
+            vivos = [estado for estado in (referencia() for referencia in self._estados_entregues) if estado is not None]
+            if vivos:
+                instantaneo = self.snapshot()
+                for estado in vivos:
+                    estado._congelar(instantaneo)
+            self._estados_entregues = []
+        self.versao_do_estado += 1
+
+    def estado_do_jogo(self, materializado=None):
+        """
+        Estado atual para as IAs, montado sob demanda (ver estado_do_jogo.py).
+        'materializado' é o dicionário de gerar_estado_json, se ele já foi montado neste turno.
+        """
+        estado = EstadoDoJogo(self, materializado)
+        self._estados_entregues.append(weakref.ref(estado))
+        return estado
+
+    def gerar_estado_json(self, nome_arquivo, salvar_arquivo=True, diretorio="estados"):
+        """
+        Cria o dicionário com o estado completo do jogo e, opcionalmente, o salva.
+        Retorna o dicionário de estado. A gravação é feita pelo gravador em segundo
+        plano; use self.gravador.esperar() para garantir que os arquivos estão no disco.
+        """
+        # Estrutura principal do JSON de estado (a mesma que as IAs recebem, ver estado_do_jogo.py)
+        estado_atual = EstadoDoJogo(self).para_dict()
 
         # Salva o arquivo, se solicitado
         if salvar_arquivo:
-            os.makedirs(diretorio, exist_ok=True)
-            caminho_completo = os.path.join(diretorio, nome_arquivo)
-            with open(caminho_completo, 'w', encoding='utf-8') as f:
-                json.dump(estado_atual, f, indent=2)
-            print(f"Arquivo de estado '{caminho_completo}' gerado com sucesso.")
+            self.gravar_estado(nome_arquivo, diretorio)
 
         return estado_atual
+
+    def gravar_estado(self, nome_arquivo, diretorio="estados"):
+        """
+        Grava o estado atual em segundo plano, sem montar o dicionário aqui. O gravador recebe
+        um instantâneo, imutável, e monta o dicionário na sua thread, a partir dele: o
+        dicionário de gerar_estado_json pode ser alterado por quem o recebe (as IAs).
+        """
+        caminho_completo = os.path.join(diretorio, nome_arquivo)
+        self.gravador.gravar(caminho_completo, functools.partial(_estado_do_instantaneo, self.snapshot()))
+        self.eventos.emitir(ESTADO_SALVO, arquivo=caminho_completo)
     
     def verificar_vencedor(self, anunciar_fim=False):
         """
@@ -238,11 +973,8 @@ class Jogo:
             jogo_terminou = True
             motivo = "Fim de jogo por tempo! "
             
-            contagem_cidades = {j.id: 0 for j in jogadores_ativos}
-            for cidade in self.mapa.cidades.values():                
-                # Só conta a cidade se ela tiver um dono E se o ID dela NÃO contiver "base"
-                if cidade.dono in contagem_cidades and "base" not in cidade.id:
-                    contagem_cidades[cidade.dono] += 1
+            # Só conta as cidades cujo ID NÃO contém "base"
+            contagem_cidades = {j.id: self.mapa.contar_cidades(j.id, incluir_bases=False) for j in jogadores_ativos}
 
             # Soma total de cidades para verificar empate            
             soma_total_de_cidades = sum(contagem_cidades.values())
@@ -261,7 +993,7 @@ class Jogo:
                     motivo += f"EMPATE! Os jogadores {possiveis_vencedores} terminaram com {max_cidades} cidades."
 
         if jogo_terminou and anunciar_fim:
-            print(motivo)
+            self.eventos.emitir(FIM_DE_JOGO, motivo=motivo)
 
         if vencedor_final:
             return vencedor_final.id
@@ -270,17 +1002,47 @@ class Jogo:
         else:
             return None
 
-    def _iniciar_recuo_forcado(self, tropa, motivo):
+    def adicionar_tropa(self, jogador, tropa):
+        """Coloca uma nova tropa em campo para o jogador."""
+        self._alterar_estado()
+        jogador.tropas.append(tropa)
+        self.mapa.registrar_tropa(tropa)
+
+    def _remover_tropa(self, tropa):
+        """Retira uma tropa do jogo (da lista do dono e do índice de localização)."""
+        tropa.dono.tropas.remove(tropa)
+        self.mapa.remover_tropa(tropa)
+
+    def _remover_todas_as_tropas(self, jogador):
+        for tropa in jogador.tropas:
+            self.mapa.remover_tropa(tropa)
+        jogador.tropas.clear()
+
+    def _calcular_rota(self, jogador, inicio_id, fim_id):
+        """
+        Calcula a rota de uma unidade que não pode atravessar território alheio.
+        Prefere o caminho que fica dentro das cidades do jogador e, se ele não
+        existir, usa o caminho mais curto sem restrições (a unidade será barrada
+        no meio do caminho, como antes).
+        """
+        caminho = self.mapa.encontrar_caminho_no_territorio(jogador.id, inicio_id, fim_id)
+        if caminho is None:
+            caminho = self.mapa.encontrar_caminho_bfs(inicio_id, fim_id)
+        return caminho
+
+    def _iniciar_recuo_forcado(self, tropa, motivo, **dados_do_motivo):
         """
         Interrompe a ação atual de uma tropa e a força a recuar para a base.
+        'motivo' é um dos MOTIVO_* de eventos.py, com os seus dados (a cidade, por exemplo).
         """
-        print(f"RECUO FORÇADO para Tropa {tropa.id}! Motivo: {motivo}")
+        self.eventos.emitir(RECUO, tropa=tropa.id, motivo=motivo, **dados_do_motivo)
 
         # Limpa todos os planos antigos da tropa
         tropa.fila_de_comandos.clear()
         tropa.caminho_atual.clear()
         
-        # Calcula o novo caminho de volta para a base
+        # Calcula o novo caminho de volta para a base. Tropas recuando não são barradas
+        # por cidades alheias, então vale o caminho mais curto sem restrições.
         caminho_de_volta = self.mapa.encontrar_caminho_bfs(tropa.localizacao, tropa.dono.id_base)
 
         if caminho_de_volta:
@@ -290,61 +1052,84 @@ class Jogo:
         else:
             # Se não houver caminho (tropa está isolada), ela fica encurralada
             tropa.estado = 'encurralada'
-            print(f"ALERTA: Tropa {tropa.id} está encurralada em {tropa.localizacao} e não pode recuar!")
+            self.eventos.emitir(ENCURRALADA, tropa=tropa.id, cidade=tropa.localizacao)
 
     def _calcular_mst_prim(self, jogador):
         """
         Calcula a Árvore Geradora Mínima (MST) que conecta as cidades de um jogador,
-        usando o Algoritmo de Prim. Retorna o custo total da manutenção e o 
-        conjunto de cidades que estão efetivamente conectadas à base.
+        usando o Algoritmo de Prim. Retorna o custo total da manutenção, o 
+        conjunto de cidades que estão efetivamente conectadas à base e as arestas da árvore.
         """
         mapa = self.mapa
         jogador_id = jogador.id
         id_base = jogador.id_base
 
         # Copia todas as cidades do jogador, incluindo a base
-        cidades_do_jogador = {c.id for c in mapa.cidades.values() if c.dono == jogador_id}
+        cidades_do_jogador = set(mapa.get_cidades_do_dono(jogador_id))
         cidades_do_jogador.add(id_base)
 
         if len(cidades_do_jogador) <= 1:
-            return 0, cidades_do_jogador
-        
+            return 0, cidades_do_jogador, []
+
+        # O Prim roda sobre os índices inteiros do núcleo CSR
+        grafo = mapa.grafo
+        ids = grafo.ids
+        base = grafo.indice.get(id_base)
+        if base is None:
+            return 0, {id_base}, []
+        membros = {grafo.indice[c] for c in cidades_do_jogador}
+
         custo_total = 0
-        cidades_conectadas = {id_base}
+        conectadas = {base}
+        arestas_da_arvore = []
         fronteira = []
 
         push = heapq.heappush
         pop = heapq.heappop
 
-        # Pré-carrega vizinhos e arestas iniciais pra evitar lookup desnecessário
-        for vizinho_id in mapa.get_vizinhos(id_base):
-            if vizinho_id in cidades_do_jogador:
-                aresta = mapa.get_aresta(id_base, vizinho_id)
-                if aresta:
-                    push(fronteira, (aresta.peso, id_base, vizinho_id))
+        # As linhas do CSR já estão ordenadas por peso (uma vez por topologia).
+        # Cada cidade conectada mantém na fronteira só a sua aresta candidata mais barata,
+        # então a fila de prioridade tem no máximo uma entrada por cidade conectada.
+        inicio = grafo.inicio
+        vizinhos_por_peso = grafo.vizinhos_por_peso
+        pesos_por_peso = grafo.pesos_por_peso
+        proxima_candidata = {}
+
+        def empurrar_candidata(origem):
+            k = proxima_candidata.get(origem, inicio[origem])
+            fim = inicio[origem + 1]
+            while k < fim:
+                vizinho = vizinhos_por_peso[k]
+                if vizinho in membros and vizinho not in conectadas:
+                    push(fronteira, (pesos_por_peso[k], origem, vizinho))
+                    break
+                k += 1
+            proxima_candidata[origem] = k
 
-        while fronteira and len(cidades_conectadas) < len(cidades_do_jogador):
-            peso, _, destino = pop(fronteira)
+        empurrar_candidata(base)
 
-            if destino in cidades_conectadas:
-                continue
+        while fronteira and len(conectadas) < len(membros):
+            peso, origem, destino = pop(fronteira)
 
-            cidades_conectadas.add(destino)
-            custo_total += peso
+            if destino not in conectadas:
+                conectadas.add(destino)
+                custo_total += peso
+                arestas_da_arvore.append((ids[origem], ids[destino], peso))
+                empurrar_candidata(destino)
 
-            for vizinho_id in mapa.get_vizinhos(destino):
-                if vizinho_id in cidades_do_jogador and vizinho_id not in cidades_conectadas:
-                    aresta = mapa.get_aresta(destino, vizinho_id)
-                    if aresta:
-                        push(fronteira, (aresta.peso, destino, vizinho_id))
+            # A candidata da origem foi usada (ou ficou obsoleta): passa para a próxima
+            proxima_candidata[origem] += 1
+            empurrar_candidata(origem)
 
-        return custo_total, cidades_conectadas
+        return custo_total, {ids[i] for i in conectadas}, arestas_da_arvore
 
     def _executar_fase_de_custo_e_suprimento(self):
         """
         Verifica a conectividade do império de cada jogador e calcula os custos.
         """
-        print("\n--- Fase de Custo e Suprimento ---")
+        self.eventos.emitir(FASE, fase="Fase de Custo e Suprimento")
+        versoes_antes = dict(self.mapa.versao_territorio)
+        derrotados_antes = len(self.jogadores_derrotados)
         for jogador in self.jogadores.values():
             if jogador.id in self.jogadores_derrotados:
                 continue
@@ -352,71 +1137,78 @@ class Jogo:
             # Calcula a MST e verifica a conectividade
             cidades_sem_tropas = []
             
-            cidades_possuidas_antes = {c.id for c in self.mapa.cidades.values() if c.dono == jogador.id}
+            cidades_possuidas_antes = set(self.mapa.get_cidades_do_dono(jogador.id))
             for cidade_id in cidades_possuidas_antes:
                 tropas_estacionadas = self.mapa.cidades[cidade_id].tropas_estacionadas
                 if tropas_estacionadas:
                     break
                 cidades_sem_tropas.append(cidade_id)
-                for tropa in jogador.tropas:
-                    if tropa.localizacao == cidade_id:
-                        cidades_sem_tropas.remove(cidade_id)
-                        break
+                if any(tropa.dono is jogador for tropa in self.mapa.get_tropas_em(cidade_id)):
+                    cidades_sem_tropas.remove(cidade_id)
             
             if f"basej_{jogador.id}" in cidades_sem_tropas:
                 cidades_sem_tropas.remove(f"basej_{jogador.id}")
 
             for cidade_id in cidades_sem_tropas:
-                self.mapa.cidades[cidade_id].dono = None  # Neutraliza a cidade
+                self.mapa.definir_dono(cidade_id, None)  # Neutraliza a cidade
                 cidades_possuidas_antes.remove(cidade_id)
             
-            custo_total_manutencao, cidades_conectadas = self._calcular_mst_prim(jogador)   
+            # A árvore de suprimento só é recalculada se o território do jogador mudou
+            versao_territorio = self.mapa.versao_territorio.get(jogador.id, 0)
+            suprimento = self.suprimento_por_jogador.get(jogador.id)
+            if suprimento is None or suprimento[0] != versao_territorio:
+                suprimento = (versao_territorio,) + self._calcular_mst_prim(jogador)
+                self.suprimento_por_jogador[jogador.id] = suprimento
+            _, custo_total_manutencao, cidades_conectadas, _ = suprimento
                     
-            print(f"Jogador {jogador.id}: Custo total de manutenção = {custo_total_manutencao} (Cidades conectadas: {cidades_conectadas})")
+            self.eventos.emitir(CUSTO_DE_SUPRIMENTO, jogador=jogador.id, custo=custo_total_manutencao, conectadas=cidades_conectadas)
             # Identifica e neutraliza cidades isoladas
             cidades_isoladas = cidades_possuidas_antes - cidades_conectadas
             for cidade_id in cidades_isoladas:
                 cidade = self.mapa.cidades[cidade_id]
-                print(f"ALERTA: Cidade {cidade.id} do jogador {jogador.id} ficou isolada e se tornou neutra!")
-                cidade.dono = None
+                self.eventos.emitir(ISOLAMENTO, cidade=cidade.id, jogador=jogador.id)
+                self.mapa.definir_dono(cidade_id, None)
                 # Tropas estacionadas são dadas como perdidas
                 for tropa in cidade.tropas_estacionadas:
-                    jogador.tropas.remove(tropa) # Remove da lista geral de tropas para não contar mais
+                    self._remover_tropa(tropa) # Remove da lista geral de tropas para não contar mais
                 cidade.tropas_estacionadas.clear()
 
             # Calcula o custo final e o debita da base
             custo_do_turno = custo_total_manutencao // 100
-            print(f"Jogador {jogador.id}: Custo de manutenção do império = {custo_do_turno}")
+            self.eventos.emitir(CUSTO_DO_TURNO, jogador=jogador.id, custo=custo_do_turno)
             jogador.tropas_na_base -= custo_do_turno
 
             # Verifica a condição de derrota por falência
             if jogador.tropas_na_base <= 0:
-                print(f"DERROTA: Jogador {jogador.id} foi à falência (tropas na base <= 0)!")
+                self.eventos.emitir(FALENCIA, jogador=jogador.id)
                 self.jogadores_derrotados.append(jogador.id)
                 # Neutraliza todas as cidades do jogador derrotado
                 for cidade_id in cidades_conectadas: # Apenas as que ainda eram dele
-                     self.mapa.cidades[cidade_id].dono = None
+                     self.mapa.definir_dono(cidade_id, None)
                 # Remove todas as tropas do jogador
-                jogador.tropas.clear()
+                self._remover_todas_as_tropas(jogador)
+
+        self._suprimento_estavel = (versoes_antes == self.mapa.versao_territorio
+                                    and derrotados_antes == len(self.jogadores_derrotados))
 
     def _resolver_combate_neutro(self, cidade, forca_total_atacante, tropa_lider):
         """Resolve o combate contra uma cidade neutra. As regras são diferentes de um combate normal."""
         defesa_total = cidade.populacao
-        print(f"Tentativa de conquista em {cidade.id} (Neutra): Força da Tropa({forca_total_atacante}) vs População({defesa_total})")
+        self.eventos.emitir(TENTATIVA_DE_CONQUISTA, cidade=cidade.id, forca=forca_total_atacante, populacao=defesa_total)
 
         # Sucesso: A força do atacante deve ser maior ou igual à população.
         if forca_total_atacante >= defesa_total:
-            print(f"Vitória! Jogador {tropa_lider.dono.id} conquistou {cidade.id}!")
+            self.eventos.emitir(CONQUISTA, jogador=tropa_lider.dono.id, cidade=cidade.id, tropa=tropa_lider.id)
             # A cidade assume novo dono
-            cidade.dono = tropa_lider.dono.id
+            self.mapa.definir_dono(cidade.id, tropa_lider.dono.id)
             # Muda o estado para tratar na Etapa 4
             tropa_lider.estado = 'vitoriosa'
-            tropa_lider.localizacao = cidade.id  # Atualiza a localização da tropa
+            self.mapa.mover_tropa(tropa_lider, cidade.id)  # Atualiza a localização da tropa
 
         # Falha: A força do atacante é insuficiente.
         else:
-            print(f"Falha na conquista! A força da Tropa {tropa_lider.id} ({forca_total_atacante}) é insuficiente para dominar {cidade.id}.")
-            self._iniciar_recuo_forcado(tropa_lider, f"força insuficiente para conquistar a cidade neutra {cidade.id}")
+            self.eventos.emitir(CONQUISTA_FALHOU, tropa=tropa_lider.id, forca=forca_total_atacante, cidade=cidade.id)
+            self._iniciar_recuo_forcado(tropa_lider, MOTIVO_FORCA_INSUFICIENTE, cidade=cidade.id)
    
     def _resolver_combate_jogador(self, cidade, forca_total_atacante, tropa_atacante_lider, eh_base=False):
         """Resolve o combate contra uma cidade ocupada por outro jogador ou uma base."""
@@ -431,27 +1223,27 @@ class Jogo:
         # A penalidade de 50% só se aplica ao atacar a base
         if eh_base:
             forca_ataque_efetiva *= 0.5
-            print(f"Ataque à base! Força de ataque reduzida para {forca_ataque_efetiva}.")
+            self.eventos.emitir(ATAQUE_A_BASE, cidade=cidade.id, forca=forca_ataque_efetiva)
 
-        print(f"Combate em {cidade.id}: Ataque({forca_ataque_efetiva}) vs Defesa({defesa_total})")
+        self.eventos.emitir(COMBATE, cidade=cidade.id, ataque=forca_ataque_efetiva, defesa=defesa_total)
 
         if forca_ataque_efetiva > defesa_total: # Vitória do atacante
-            print(f"Vitória do jogador {tropa_atacante_lider.dono.id} em {cidade.id}!")
+            self.eventos.emitir(VITORIA_NO_COMBATE, jogador=tropa_atacante_lider.dono.id, cidade=cidade.id, tropa=tropa_atacante_lider.id)
             # Remove todas as tropas defensoras
             for tropa_defensora in defensores:
                 if tropa_defensora in tropa_defensora.dono.tropas:
-                    tropa_defensora.dono.tropas.remove(tropa_defensora)
+                    self._remover_tropa(tropa_defensora)
             cidade.tropas_estacionadas.clear()
             
-            cidade.dono = tropa_atacante_lider.dono.id
+            self.mapa.definir_dono(cidade.id, tropa_atacante_lider.dono.id)
             tropa_atacante_lider.forca -= defesa_total # Atacante perde força igual à defesa
             tropa_atacante_lider.estado = 'vitoriosa'
-            tropa_atacante_lider.localizacao = cidade.id  # Atualiza a localização da tropa
+            self.mapa.mover_tropa(tropa_atacante_lider, cidade.id)  # Atualiza a localização da tropa
 
         else: # Vitória do defensor
-            print(f"Defensores de {cidade.dono} venceram o ataque em {cidade.id}!")
+            self.eventos.emitir(DEFESA_VITORIOSA, jogador=cidade.dono, cidade=cidade.id, tropa=tropa_atacante_lider.id)
             # Remove a tropa atacante
-            tropa_atacante_lider.dono.tropas.remove(tropa_atacante_lider)
+            self._remover_tropa(tropa_atacante_lider)
             
             # Defensores perdem força
             dano_sofrido = forca_ataque_efetiva
@@ -466,17 +1258,16 @@ class Jogo:
 
     def _executar_fase_de_combates(self):
         """Coleta todos os ataques do turno e os resolve."""
-        print("\n--- Fase de Resolução de Combates ---")
+        self.eventos.emitir(FASE, fase="Fase de Resolução de Combates")
         ataques_por_cidade = {}
 
         # 1. Coleta e agrupa todos os ataques
         for jogador in self.jogadores.values():
-            for tropa in jogador.tropas:
-                if tropa.estado == 'atacando':
-                    alvo_id = tropa.alvo_de_ataque
-                    if alvo_id not in ataques_por_cidade:
-                        ataques_por_cidade[alvo_id] = []
-                    ataques_por_cidade[alvo_id].append(tropa)
+            for tropa in jogador.tropas.no_estado('atacando'):
+                alvo_id = tropa.alvo_de_ataque
+                if alvo_id not in ataques_por_cidade:
+                    ataques_por_cidade[alvo_id] = []
+                ataques_por_cidade[alvo_id].append(tropa)
         
         # 2. Resolve os combates cidade por cidade
         for cidade_id, lista_de_atacantes in ataques_por_cidade.items():
@@ -486,7 +1277,7 @@ class Jogo:
 
             # Destrói as outras tropas atacantes (elas se fundem na tropa líder)
             for tropa in lista_de_atacantes[1:]:
-                tropa.dono.tropas.remove(tropa)
+                self._remover_tropa(tropa)
 
             if cidade.dono is None:
                 self._resolver_combate_neutro(cidade, forca_total_atacante, tropa_lider)
@@ -497,66 +1288,65 @@ class Jogo:
 
     def _executar_fase_pos_combate(self):
         """Processa as ações das tropas vitoriosas."""
-        print("\n--- Fase de Pós-Combate ---")
+        self.eventos.emitir(FASE, fase="Fase de Pós-Combate")
         for jogador in self.jogadores.values():
-            for tropa in list(jogador.tropas):
-                if tropa.estado == 'vitoriosa':
-                    proximo_comando = tropa.fila_de_comandos[0] if tropa.fila_de_comandos else None
-                    
-                    if proximo_comando and proximo_comando['tipo'] == 'PERMANECER':
-                        tropa.fila_de_comandos.pop(0)  # Consome o comando
-                        cidade_conquistada = self.mapa.cidades[tropa.localizacao]
-                        if tropa not in cidade_conquistada.tropas_estacionadas:
-                            tropa.estado = 'estacionada'
-                            cidade_conquistada.tropas_estacionadas.append(tropa)
-                            print(f"Tropa {tropa.id} venceu e permaneceu em {tropa.localizacao}.")
-                        else:
-                            print(f"AVISO: Tropa {tropa.id} já está estacionada em {tropa.localizacao}.")
+            for tropa in jogador.tropas.no_estado('vitoriosa'):
+                proximo_comando = tropa.fila_de_comandos[0] if tropa.fila_de_comandos else None
+                
+                if proximo_comando and proximo_comando.tipo == PERMANECER:
+                    tropa.fila_de_comandos.popleft()  # Consome o comando
+                    cidade_conquistada = self.mapa.cidades[tropa.localizacao]
+                    if tropa not in cidade_conquistada.tropas_estacionadas:
+                        tropa.estado = 'estacionada'
+                        cidade_conquistada.tropas_estacionadas.append(tropa)
+                        self.eventos.emitir(PERMANENCIA_APOS_VITORIA, tropa=tropa.id, cidade=tropa.localizacao)
                     else:
-                        # Se não houver comando ou não for PERMANECER, a tropa recua (raid)
-                        print(f"Tropa {tropa.id} venceu (raid) e iniciará o recuo.")
-                        self._iniciar_recuo_forcado(tropa, "ataque 'raid' concluído")
+                        self.eventos.emitir(JA_ESTACIONADA, tropa=tropa.id, cidade=tropa.localizacao)
+                else:
+                    # Se não houver comando ou não for PERMANECER, a tropa recua (raid)
+                    self.eventos.emitir(RAID_VITORIOSO, tropa=tropa.id, cidade=tropa.localizacao)
+                    self._iniciar_recuo_forcado(tropa, MOTIVO_RAID_CONCLUIDO)
 
     def _processar_movimento_tropas(self, jogador):
         """Processa os movimentos e comandos de todas as tropas de um jogador."""
-        # Iterar sobre uma cópia da lista é mais seguro
-        for tropa in list(jogador.tropas): 
+        # Só as tropas com algo a fazer (em trânsito ou com comandos na fila), já copiadas em uma lista
+        for tropa in jogador.tropas.com_movimento_pendente():
             # Lógica de movimento para tropas que já estão em um caminho
             if tropa.estado in ['movendo', 'recuando']:
                 if tropa.caminho_atual:
-                    proximo_passo = tropa.caminho_atual.pop(0)
+                    proximo_passo = tropa.caminho_atual.popleft()
                     
                     aresta = self.mapa.get_aresta(tropa.localizacao, proximo_passo)
                     cidade_destino = self.mapa.cidades[proximo_passo]
                     
                     # Validações de movimento...
                     if tropa.estado == 'movendo' and cidade_destino.dono != jogador.id and cidade_destino.id != jogador.id_base:
-                        self._iniciar_recuo_forcado(tropa, f"encontrou cidade inimiga/neutra em {proximo_passo}")
+                        self._iniciar_recuo_forcado(tropa, MOTIVO_CIDADE_NO_CAMINHO, cidade=proximo_passo)
                         continue
                     
                     if tropa.estado == 'movendo' and tropa.forca > aresta.peso:
-                        self._iniciar_recuo_forcado(tropa, f"é muito grande para a aresta para {proximo_passo}")
+                        self._iniciar_recuo_forcado(tropa, MOTIVO_ARESTA_ESTREITA, cidade=proximo_passo)
                         continue
                     
-                    tropa.localizacao = proximo_passo
-                    print(f"Tropa {tropa.id} ({tropa.estado}) moveu-se para {tropa.localizacao}")
+                    self.mapa.mover_tropa(tropa, proximo_passo)
+                    self.eventos.emitir(MOVIMENTO, tropa=tropa.id, estado=tropa.estado, cidade=tropa.localizacao)
                 
                 if not tropa.caminho_atual:
                     # Verifica se a tropa recuou para a base
                     if tropa.estado == 'recuando' and tropa.localizacao == jogador.id_base:
                         jogador.tropas_na_base += tropa.forca
-                        print(f"Tropa {tropa.id} retornou à base e foi convertida em tropas na base (+{tropa.forca}).")
-                        jogador.tropas.remove(tropa)
+                        self.eventos.emitir(RETORNO_A_BASE, tropa=tropa.id, jogador=jogador.id, forca=tropa.forca)
+                        self._remover_tropa(tropa)
                     else:
                         tropa.estado = 'ociosa'
-                        print(f"Tropa {tropa.id} chegou ao seu destino.")
+                        self.eventos.emitir(CHEGADA, tropa=tropa.id, cidade=tropa.localizacao)
                         cidade_atual = self.mapa.cidades[tropa.localizacao]
                         if tropa not in cidade_atual.tropas_estacionadas:
                             tropa.estado = 'estacionada'
                             cidade_atual.tropas_estacionadas.append(tropa)
-                            print(f"Tropa {tropa.id} agora está estacionada em {tropa.localizacao}.")
+                            self.eventos.emitir(ESTACIONAMENTO, tropa=tropa.id, cidade=tropa.localizacao)
                         else:
-                            print(f"AVISO: Tropa {tropa.id} já está estacionada em {tropa.localizacao}.")
+                            self.eventos.emitir(JA_ESTACIONADA, tropa=tropa.id, cidade=tropa.localizacao)
             
             # Lógica para tropas ociosas que têm novos comandos para executar
             elif tropa.estado == 'ociosa' and tropa.fila_de_comandos:
@@ -565,53 +1355,54 @@ class Jogo:
                     if tropa in cidade_atual.tropas_estacionadas:
                         cidade_atual.tropas_estacionadas.remove(tropa)
                 
-                comando_atual = tropa.fila_de_comandos.pop(0)
+                comando_atual = tropa.fila_de_comandos.popleft()
 
-                if comando_atual['tipo'] == 'MOVER':
-                    destino_final = comando_atual['alvo']
-                    print(f"Tropa {tropa.id} iniciando movimento de {tropa.localizacao} para {destino_final}")
-                    caminho = self.mapa.encontrar_caminho_bfs(tropa.localizacao, destino_final)
+                if comando_atual.tipo == MOVER:
+                    destino_final = comando_atual.alvo
+                    self.eventos.emitir(MOVIMENTO_INICIADO, tropa=tropa.id, origem=tropa.localizacao, destino=destino_final)
+                    caminho = self._calcular_rota(jogador, tropa.localizacao, destino_final)
                     if caminho and len(caminho) > 1:
                         tropa.caminho_atual = caminho[1:]
                         tropa.estado = 'movendo'
                     else:
-                        tropa.fila_de_comandos.insert(0, comando_atual)
-                        print(f"AVISO: Tropa {tropa.id} não pôde iniciar movimento para {destino_final}.")
+                        tropa.fila_de_comandos.appendleft(comando_atual)
+                        self.eventos.emitir(MOVIMENTO_SEM_ROTA, tropa=tropa.id, origem=tropa.localizacao, destino=destino_final)
 
-                elif comando_atual['tipo'] == 'ATACAR':
-                    alvo_id = comando_atual['alvo']
-                    if alvo_id in self.mapa.get_vizinhos(tropa.localizacao):
+                elif comando_atual.tipo == ATACAR:
+                    alvo_id = comando_atual.alvo
+                    if self.mapa.sao_vizinhos(tropa.localizacao, alvo_id):
                         tropa.estado = 'atacando'
                         tropa.alvo_de_ataque = alvo_id
-                        print(f"Tropa {tropa.id} está agora atacando {alvo_id}.")
+                        self.eventos.emitir(ATAQUE_ORDENADO, tropa=tropa.id, alvo=alvo_id)
                     else:
-                        print(f"ERRO: Tropa {tropa.id} tentou atacar {alvo_id} de {tropa.localizacao}, mas não é vizinho.")
+                        self.eventos.emitir(ATAQUE_INVALIDO, tropa=tropa.id, alvo=alvo_id, cidade=tropa.localizacao)
                 
-                elif comando_atual['tipo'] == 'PERMANECER':
+                elif comando_atual.tipo == PERMANECER:
                     cidade_atual = self.mapa.cidades[tropa.localizacao]
                     if tropa not in cidade_atual.tropas_estacionadas:
                         tropa.estado = 'estacionada'
                         cidade_atual.tropas_estacionadas.append(tropa)
-                        print(f"Tropa {tropa.id} agora está estacionada em {tropa.localizacao}.")
+                        self.eventos.emitir(ESTACIONAMENTO, tropa=tropa.id, cidade=tropa.localizacao)
                     else:
-                        print(f"AVISO: Tropa {tropa.id} já está estacionada em {tropa.localizacao}.")
+                        self.eventos.emitir(JA_ESTACIONADA, tropa=tropa.id, cidade=tropa.localizacao)
 
-                elif comando_atual['tipo'] == 'RECUAR':
-                    print(f"Tropa {tropa.id} iniciando recuo voluntário de {tropa.localizacao}.")
-                    self._iniciar_recuo_forcado(tropa, "ordem de recuo do jogador")
+                elif comando_atual.tipo == RECUAR:
+                    self.eventos.emitir(RECUO_VOLUNTARIO, tropa=tropa.id, cidade=tropa.localizacao)
+                    self._iniciar_recuo_forcado(tropa, MOTIVO_ORDEM_DE_RECUO)
             
             elif tropa.estado == 'estacionada' and tropa.fila_de_comandos:
+                comando_atual = tropa.fila_de_comandos[0]
+
+                if comando_atual.tipo in (MOVER, ATACAR, PERMANECER):
+                    self.eventos.emitir(COMANDO_INVALIDO, tropa=tropa.id, comando=comando_atual.tipo)
+                    tropa.fila_de_comandos = ()  # Recoloca o comando na fila
                 
-                if comando_atual['tipo'] in ['MOVER', 'ATACAR', 'PERMANECER']:
-                    print(f"AVISO: Tropa {tropa.id} está estacionada e não pode executar o comando {comando_atual['tipo']}.")
-                    tropa.fila_de_comandos = []  # Recoloca o comando na fila
-                
-                elif comando_atual['tipo'] == 'RECUAR':
+                elif comando_atual.tipo == RECUAR:
                     cidade_atual = self.mapa.cidades[tropa.localizacao]
                     if tropa in cidade_atual.tropas_estacionadas:
                         cidade_atual.tropas_estacionadas.remove(tropa)
-                    print(f"Tropa {tropa.id} iniciando recuo voluntário de {tropa.localizacao}.")
-                    self._iniciar_recuo_forcado(tropa, "ordem de recuo do jogador")
+                    self.eventos.emitir(RECUO_VOLUNTARIO, tropa=tropa.id, cidade=tropa.localizacao)
+                    self._iniciar_recuo_forcado(tropa, MOTIVO_ORDEM_DE_RECUO)
                     
 
     def _processar_movimento_transporte(self, jogador):
@@ -623,7 +1414,7 @@ class Jogo:
             if transporte.timer_respawn <= 0:
                 transporte.estado = 'ocioso'
                 transporte.localizacao = jogador.id_base
-                print(f"Transporte do jogador {jogador.id} foi reconstruído na base.")
+                self.eventos.emitir(TRANSPORTE_RECONSTRUIDO, jogador=jogador.id)
             return # Pula o resto da lógica para este transporte
 
         if transporte.estado == 'ocioso' and transporte.fila_de_comandos:
@@ -631,23 +1422,24 @@ class Jogo:
                 comando_coleta = transporte.fila_de_comandos[0]
                 comando_entrega = transporte.fila_de_comandos[1]
                 
-                origem_coleta = comando_coleta['alvo']
-                destino_final = comando_entrega['alvo']
+                origem_coleta = comando_coleta.alvo
+                destino_final = comando_entrega.alvo
 
-                print(f"Transporte de {jogador.id} iniciando missão: coletar em {origem_coleta} e levar para {destino_final}.")
+                self.eventos.emitir(TRANSPORTE_EM_MISSAO, jogador=jogador.id, origem=origem_coleta, destino=destino_final)
                 
-                caminho = self.mapa.encontrar_caminho_bfs(transporte.localizacao, origem_coleta)
+                caminho = self._calcular_rota(jogador, transporte.localizacao, origem_coleta)
                 if caminho and len(caminho) > 1:
                     transporte.caminho_atual = caminho[1:]
                     transporte.estado = 'indo_coletar'
                 else:
-                    print(f"AVISO: Transporte não encontrou caminho para a coleta em {origem_coleta}.")
+                    self.eventos.emitir(TRANSPORTE_SEM_ROTA, jogador=jogador.id, origem=origem_coleta)
                     transporte.fila_de_comandos.clear()
 
         if transporte.estado in ['indo_coletar', 'transportando', 'retornando']:
-            print(f"Processando transporte de {jogador.id} ({transporte.estado}) no caminho {transporte.caminho_atual}.")
+            if self.eventos.ativo(TRANSPORTE_EM_CAMINHO):  # Evita copiar o caminho quando ninguém vai ler
+                self.eventos.emitir(TRANSPORTE_EM_CAMINHO, jogador=jogador.id, estado=transporte.estado, caminho=list(transporte.caminho_atual))
             if transporte.caminho_atual:
-                proximo_passo = transporte.caminho_atual.pop(0)
+                proximo_passo = transporte.caminho_atual.popleft()
                 
                 cidade_destino = self.mapa.cidades[proximo_passo]
                 if cidade_destino.dono != jogador.id:
@@ -655,18 +1447,18 @@ class Jogo:
                         perda = transporte.carga_populacao * 0.1
                         cidade_destino.populacao += perda
                         transporte.carga_populacao -= perda
-                        print(f"Transporte de {jogador.id} encontrou cidade neutra! Perdeu {perda} de população.")
-                        self._iniciar_retorno_transporte(transporte, "encontrou cidade neutra")
+                        self.eventos.emitir(TRANSPORTE_PERDEU_CARGA, jogador=jogador.id, cidade=proximo_passo, perda=perda)
+                        self._iniciar_retorno_transporte(transporte, MOTIVO_CIDADE_NEUTRA)
                     else: # Inimiga
                         cidade_destino.populacao += transporte.carga_populacao
                         transporte.carga_populacao = 0
                         transporte.estado = 'destruido'
                         transporte.timer_respawn = 2
-                        print(f"Transporte de {jogador.id} DESTRUÍDO por cidade inimiga! Carga perdida.")
+                        self.eventos.emitir(TRANSPORTE_DESTRUIDO, jogador=jogador.id, cidade=proximo_passo)
                     return # Interrompe o movimento
 
                 transporte.localizacao = proximo_passo
-                print(f"Transporte de {jogador.id} ({transporte.estado}) moveu-se para {transporte.localizacao}")
+                self.eventos.emitir(TRANSPORTE_MOVEU, jogador=jogador.id, estado=transporte.estado, cidade=transporte.localizacao)
             
             if not transporte.caminho_atual:
                 if transporte.estado == 'indo_coletar':
@@ -682,50 +1474,50 @@ class Jogo:
                     quantidade_coletada = min(cidade_origem.populacao, quantidade_a_coletar)
                     transporte.carga_populacao += quantidade_coletada
                     cidade_origem.populacao -= quantidade_coletada
-                    print(f"Transporte coletou {quantidade_coletada} de população em {cidade_origem.id}.")
+                    self.eventos.emitir(COLETA, jogador=jogador.id, quantidade=quantidade_coletada, cidade=cidade_origem.id)
                     
                     # Se a coleta foi bem-sucedida, consome o comando de COLETAR
-                    transporte.fila_de_comandos.pop(0) # Consome o comando de COLETAR
+                    transporte.fila_de_comandos.popleft() # Consome o comando de COLETAR
                     
                     if transporte.fila_de_comandos: # Verifica se há um próximo comando
                         comando_entrega = transporte.fila_de_comandos[0]
                         # Pega o destino do comando de ENTREGAR (que agora é o primeiro)
-                        destino_final = comando_entrega['alvo']
+                        destino_final = comando_entrega.alvo
                         
-                        caminho = self.mapa.encontrar_caminho_bfs(transporte.localizacao, destino_final)
+                        caminho = self._calcular_rota(jogador, transporte.localizacao, destino_final)
                         if caminho and len(caminho) > 1:
                             transporte.caminho_atual = caminho[1:]
                             transporte.estado = 'transportando'
                         else:
-                            self._iniciar_retorno_transporte(transporte, "não encontrou caminho para o destino")
+                            self._iniciar_retorno_transporte(transporte, MOTIVO_SEM_CAMINHO)
                     else:
-                        self._iniciar_retorno_transporte(transporte, "missão de coleta concluída")
+                        self._iniciar_retorno_transporte(transporte, MOTIVO_COLETA_CONCLUIDA)
 
                 elif transporte.estado == 'transportando':
                     cidade_destino = self.mapa.cidades[transporte.localizacao]
-                    print(f"Transporte entregou {transporte.carga_populacao} de população em {cidade_destino.id}.")
+                    self.eventos.emitir(ENTREGA, jogador=jogador.id, quantidade=transporte.carga_populacao, cidade=cidade_destino.id)
                     
                     if "base" in cidade_destino.id:
                         jogador.tropas_na_base += transporte.carga_populacao
-                        print(f"Jogador {jogador.id} converteu população em tropas! Total na base: {jogador.tropas_na_base:.0f}")
+                        self.eventos.emitir(CONVERSAO_EM_TROPAS, jogador=jogador.id, total=jogador.tropas_na_base)
                     else:
                         cidade_destino.populacao += transporte.carga_populacao
                     
                     transporte.carga_populacao = 0
-                    transporte.fila_de_comandos.pop(0) # Consome o comando de ENTREGAR
+                    transporte.fila_de_comandos.popleft() # Consome o comando de ENTREGAR
                     transporte.estado = 'ocioso'
                 
                 elif transporte.estado == 'retornando':
                     transporte.estado = 'ocioso'
-                    print(f"Transporte de {jogador.id} retornou à base.")
+                    self.eventos.emitir(TRANSPORTE_NA_BASE, jogador=jogador.id)
 
 
 
     def _iniciar_retorno_transporte(self, transporte, motivo):
         """Função auxiliar para forçar o retorno do transporte à base."""
-        print(f"Transporte de {transporte.dono.id} iniciando retorno à base. Motivo: {motivo}")
+        self.eventos.emitir(TRANSPORTE_RETORNANDO, jogador=transporte.dono.id, motivo=motivo)
         transporte.fila_de_comandos.clear()
-        caminho_de_volta = self.mapa.encontrar_caminho_bfs(transporte.localizacao, transporte.dono.id_base)
+        caminho_de_volta = self._calcular_rota(transporte.dono, transporte.localizacao, transporte.dono.id_base)
         if caminho_de_volta and len(caminho_de_volta) > 1:
             transporte.caminho_atual = caminho_de_volta[1:]
             transporte.estado = 'retornando'
@@ -757,10 +1549,7 @@ class Jogo:
             elif self.turno_atual >= self.turno_maximo:
                 motivo_fim_de_jogo = "Fim de jogo por tempo! "
                 
-                contagem_cidades = {j.id: 0 for j in jogadores_ativos}
-                for cidade in self.mapa.cidades.values():
-                    if cidade.dono in contagem_cidades:
-                        contagem_cidades[cidade.dono] += 1
+                contagem_cidades = {j.id: self.mapa.contar_cidades(j.id) for j in jogadores_ativos}
                 
                 if not contagem_cidades or max(contagem_cidades.values()) == 0:
                     motivo_fim_de_jogo += "EMPATE! Ninguém possuía cidades."
@@ -779,15 +1568,75 @@ class Jogo:
                 motivo_fim_de_jogo = "EMPATE! Todos os jogadores foram eliminados."
 
         if jogo_terminou:
-            print(motivo_fim_de_jogo)
-            self.gerar_estado_json(f"estado_final_turno_{self.turno_atual}.json")
+            self.eventos.emitir(FIM_DE_JOGO, motivo=motivo_fim_de_jogo)
+            if self.salvar_estados:
+                self.gravar_estado(f"estado_final_turno_{self.turno_atual}.json")
             return True # Sinaliza para o loop principal que o jogo acabou
 
         return False # O jogo continua
 
 
+    def turno_quieto(self):
+        """
+        Indica se o próximo turno só vai debitar o custo de manutenção: nenhuma tropa ou
+        transporte tem o que fazer e a última fase de suprimento não mudou nenhum dono,
+        então ela se repetiria igual (com o custo que já está em cache).
+        """
+        if not self._suprimento_estavel:
+            return False
+        for jogador in self.jogadores.values():
+            if jogador.id in self.jogadores_derrotados: continue
+            tropas = jogador.tropas
+            if tropas.no_estado('atacando') or tropas.no_estado('vitoriosa'):
+                return False
+            if not all(self._tropa_bloqueada(jogador, tropa) for tropa in tropas.com_movimento_pendente()):
+                return False
+            transporte = jogador.transporte
+            if transporte.estado != 'ocioso' or transporte.fila_de_comandos:
+                return False
+            suprimento = self.suprimento_por_jogador.get(jogador.id)
+            if suprimento is None or suprimento[0] != self.mapa.versao_territorio.get(jogador.id, 0):
+                return False
+        return True
+
+    def _tropa_bloqueada(self, jogador, tropa):
+        """
+        Tropa ociosa cuja próxima ordem é um movimento sem rota: a engine recoloca a ordem
+        na fila e nada muda, turno após turno, enquanto nenhum dono mudar.
+        """
+        if tropa.estado != 'ociosa' or tropa.fila_de_comandos[0].tipo != MOVER:
+            return False
+        caminho = self._calcular_rota(jogador, tropa.localizacao, tropa.fila_de_comandos[0].alvo)
+        return not (caminho and len(caminho) > 1)
+
+    def avancar_turnos_quietos(self, ate_turno):
+        """
+        Avança de uma vez, sem rodar as fases, os turnos em que só o custo de manutenção muda
+        (ver turno_quieto). Para antes de ate_turno, do turno máximo e do turno em que algum
+        jogador iria à falência, que deve rodar normalmente. Retorna quantos turnos avançou.
+        """
+        turnos = min(ate_turno, self.turno_maximo) - self.turno_atual
+        custos_do_turno = {}
+        for jogador in self.jogadores.values():
+            if jogador.id in self.jogadores_derrotados: continue
+            custo_do_turno = self.suprimento_por_jogador[jogador.id][1] // 100
+            custos_do_turno[jogador.id] = custo_do_turno
+            if custo_do_turno > 0:
+                turnos_ate_falencia = max(1, math.ceil(jogador.tropas_na_base / custo_do_turno))
+                turnos = min(turnos, turnos_ate_falencia - 1)
+
+        if turnos <= 0:
+            return 0
+        self._alterar_estado()
+        for jogador_id, custo_do_turno in custos_do_turno.items():
+            self.jogadores[jogador_id].tropas_na_base -= custo_do_turno * turnos
+        self.eventos.emitir(AVANCO_RAPIDO, de=self.turno_atual, ate=self.turno_atual + turnos - 1, custos=custos_do_turno)
+        self.turno_atual += turnos
+        return turnos
+
     def processar_turno(self):
-        print(f"\n--- Processando Turno {self.turno_atual} ---")
+        self.eventos.emitir(TURNO, turno=self.turno_atual)
+        self._alterar_estado()
         
         # Etapa 1: Processamento de comandos de tropas e transportes
         for jogador in self.jogadores.values():
@@ -815,5 +1664,6 @@ class Jogo:
                     return
 
         # Se ainda houver jogadores ativos, incrementa o turno e salva o estado atual
-        self.gerar_estado_json(f"estado_turno_{self.turno_atual}.json")
+        if self.salvar_estados:  # Sem gravação, o dicionário do estado nem é montado
+            self.gravar_estado(f"estado_turno_{self.turno_atual}.json")
         self.turno_atual += 1
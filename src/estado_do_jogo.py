@@ -0,0 +1,141 @@
+import copy
+from collections.abc import Mapping
+
+def _cidade(cidade):
+    return {
+        "id": cidade.id,
+        "populacao": cidade.populacao,
+        "dono": cidade.dono,
+        "tropas_estacionadas": [{"id": tropa.id, "forca": tropa.forca} for tropa in cidade.tropas_estacionadas]
+    }
+
+def _jogador(jogo, jogador):
+    return {
+        "id": jogador.id,
+        "tropas_na_base": jogador.tropas_na_base,
+        "cidades_possuidas": jogo.mapa.ordenar_como_no_mapa(jogo.mapa.get_cidades_do_dono(jogador.id))
+    }
+
+def _tropa(tropa):
+    return {"id": tropa.id, "dono": tropa.dono.id, "forca": tropa.forca, "localizacao": tropa.localizacao}
+
+def _transporte(jogador):
+    transporte = jogador.transporte
+    return {
+        "dono": jogador.id,
+        "localizacao": transporte.localizacao,
+        "carga_populacao": transporte.carga_populacao,
+        "estado": transporte.estado
+    }
+
+def _mapa(jogo):
+    return {
+        "cidades": [_cidade(cidade) for cidade in jogo.mapa.cidades.values()],
+        "arestas": [{"de": aresta.cidades[0], "para": aresta.cidades[1], "peso": aresta.peso}
+                    for aresta in jogo.mapa.arestas.values()]
+    }
+
+# Como montar cada chave do estado, na ordem em que aparecem no JSON
+_SECOES = {
+    "turno_atual": lambda jogo: jogo.turno_atual,
+    "mapa": _mapa,
+    "jogadores": lambda jogo: [_jogador(jogo, jogador) for jogador in jogo.jogadores.values()],
+    "tropas_em_campo": lambda jogo: [_tropa(tropa) for jogador in jogo.jogadores.values() for tropa in jogador.tropas],
+    "transportes": lambda jogo: [_transporte(jogador) for jogador in jogo.jogadores.values()],
+}
+
+class EstadoDoJogo(Mapping):
+    """
+    Estado do jogo entregue às IAs, com as mesmas chaves do dicionário de
+    Jogo.gerar_estado_json, mas montado sob demanda a partir da engine:
+    cada chave só é construída (e guardada) quando é lida pela primeira vez.
+
+    Os métodos auxiliares (jogador, cidade, cidades_do_dono, tropas_de,
+    transporte_de) usam os índices da engine e devolvem só o que foi pedido,
+    sem montar as listas completas.
+
+    O estado é sempre o do turno em que foi criado. Se ele ainda existe quando a
+    engine avança (uma IA que guarda o estado do turno anterior, por exemplo), a
+    engine o congela com um instantâneo do turno, e o que ainda não foi montado
+    passa a ser montado a partir dele. Copiado (copy.deepcopy) ou serializado
+    (pickle), vira o dicionário completo; para o json, use para_dict.
+    """
+    def __init__(self, jogo, materializado=None):
+        self._jogo = jogo
+        self._versao = jogo.versao_do_estado
+        self._instantaneo = None  # Instantâneo do turno, depois que a engine avançou (ver Jogo._alterar_estado)
+        # Se o dicionário completo já existe (por exemplo, porque foi salvo em arquivo), usa ele
+        self._secoes = materializado if materializado is not None else {}
+
+    def _congelar(self, instantaneo):
+        self._instantaneo = instantaneo
+
+    def _jogo_do_turno(self):
+        """O jogo no turno deste estado: o da engine ou, se ela já avançou, uma cópia montada do instantâneo."""
+        if self._instantaneo is not None:
+            copia = type(self._jogo)()
+            copia.salvar_estados = False
+            copia.restore(self._instantaneo)
+            self._jogo, self._instantaneo = copia, None
+            self._versao = copia.versao_do_estado
+        elif self._jogo.versao_do_estado != self._versao:
+            raise RuntimeError("Este estado é de um turno anterior; peça um novo estado à engine.")
+        return self._jogo
+
+    def __getitem__(self, chave):
+        secao = self._secoes.get(chave)
+        if secao is None and chave not in self._secoes:
+            construtor = _SECOES.get(chave)
+            if construtor is None:
+                raise KeyError(chave)
+            secao = self._secoes[chave] = construtor(self._jogo_do_turno())
+        return secao
+
+    def __iter__(self):
+        return iter(_SECOES)
+
+    def __len__(self):
+        return len(_SECOES)
+
+    def para_dict(self):
+        """Dicionário completo, no formato de Jogo.gerar_estado_json."""
+        return {chave: self[chave] for chave in _SECOES}
+
+    def __deepcopy__(self, memo):
+        return copy.deepcopy(self.para_dict(), memo)
+
+    def __reduce__(self):
+        return (dict, (self.para_dict(),))
+
+    def jogador(self, jogador_id):
+        """Informações de um jogador (id, tropas_na_base, cidades_possuidas), ou None."""
+        jogador = self._jogo_do_turno().jogadores.get(jogador_id)
+        return None if jogador is None else _jogador(self._jogo, jogador)
+
+    def cidade(self, cidade_id):
+        """Informações de uma cidade, ou None."""
+        cidade = self._jogo_do_turno().mapa.cidades.get(cidade_id)
+        return None if cidade is None else _cidade(cidade)
+
+    def cidades_do_dono(self, dono):
+        """Cidades de um dono (None para as neutras), na ordem do mapa."""
+        jogo = self._jogo_do_turno()
+        mapa = jogo.mapa
+        if dono is None:
+            return [_cidade(cidade) for cidade in mapa.cidades.values() if cidade.dono is None]
+        return [_cidade(mapa.cidades[cidade_id])
+                for cidade_id in mapa.ordenar_como_no_mapa(mapa.get_cidades_do_dono(dono))]
+
+    def tropas_de(self, jogador_id):
+        """Tropas em campo de um jogador."""
+        jogador = self._jogo_do_turno().jogadores.get(jogador_id)
+        return [] if jogador is None else [_tropa(tropa) for tropa in jogador.tropas]
+
+    def transporte_de(self, jogador_id):
+        """Transporte de um jogador, ou None."""
+        jogador = self._jogo_do_turno().jogadores.get(jogador_id)
+        return None if jogador is None else _transporte(jogador)
+
+    def instantaneo(self):
+        """Instantâneo completo do jogo neste turno (Jogo.snapshot), para simular turnos à frente (ver modelo_de_avanco.py)."""
+        return self._jogo_do_turno().snapshot()
@@ -0,0 +1,290 @@
+import json
+import sys
+from collections import deque, namedtuple
+
+# Níveis dos eventos (um destino só recebe os eventos a partir do seu nível mínimo)
+DEPURACAO = 10
+INFO = 20
+AVISO = 30
+ALERTA = 40
+
+# Tipos de evento emitidos pela engine, pelo simulador e pelo parser
+MENSAGEM = 'mensagem'
+FASE = 'fase'
+TURNO = 'turno'
+ESTADO_SALVO = 'estado_salvo'
+FIM_DE_JOGO = 'fim_de_jogo'
+AVANCO_RAPIDO = 'avanco_rapido'
+CHECKPOINT_SALVO = 'checkpoint_salvo'
+PARTIDA_RETOMADA = 'partida_retomada'
+CIDADE_DUPLICADA = 'cidade_duplicada'
+ARESTA_DUPLICADA = 'aresta_duplicada'
+
+JOGADOR_CRIADO = 'jogador_criado'
+VEZ_DO_JOGADOR = 'vez_do_jogador'
+IA_RESPONDEU = 'ia_respondeu'
+IA_SEM_RESPOSTA = 'ia_sem_resposta'
+TROPA_CRIADA = 'tropa_criada'
+TROPA_DUPLICADA = 'tropa_duplicada'
+TROPAS_INSUFICIENTES = 'tropas_insuficientes'
+
+TROPA_MAL_FORMATADA = 'tropa_mal_formatada'
+LINHA_DE_TROPA_INVALIDA = 'linha_de_tropa_invalida'
+MISSAO_MAL_FORMATADA = 'missao_mal_formatada'
+LINHA_DE_TRANSPORTE_INVALIDA = 'linha_de_transporte_invalida'
+ORDENS_AUSENTES = 'ordens_ausentes'
+
+MOVIMENTO_INICIADO = 'movimento_iniciado'
+MOVIMENTO_SEM_ROTA = 'movimento_sem_rota'
+MOVIMENTO = 'movimento'
+CHEGADA = 'chegada'
+ESTACIONAMENTO = 'estacionamento'
+JA_ESTACIONADA = 'ja_estacionada'
+COMANDO_INVALIDO = 'comando_invalido'
+ATAQUE_ORDENADO = 'ataque_ordenado'
+ATAQUE_INVALIDO = 'ataque_invalido'
+RECUO_VOLUNTARIO = 'recuo_voluntario'
+RECUO = 'recuo'
+ENCURRALADA = 'encurralada'
+RETORNO_A_BASE = 'retorno_a_base'
+
+TENTATIVA_DE_CONQUISTA = 'tentativa_de_conquista'
+CONQUISTA = 'conquista'
+CONQUISTA_FALHOU = 'conquista_falhou'
+ATAQUE_A_BASE = 'ataque_a_base'
+COMBATE = 'combate'
+VITORIA_NO_COMBATE = 'vitoria_no_combate'
+DEFESA_VITORIOSA = 'defesa_vitoriosa'
+PERMANENCIA_APOS_VITORIA = 'permanencia_apos_vitoria'
+RAID_VITORIOSO = 'raid_vitorioso'
+
+CUSTO_DE_SUPRIMENTO = 'custo_de_suprimento'
+CUSTO_DO_TURNO = 'custo_do_turno'
+ISOLAMENTO = 'isolamento'
+FALENCIA = 'falencia'
+
+TRANSPORTE_RECONSTRUIDO = 'transporte_reconstruido'
+TRANSPORTE_EM_MISSAO = 'transporte_em_missao'
+TRANSPORTE_SEM_ROTA = 'transporte_sem_rota'
+TRANSPORTE_EM_CAMINHO = 'transporte_em_caminho'
+TRANSPORTE_PERDEU_CARGA = 'transporte_perdeu_carga'
+TRANSPORTE_DESTRUIDO = 'transporte_destruido'
+TRANSPORTE_MOVEU = 'transporte_moveu'
+COLETA = 'coleta'
+ENTREGA = 'entrega'
+CONVERSAO_EM_TROPAS = 'conversao_em_tropas'
+TRANSPORTE_RETORNANDO = 'transporte_retornando'
+TRANSPORTE_NA_BASE = 'transporte_na_base'
+
+# Motivos de RECUO e TRANSPORTE_RETORNANDO. O evento leva o código e os valores crus
+# (a cidade, por exemplo); o texto de MOTIVOS só é montado por quem for exibi-lo.
+MOTIVO_FORCA_INSUFICIENTE = 'forca_insuficiente'
+MOTIVO_CIDADE_NO_CAMINHO = 'cidade_no_caminho'
+MOTIVO_ARESTA_ESTREITA = 'aresta_estreita'
+MOTIVO_RAID_CONCLUIDO = 'raid_concluido'
+MOTIVO_ORDEM_DE_RECUO = 'ordem_de_recuo'
+MOTIVO_CIDADE_NEUTRA = 'cidade_neutra'
+MOTIVO_SEM_CAMINHO = 'sem_caminho'
+MOTIVO_COLETA_CONCLUIDA = 'coleta_concluida'
+
+# tipo -> (nível, texto usado pelo console). O texto só é formatado por quem for exibi-lo.
+TIPOS = {
+    MENSAGEM: (INFO, "{texto}"),
+    FASE: (DEPURACAO, "\n--- {fase} ---"),
+    TURNO: (INFO, "\n--- Processando Turno {turno} ---"),
+    ESTADO_SALVO: (DEPURACAO, "Arquivo de estado '{arquivo}' gerado com sucesso."),
+    FIM_DE_JOGO: (INFO, "{motivo}"),
+    AVANCO_RAPIDO: (INFO, "Avanço rápido: turnos {de} a {ate} só debitaram manutenção {custos}."),
+    CHECKPOINT_SALVO: (DEPURACAO, "Checkpoint do turno {turno} salvo em '{arquivo}' ({tamanho} bytes)."),
+    PARTIDA_RETOMADA: (INFO, "Partida retomada do checkpoint do turno {turno}."),
+    CIDADE_DUPLICADA: (AVISO, "AVISO: Cidade {cidade} já existe no mapa. Ignorando."),
+    ARESTA_DUPLICADA: (AVISO, "AVISO: Aresta {aresta} já existe. Ignorando."),
+
+    JOGADOR_CRIADO: (INFO, "Jogador '{jogador}' criado e controlado por '{ia}'."),
+    VEZ_DO_JOGADOR: (DEPURACAO, "--- Vez do Jogador {jogador} ({ia}) ---"),
+    IA_RESPONDEU: (DEPURACAO, "Jogador {jogador} respondeu em {latencia:.3f}s."),
+    IA_SEM_RESPOSTA: (AVISO, "AVISO: A IA do jogador {jogador} não respondeu em {prazo}s. Nenhuma ordem neste turno."),
+    TROPA_CRIADA: (INFO, "Jogador {jogador}: Nova tropa {tropa} (Força: {forca}) criada."),
+    TROPA_DUPLICADA: (AVISO, "AVISO: Jogador {jogador} já possui uma tropa com ID {tropa}. Ordem ignorada."),
+    TROPAS_INSUFICIENTES: (AVISO, "AVISO: Jogador {jogador} com poucas tropas para criar {tropa}. Ordem ignorada."),
+
+    TROPA_MAL_FORMATADA: (AVISO, "AVISO: Formato de info de tropa inválido: '{linha}'. Esperado '<id> <forca>'. Linha ignorada."),
+    LINHA_DE_TROPA_INVALIDA: (AVISO, "AVISO: Erro de formatação na linha de tropa: '{linha}'. Linha ignorada."),
+    MISSAO_MAL_FORMATADA: (AVISO, "AVISO: Formato de missão de transporte inválido: '{linha}'. Linha ignorada."),
+    LINHA_DE_TRANSPORTE_INVALIDA: (AVISO, "AVISO: Erro de formatação na linha de transporte: '{linha}'. Linha ignorada."),
+    ORDENS_AUSENTES: (AVISO, "AVISO: A IA não retornou uma string de ordens. Ignorando."),
+
+    MOVIMENTO_INICIADO: (DEPURACAO, "Tropa {tropa} iniciando movimento de {origem} para {destino}"),
+    MOVIMENTO_SEM_ROTA: (AVISO, "AVISO: Tropa {tropa} não pôde iniciar movimento para {destino}."),
+    MOVIMENTO: (DEPURACAO, "Tropa {tropa} ({estado}) moveu-se para {cidade}"),
+    CHEGADA: (DEPURACAO, "Tropa {tropa} chegou ao seu destino."),
+    ESTACIONAMENTO: (DEPURACAO, "Tropa {tropa} agora está estacionada em {cidade}."),
+    JA_ESTACIONADA: (AVISO, "AVISO: Tropa {tropa} já está estacionada em {cidade}."),
+    COMANDO_INVALIDO: (AVISO, "AVISO: Tropa {tropa} está estacionada e não pode executar o comando {comando}."),
+    ATAQUE_ORDENADO: (DEPURACAO, "Tropa {tropa} está agora atacando {alvo}."),
+    ATAQUE_INVALIDO: (AVISO, "ERRO: Tropa {tropa} tentou atacar {alvo} de {cidade}, mas não é vizinho."),
+    RECUO_VOLUNTARIO: (DEPURACAO, "Tropa {tropa} iniciando recuo voluntário de {cidade}."),
+    RECUO: (INFO, "RECUO FORÇADO para Tropa {tropa}! Motivo: {motivo}"),
+    ENCURRALADA: (ALERTA, "ALERTA: Tropa {tropa} está encurralada em {cidade} e não pode recuar!"),
+    RETORNO_A_BASE: (DEPURACAO, "Tropa {tropa} retornou à base e foi convertida em tropas na base (+{forca})."),
+
+    TENTATIVA_DE_CONQUISTA: (DEPURACAO, "Tentativa de conquista em {cidade} (Neutra): Força da Tropa({forca}) vs População({populacao})"),
+    CONQUISTA: (INFO, "Vitória! Jogador {jogador} conquistou {cidade}!"),
+    CONQUISTA_FALHOU: (INFO, "Falha na conquista! A força da Tropa {tropa} ({forca}) é insuficiente para dominar {cidade}."),
+    ATAQUE_A_BASE: (DEPURACAO, "Ataque à base! Força de ataque reduzida para {forca}."),
+    COMBATE: (DEPURACAO, "Combate em {cidade}: Ataque({ataque}) vs Defesa({defesa})"),
+    VITORIA_NO_COMBATE: (INFO, "Vitória do jogador {jogador} em {cidade}!"),
+    DEFESA_VITORIOSA: (INFO, "Defensores de {jogador} venceram o ataque em {cidade}!"),
+    PERMANENCIA_APOS_VITORIA: (DEPURACAO, "Tropa {tropa} venceu e permaneceu em {cidade}."),
+    RAID_VITORIOSO: (DEPURACAO, "Tropa {tropa} venceu (raid) e iniciará o recuo."),
+
+    CUSTO_DE_SUPRIMENTO: (DEPURACAO, "Jogador {jogador}: Custo total de manutenção = {custo} (Cidades conectadas: {conectadas})"),
+    CUSTO_DO_TURNO: (DEPURACAO, "Jogador {jogador}: Custo de manutenção do império = {custo}"),
+    ISOLAMENTO: (ALERTA, "ALERTA: Cidade {cidade} do jogador {jogador} ficou isolada e se tornou neutra!"),
+    FALENCIA: (ALERTA, "DERROTA: Jogador {jogador} foi à falência (tropas na base <= 0)!"),
+
+    TRANSPORTE_RECONSTRUIDO: (INFO, "Transporte do jogador {jogador} foi reconstruído na base."),
+    TRANSPORTE_EM_MISSAO: (DEPURACAO, "Transporte de {jogador} iniciando missão: coletar em {origem} e levar para {destino}."),
+    TRANSPORTE_SEM_ROTA: (AVISO, "AVISO: Transporte não encontrou caminho para a coleta em {origem}."),
+    TRANSPORTE_EM_CAMINHO: (DEPURACAO, "Processando transporte de {jogador} ({estado}) no caminho {caminho}."),
+    TRANSPORTE_PERDEU_CARGA: (INFO, "Transporte de {jogador} encontrou cidade neutra! Perdeu {perda} de população."),
+    TRANSPORTE_DESTRUIDO: (ALERTA, "Transporte de {jogador} DESTRUÍDO por cidade inimiga! Carga perdida."),
+    TRANSPORTE_MOVEU: (DEPURACAO, "Transporte de {jogador} ({estado}) moveu-se para {cidade}"),
+    COLETA: (INFO, "Transporte coletou {quantidade} de população em {cidade}."),
+    ENTREGA: (INFO, "Transporte entregou {quantidade} de população em {cidade}."),
+    CONVERSAO_EM_TROPAS: (INFO, "Jogador {jogador} converteu população em tropas! Total na base: {total:.0f}"),
+    TRANSPORTE_RETORNANDO: (DEPURACAO, "Transporte de {jogador} iniciando retorno à base. Motivo: {motivo}"),
+    TRANSPORTE_NA_BASE: (DEPURACAO, "Transporte de {jogador} retornou à base."),
+}
+
+# motivo -> texto usado pelo console, formatado com os dados do evento
+MOTIVOS = {
+    MOTIVO_FORCA_INSUFICIENTE: "força insuficiente para conquistar a cidade neutra {cidade}",
+    MOTIVO_CIDADE_NO_CAMINHO: "encontrou cidade inimiga/neutra em {cidade}",
+    MOTIVO_ARESTA_ESTREITA: "é muito grande para a aresta para {cidade}",
+    MOTIVO_RAID_CONCLUIDO: "ataque 'raid' concluído",
+    MOTIVO_ORDEM_DE_RECUO: "ordem de recuo do jogador",
+    MOTIVO_CIDADE_NEUTRA: "encontrou cidade neutra",
+    MOTIVO_SEM_CAMINHO: "não encontrou caminho para o destino",
+    MOTIVO_COLETA_CONCLUIDA: "missão de coleta concluída",
+}
+
+class Evento(namedtuple('Evento', ['turno', 'tipo', 'dados'])):
+    """Um evento emitido durante o jogo. 'dados' guarda os valores crus, sem formatação."""
+    __slots__ = ()
+
+    @property
+    def nivel(self):
+        return TIPOS[self.tipo][0]
+
+    def formatar(self):
+        """Texto legível do evento (o mesmo que a engine imprimia antes)."""
+        dados = self.dados
+        motivo = dados.get('motivo')
+        if motivo in MOTIVOS:
+            dados = {**dados, 'motivo': MOTIVOS[motivo].format(**dados)}
+        return TIPOS[self.tipo][1].format(**dados)
+
+    def para_dict(self):
+        return {"turno": self.turno, "tipo": self.tipo, **self.dados}
+
+class EmissorDeEventos:
+    """
+    Entrega os eventos aos destinos registrados.
+
+    Cada destino declara o nível mínimo e, opcionalmente, os tipos que quer receber.
+    O emissor guarda, por tipo, a lista de destinos interessados: um evento que
+    ninguém quer é descartado com uma consulta a um dicionário, antes de qualquer
+    objeto ser criado ou texto ser formatado. Sem destinos, emitir não faz nada.
+    """
+    def __init__(self, *destinos):
+        self.turno = 0  # Atualizado pela engine a cada mudança de turno
+        self.destinos = []
+        self._destinos_por_tipo = {}
+        for destino in destinos:
+            self.adicionar_destino(destino)
+
+    def adicionar_destino(self, destino):
+        self.destinos.append(destino)
+        self._recalcular()
+
+    def remover_destino(self, destino):
+        self.destinos.remove(destino)
+        self._recalcular()
+
+    def _recalcular(self):
+        self._destinos_por_tipo = {}
+        for tipo, (nivel, _) in TIPOS.items():
+            interessados = [d for d in self.destinos if d.aceita(tipo, nivel)]
+            if interessados:
+                self._destinos_por_tipo[tipo] = interessados
+
+    def ativo(self, tipo):
+        """Indica se algum destino quer eventos deste tipo (para pular cálculos caros antes de emitir)."""
+        return tipo in self._destinos_por_tipo
+
+    def emitir(self, tipo, **dados):
+        destinos = self._destinos_por_tipo.get(tipo)
+        if destinos is None:
+            return
+        evento = Evento(self.turno, tipo, dados)
+        for destino in destinos:
+            destino.receber(evento)
+
+    def fechar(self):
+        for destino in self.destinos:
+            destino.fechar()
+
+class Destino:
+    """Base dos destinos de eventos: filtra por nível mínimo e, opcionalmente, por tipos."""
+    def __init__(self, nivel_minimo=DEPURACAO, tipos=None):
+        self.nivel_minimo = nivel_minimo
+        self.tipos = None if tipos is None else set(tipos)
+
+    def aceita(self, tipo, nivel):
+        return nivel >= self.nivel_minimo and (self.tipos is None or tipo in self.tipos)
+
+    def receber(self, evento):
+        raise NotImplementedError
+
+    def fechar(self):
+        pass
+
+class DestinoNulo(Destino):
+    """Descarta tudo. O emissor nem chega a chamá-lo, já que não aceita nenhum tipo."""
+    def aceita(self, tipo, nivel):
+        return False
+
+    def receber(self, evento):
+        pass
+
+class DestinoMemoria(Destino):
+    """Guarda os últimos eventos em um buffer circular (útil para testes e depuração)."""
+    def __init__(self, capacidade=10000, nivel_minimo=DEPURACAO, tipos=None):
+        super().__init__(nivel_minimo, tipos)
+        self.eventos = deque(maxlen=capacidade)
+
+    def receber(self, evento):
+        self.eventos.append(evento)
+
+class DestinoJSONL(Destino):
+    """Escreve um evento por linha, em JSON, para ser consumido por outras ferramentas."""
+    def __init__(self, caminho, nivel_minimo=DEPURACAO, tipos=None):
+        super().__init__(nivel_minimo, tipos)
+        self.arquivo = open(caminho, 'w', encoding='utf-8')
+
+    def receber(self, evento):
+        self.arquivo.write(json.dumps(evento.para_dict(), ensure_ascii=False, default=list))
+        self.arquivo.write("\n")
+
+    def fechar(self):
+        self.arquivo.close()
+
+class DestinoConsole(Destino):
+    """Imprime os eventos com o mesmo texto que a engine imprimia antes."""
+    def __init__(self, nivel_minimo=DEPURACAO, tipos=None, saida=None):
+        super().__init__(nivel_minimo, tipos)
+        self.saida = saida
+
+    def receber(self, evento):
+        print(evento.formatar(), file=self.saida or sys.stdout)
@@ -0,0 +1,82 @@
+from array import array
+
+class GrafoCSR:
+    """
+    Núcleo da topologia do mapa com cidades internadas em índices inteiros densos
+    e adjacência em formato CSR (compressed sparse row).
+
+    Os vizinhos da cidade i são vizinhos[inicio[i]:inicio[i + 1]], na mesma ordem
+    da lista de adjacência original, com os pesos correspondentes em pesos[...].
+    As mesmas linhas também existem ordenadas por peso (para o Prim). Os laços
+    internos da engine percorrem esses arrays diretamente; IDs em texto só
+    aparecem na fronteira da API (Mapa / MapaSomenteLeitura).
+    """
+    def __init__(self, ids, inicio, vizinhos, pesos, ordenadas=None):
+        """
+        'ordenadas' são as linhas já ordenadas por peso (vizinhos_por_peso, pesos_por_peso),
+        por exemplo lidas de um mapa compilado (ver mapa_binario.py); sem elas, são calculadas aqui.
+        """
+        self.ids = list(ids)
+        self.indice = {cidade_id: i for i, cidade_id in enumerate(self.ids)}
+        self.inicio = inicio
+        self.vizinhos = vizinhos
+        self.pesos = pesos
+        self._posicao_do_par = None  # Montado na primeira consulta (ver _posicoes)
+        n = len(self.ids)
+
+        if ordenadas is not None:
+            self.vizinhos_por_peso, self.pesos_por_peso = ordenadas
+            return
+        # Linhas ordenadas por (peso, id do vizinho), calculadas uma vez por topologia
+        self.vizinhos_por_peso = array(vizinhos.typecode)
+        self.pesos_por_peso = array(pesos.typecode)
+        for i in range(n):
+            linha = sorted(range(inicio[i], inicio[i + 1]), key=lambda k: (pesos[k], self.ids[vizinhos[k]]))
+            self.vizinhos_por_peso.extend(vizinhos[k] for k in linha)
+            self.pesos_por_peso.extend(pesos[k] for k in linha)
+
+    def _posicoes(self):
+        """Par (i, j) -> posição da aresta no CSR, com chave inteira i * n + j (sem tuplas)."""
+        if self._posicao_do_par is None:
+            n, inicio, vizinhos = len(self.ids), self.inicio, self.vizinhos
+            posicoes = {}
+            for i in range(n):
+                for k in range(inicio[i], inicio[i + 1]):
+                    posicoes.setdefault(i * n + vizinhos[k], k)
+            self._posicao_do_par = posicoes
+        return self._posicao_do_par
+
+    @classmethod
+    def da_lista_de_adjacencia(cls, ids, lista_adjacencia):
+        """Monta o CSR a partir de {cidade_id: [(vizinho_id, peso), ...]}, preservando a ordem dos vizinhos."""
+        ids = list(ids)
+        conhecidos = set(ids)
+        for cidade_id, vizinhos in lista_adjacencia.items():
+            for cidade in [cidade_id] + [v for v, _ in vizinhos]:
+                if cidade not in conhecidos:
+                    conhecidos.add(cidade)
+                    ids.append(cidade)
+        indice = {cidade_id: i for i, cidade_id in enumerate(ids)}
+
+        pesos_lidos = [peso for vizinhos in lista_adjacencia.values() for _, peso in vizinhos]
+        inicio = array('q', [0])
+        vizinhos_csr = array('l')
+        pesos_csr = array('q' if all(isinstance(p, int) for p in pesos_lidos) else 'd')
+        for cidade_id in ids:
+            for vizinho_id, peso in lista_adjacencia.get(cidade_id, ()):
+                vizinhos_csr.append(indice[vizinho_id])
+                pesos_csr.append(peso)
+            inicio.append(len(vizinhos_csr))
+        return cls(ids, inicio, vizinhos_csr, pesos_csr)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def posicao_da_aresta(self, i, j):
+        """Posição da aresta (i, j) nos arrays do CSR, ou None se não forem vizinhos."""
+        return self._posicoes().get(i * len(self.ids) + j)
+
+    def peso(self, i, j):
+        """Peso da aresta entre as cidades de índice i e j, ou None."""
+        k = self._posicoes().get(i * len(self.ids) + j)
+        return None if k is None else self.pesos[k]
@@ -1,10 +1,19 @@
 from abc import ABC, abstractmethod
 
+# Protocolos de entrada de decidir_acoes
+PROTOCOLO_COMPLETO = 'completo'  # O estado inteiro do jogo, todo turno
+PROTOCOLO_DELTA = 'delta'        # O mapa estático uma vez (iniciar_partida) e depois só o que mudou
+
 class IAInterface(ABC):
     """
     Classe base (Interface) que todas as IAs devem herdar.
     Ela define o "contrato" de como o Simulador vai interagir com um bot.
     """
+    protocolo = PROTOCOLO_COMPLETO
+    # Com PROTOCOLO_COMPLETO, decidir_acoes recebe o dicionário do estado (o mesmo de Jogo.gerar_estado_json).
+    # Com True, recebe um EstadoDoJogo (estado_do_jogo.py): as mesmas chaves, montadas só quando lidas, e
+    # auxiliares que consultam só o que é pedido. Para IAs que leem pouco do estado em mapas grandes.
+    estado_sob_demanda = False
     
     @abstractmethod
     def __init__(self, jogador_id):
@@ -16,5 +25,51 @@ class IAInterface(ABC):
         """
         O método principal da IA. Recebe o estado atual do jogo e o mapa,
         e deve retornar um arquivo de texto com as ordens.
+        Pode ser assíncrono (async def), para IAs que esperam serviços externos: o
+        SimuladorAssincrono (simulador_async.py) avança outras partidas enquanto isso.
+        """
+        pass
+
+    def iniciar_partida(self, mapa_estatico, estado_inicial):
+        """
+        Opcional. Chamado uma vez, antes do primeiro turno, para IAs com
+        protocolo = PROTOCOLO_DELTA. 'mapa_estatico' tem os IDs das cidades e as arestas
+        ([de, para, peso]); 'estado_inicial' é o estado no formato de replay.estado_dinamico.
+        A partir daí, decidir_acoes recebe no lugar do estado só o delta do turno
+        (formato de replay.calcular_delta, mais os 'eventos' de combate), que pode ser
+        acumulado com replay.aplicar_delta.
+        """
+        pass
+
+    def nova_partida(self, jogador_id, mapa):
+        """
+        Opcional. Chamado quando a mesma IA é reaproveitada para outra partida (pool de
+        IAs aquecidas, ver sandbox.PoolDeIAs), no lugar de criar uma IA nova: a partir
+        daí ela controla 'jogador_id' no 'mapa' (MapaSomenteLeitura, ainda sem donos)
+        da nova partida. Sobrescreva para guardar o que não depende do mapa (tabelas,
+        livros de abertura) e refazer só o que depende dele. O padrão recomeça a IA do
+        zero, como se ela fosse criada de novo.
         """
-        pass
\ No newline at end of file
+        self.__init__(jogador_id)
+
+    def turno_para_acordar(self):
+        """
+        Opcional. Permite à IA declarar que não dará ordens por um tempo, para que o
+        simulador em modo de avanço rápido não precise consultá-la.
+        Retorne None (padrão) para ser consultada todo turno, ou o número do turno em
+        que quer voltar a ser consultada. O simulador só pula turnos em que nenhuma
+        tropa ou transporte tem o que fazer.
+        """
+        return None
+
+    def salvar_estado(self):
+        """
+        Opcional. Estado interno da IA a ser guardado nos checkpoints do simulador
+        (qualquer objeto que o pickle consiga gravar). Com o padrão (None), a IA é
+        recriada do zero ao retomar a partida.
+        """
+        return None
+
+    def restaurar_estado(self, estado):
+        """Opcional. Recebe, ao retomar a partida, o que salvar_estado devolveu no checkpoint."""
+        pass
@@ -6,21 +6,27 @@ class Perseus(IAInterface):
     Uma IA de teste que toma decisões aleatórias e, propositalmente,
     tenta criar cenários de borda para testar a robustez da engine.
     """
+    estado_sob_demanda = True  # Usa os auxiliares do EstadoDoJogo (ver IAInterface)
     def __init__(self, jogador_id):
         super().__init__(jogador_id)
         self.contador_tropas = 0
 
+    def salvar_estado(self):
+        # Os IDs das novas tropas dependem do contador: sem ele, a IA repetiria IDs ao retomar a partida
+        return {"contador_tropas": self.contador_tropas}
+
+    def restaurar_estado(self, estado):
+        self.contador_tropas = estado["contador_tropas"]
+
     def decidir_acoes(self, estado_do_jogo, mapa):        
-        bot_info = next((j for j in estado_do_jogo['jogadores'] if j['id'] == self.jogador_id), None)
+        # Os auxiliares do EstadoDoJogo consultam só o que é do jogador, sem montar as listas completas
+        bot_info = estado_do_jogo.jogador(self.jogador_id)
         if not bot_info: return ""
         tropas_na_base = bot_info['tropas_na_base']
         minha_base_id = f"basej_{self.jogador_id}"
-        mapa_info = estado_do_jogo['mapa']
-        lista_de_cidades = mapa_info['cidades']
-        cidades_minhas = [c for c in lista_de_cidades if c['dono'] == self.jogador_id]
-        cidades_neutras = [c for c in lista_de_cidades if c['dono'] is None]
-        meu_transporte = next((t for t in estado_do_jogo['transportes'] if t['dono'] == self.jogador_id), None)
-        minhas_tropas_em_campo = [t for t in estado_do_jogo['tropas_em_campo'] if t['dono'] == self.jogador_id]
+        cidades_minhas = estado_do_jogo.cidades_do_dono(self.jogador_id)
+        cidades_neutras = estado_do_jogo.cidades_do_dono(None)
+        meu_transporte = estado_do_jogo.transporte_de(self.jogador_id)
 
         ordens_tropas_str = "Novas Tropas:\n"
         ordens_transporte_str = "Transporte:\n"
@@ -35,7 +41,7 @@ class Perseus(IAInterface):
                         cidade_pedagio_id = caminho_para_base[1] # A primeira cidade no caminho
                         
                         # Verifica se a cidade_pedagio é nossa e tem exatamente 1 tropa
-                        tropas_na_cidade_pedagio = [t for t in minhas_tropas_em_campo if t['localizacao'] == cidade_pedagio_id]
+                        tropas_na_cidade_pedagio = [t for t in mapa.get_tropas_em(cidade_pedagio_id) if t['dono'] == self.jogador_id]
                         if len(tropas_na_cidade_pedagio) == 1:
                             tropa_a_recuar = tropas_na_cidade_pedagio[0]
                             print(f"IA {self.jogador_id} INICIANDO TESTE DE PEDÁGIO NEUTRO!")
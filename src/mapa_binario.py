@@ -0,0 +1,195 @@
+"""
+Formato compilado do mapa, carregado com mmap sem interpretar elemento por elemento.
+
+Layout (little-endian):
+    cabeçalho: MAGICA, versão, contagens, flags e a tabela de seções (posição e tamanho)
+    seções, cada uma alinhada em 8 bytes:
+        ids               IDs de todas as cidades (UTF-8, separados por \\0): primeiro as do mapa
+                          ('n_cidades'), depois as que só aparecem na adjacência (juntas, os
+                          IDs do CSR) e por fim as que só aparecem nas arestas
+        populacoes        'q' (ou 'd'), uma por cidade do mapa
+        arestas_de/para   'i', índices das pontas de cada aresta, na ordem do JSON
+        arestas_peso      'q' (ou 'd')
+        ordem_adjacencia  'i', cidades na ordem em que aparecem na lista de adjacência
+        inicio            'q', CSR: vizinhos de i em [inicio[i], inicio[i + 1])
+        vizinhos, pesos   'i' e 'q' (ou 'd')
+        vizinhos_por_peso, pesos_por_peso   as mesmas linhas ordenadas por (peso, id)
+        configs           JSON com as configurações do gerador
+
+O CSR é exatamente o que GrafoCSR.da_lista_de_adjacencia monta a partir do JSON,
+então a engine se comporta da mesma forma com os dois formatos.
+
+Uso como ferramenta:
+    python src/mapa_binario.py mapa.json mapa.mapabin
+"""
+import json
+import mmap
+import struct
+import sys
+from array import array
+from grafo_csr import GrafoCSR
+
+MAGICA = b"MAPABIN1"
+VERSAO = 1
+_SECOES = ("ids", "populacoes", "arestas_de", "arestas_para", "arestas_peso", "ordem_adjacencia",
+           "inicio", "vizinhos", "pesos", "vizinhos_por_peso", "pesos_por_peso", "configs")
+# magica, versao, n_ids, n_cidades, n_arestas, n_vizinhos, n_adjacencia, flags
+_CABECALHO = struct.Struct("<8sIIIIIII")
+_SECAO = struct.Struct("<QQ")
+_PESOS_REAIS = 1
+_POPULACOES_REAIS = 2
+
+def eh_mapa_binario(caminho):
+    """Indica se o arquivo está no formato compilado (pelos primeiros bytes)."""
+    with open(caminho, "rb") as f:
+        return f.read(len(MAGICA)) == MAGICA
+
+class MapaCompilado:
+    """Conteúdo de um mapa compilado: IDs em uma lista e o resto em arrays (sem cópia, sobre o mmap)."""
+    def __init__(self, ids, n_cidades, populacoes, arestas_de, arestas_para, arestas_peso,
+                 ordem_adjacencia, inicio, vizinhos, pesos, vizinhos_por_peso, pesos_por_peso, configs):
+        self.ids = ids
+        self.n_cidades = n_cidades
+        self.populacoes = populacoes
+        self.arestas_de = arestas_de
+        self.arestas_para = arestas_para
+        self.arestas_peso = arestas_peso
+        self.ordem_adjacencia = ordem_adjacencia
+        self.inicio = inicio
+        self.vizinhos = vizinhos
+        self.pesos = pesos
+        self.vizinhos_por_peso = vizinhos_por_peso
+        self.pesos_por_peso = pesos_por_peso
+        self.configs = configs
+
+    def grafo(self):
+        """GrafoCSR sobre os arrays do arquivo, sem recalcular nada."""
+        return GrafoCSR(self.ids[:len(self.inicio) - 1], self.inicio, self.vizinhos, self.pesos,
+                        ordenadas=(self.vizinhos_por_peso, self.pesos_por_peso))
+
+def _em_bytes(tipo, valores):
+    """Valores numéricos em little-endian, o formato do arquivo, qualquer que seja a máquina."""
+    valores = array(tipo, valores)
+    if sys.byteorder != "little":
+        valores.byteswap()
+    return valores.tobytes()
+
+def compilar(caminho_json, caminho_saida):
+    """Converte um mapa JSON (de gerador_tabuleiro.exportar_mapa_para_json) para o formato compilado."""
+    conteudo = compilar_para_bytes(caminho_json)
+    with open(caminho_saida, "wb") as f:
+        f.write(conteudo)
+
+def compilar_para_bytes(caminho_json):
+    """Conteúdo do mapa JSON no formato compilado, sem gravar arquivo."""
+    with open(caminho_json, "r", encoding="utf-8") as f:
+        dados = json.load(f)
+
+    populacao_por_id = {}  # A engine ignora cidades repetidas: vale a primeira
+    for cidade in dados.get("cidades", []):
+        populacao_por_id.setdefault(cidade["id"], cidade["populacao"])
+    ids_cidades = list(populacao_por_id)
+    lista_adjacencia = {adj["cidade"]: [(v["id"], v["peso"]) for v in adj["vizinhos"]]
+                        for adj in dados["lista_adjacencia"]}
+
+    grafo = GrafoCSR.da_lista_de_adjacencia(ids_cidades, lista_adjacencia)
+    indice = dict(grafo.indice)
+    ids = list(grafo.ids)
+    arestas = dados.get("arestas", [])
+    for aresta in arestas:  # Pontas de arestas que não existem na adjacência
+        for cidade_id in (aresta["de"], aresta["para"]):
+            if cidade_id not in indice:
+                indice[cidade_id] = len(ids)
+                ids.append(cidade_id)
+    if any("\0" in cidade_id for cidade_id in ids):
+        raise ValueError("IDs de cidade não podem conter o caractere \\0.")
+
+    populacoes = list(populacao_por_id.values())
+    pesos_arestas = [a["peso"] for a in arestas]
+    flags = 0
+    if grafo.pesos.typecode == "d" or not all(isinstance(p, int) for p in pesos_arestas):
+        flags |= _PESOS_REAIS
+    if not all(isinstance(p, int) for p in populacoes):
+        flags |= _POPULACOES_REAIS
+    tipo_peso = "d" if flags & _PESOS_REAIS else "q"
+    tipo_populacao = "d" if flags & _POPULACOES_REAIS else "q"
+
+    secoes = {
+        "ids": "\0".join(ids).encode("utf-8"),
+        "populacoes": _em_bytes(tipo_populacao, populacoes),
+        "arestas_de": _em_bytes("i", [indice[a["de"]] for a in arestas]),
+        "arestas_para": _em_bytes("i", [indice[a["para"]] for a in arestas]),
+        "arestas_peso": _em_bytes(tipo_peso, pesos_arestas),
+        "ordem_adjacencia": _em_bytes("i", [indice[c] for c in lista_adjacencia]),
+        "inicio": _em_bytes("q", grafo.inicio),
+        "vizinhos": _em_bytes("i", grafo.vizinhos),
+        "pesos": _em_bytes(tipo_peso, grafo.pesos),
+        "vizinhos_por_peso": _em_bytes("i", grafo.vizinhos_por_peso),
+        "pesos_por_peso": _em_bytes(tipo_peso, grafo.pesos_por_peso),
+        "configs": json.dumps(dados.get("configs", {}), ensure_ascii=False).encode("utf-8"),
+    }
+
+    posicao = _CABECALHO.size + _SECAO.size * len(_SECOES)
+    tabela, corpo = [], bytearray()
+    for nome in _SECOES:
+        conteudo = secoes[nome]
+        preenchimento = -(posicao + len(corpo)) % 8
+        corpo += b"\0" * preenchimento
+        tabela.append((posicao + len(corpo), len(conteudo)))
+        corpo += conteudo
+
+    cabecalho = _CABECALHO.pack(MAGICA, VERSAO, len(ids), len(ids_cidades), len(arestas), len(grafo.vizinhos),
+                                len(lista_adjacencia), flags)
+    return cabecalho + b"".join(_SECAO.pack(inicio_secao, tamanho) for inicio_secao, tamanho in tabela) + corpo
+
+def carregar(caminho):
+    """Abre um mapa compilado com mmap. Os arrays numéricos são visões sobre o arquivo, sem cópia."""
+    with open(caminho, "rb") as f:
+        dados = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return carregar_do_buffer(dados, caminho)
+
+def carregar_do_buffer(dados, origem="buffer"):
+    """
+    Lê um mapa compilado de qualquer objeto com o protocolo de buffer (mmap, bytes,
+    memória compartilhada). Como em carregar, os arrays são visões sobre 'dados'.
+    """
+    magica, versao, n_ids, n_cidades, _, _, _, flags = _CABECALHO.unpack_from(dados, 0)
+    if magica != MAGICA:
+        raise ValueError(f"'{origem}' não é um mapa compilado.")
+    if versao != VERSAO:
+        raise ValueError(f"Versão {versao} do mapa compilado não é suportada.")
+
+    visao = memoryview(dados)
+    secoes = {}
+    for k, nome in enumerate(_SECOES):
+        inicio_secao, tamanho = _SECAO.unpack_from(dados, _CABECALHO.size + k * _SECAO.size)
+        secoes[nome] = visao[inicio_secao:inicio_secao + tamanho]
+
+    tipo_peso = "d" if flags & _PESOS_REAIS else "q"
+    tipo_populacao = "d" if flags & _POPULACOES_REAIS else "q"
+
+    def numeros(nome, tipo):
+        if sys.byteorder == "little":
+            return secoes[nome].cast(tipo)
+        valores = array(tipo, secoes[nome].tobytes())  # Máquinas big-endian precisam de uma cópia invertida
+        valores.byteswap()
+        return valores
+
+    ids = bytes(secoes["ids"]).decode("utf-8").split("\0") if n_ids else []
+    return MapaCompilado(
+        ids=ids, n_cidades=n_cidades,
+        populacoes=numeros("populacoes", tipo_populacao),
+        arestas_de=numeros("arestas_de", "i"), arestas_para=numeros("arestas_para", "i"),
+        arestas_peso=numeros("arestas_peso", tipo_peso),
+        ordem_adjacencia=numeros("ordem_adjacencia", "i"),
+        inicio=numeros("inicio", "q"), vizinhos=numeros("vizinhos", "i"), pesos=numeros("pesos", tipo_peso),
+        vizinhos_por_peso=numeros("vizinhos_por_peso", "i"), pesos_por_peso=numeros("pesos_por_peso", tipo_peso),
+        configs=json.loads(bytes(secoes["configs"]).decode("utf-8")),
+    )
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Uso: python src/mapa_binario.py <mapa.json> <mapa.mapabin>")
+        sys.exit(1)
+    compilar(sys.argv[1], sys.argv[2])
+    print(f"Mapa compilado em '{sys.argv[2]}'.")
@@ -0,0 +1,81 @@
+"""
+Mapas em memória compartilhada (multiprocessing.shared_memory), para que os processos
+de um torneio joguem no mesmo mapa sem que cada um leia o arquivo e monte a sua cópia.
+
+O coordenador publica cada mapa uma vez (publicar_mapa): o conteúdo no formato
+compilado (mapa_binario.py), convertido do JSON se preciso, vai para um bloco de
+memória compartilhada. Cada processo trabalhador se anexa ao bloco (anexar_mapa) e
+monta a Topologia sobre ele sem copiar os arrays (Topologia.do_compilado); a partir
+daí, carregar_topologia devolve essa topologia para o arquivo do mapa, e os Mapas e
+MapasSomenteLeitura das partidas ficam por cima dela.
+
+    publicados = [publicar_mapa(caminho) for caminho in mapas]
+    with ProcessPoolExecutor(initializer=anexar_mapas, initargs=([p.referencia() for p in publicados],)) as executor:
+        ...
+    for publicado in publicados:
+        publicado.liberar()
+"""
+from multiprocessing import shared_memory
+import mapa_binario
+from engine import Topologia, registrar_topologia
+
+# Blocos anexados neste processo: as topologias usam a memória deles até o processo terminar
+_ANEXADOS = {}
+
+class _BlocoAnexado(shared_memory.SharedMemory):
+    """Bloco que nunca é fechado: os arrays das topologias apontam para ele, e o sistema o solta no fim do processo."""
+    def __del__(self):
+        pass
+
+class MapaPublicado:
+    """Bloco de memória compartilhada com um mapa compilado, do lado de quem o publicou."""
+    def __init__(self, caminho, bloco, tamanho):
+        self.caminho = caminho
+        self.bloco = bloco
+        self.tamanho = tamanho
+
+    @property
+    def nome(self):
+        return self.bloco.name
+
+    def referencia(self):
+        """O que os outros processos precisam para anexar o mapa: (caminho, nome do bloco)."""
+        return (self.caminho, self.bloco.name)
+
+    def liberar(self):
+        """Remove o bloco do sistema. Processos já anexados continuam usando-o até terminarem."""
+        self.bloco.close()
+        self.bloco.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excecao):
+        self.liberar()
+
+def publicar_mapa(caminho):
+    """Copia o mapa (JSON ou compilado) para um novo bloco de memória compartilhada."""
+    if mapa_binario.eh_mapa_binario(caminho):
+        with open(caminho, 'rb') as f:
+            conteudo = f.read()
+    else:
+        conteudo = mapa_binario.compilar_para_bytes(caminho)
+    bloco = shared_memory.SharedMemory(create=True, size=len(conteudo))
+    bloco.buf[:len(conteudo)] = conteudo
+    return MapaPublicado(caminho, bloco, len(conteudo))
+
+def anexar_mapa(caminho, nome, eventos=None):
+    """
+    Anexa o bloco publicado para o mapa em 'caminho' e registra a topologia montada
+    sobre ele, para que carregar_topologia(caminho) a devolva. Retorna a Topologia.
+    """
+    bloco = _ANEXADOS.get(nome)
+    if bloco is None:
+        bloco = _ANEXADOS[nome] = _BlocoAnexado(name=nome)
+    topologia = Topologia.do_compilado(mapa_binario.carregar_do_buffer(bloco.buf, nome), eventos)
+    return registrar_topologia(caminho, topologia)
+
+def anexar_mapas(referencias):
+    """Anexa vários mapas, a partir de MapaPublicado.referencia(). Serve de initializer de pools de processos."""
+    for caminho, nome in referencias:
+        anexar_mapa(caminho, nome)
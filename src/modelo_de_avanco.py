@@ -0,0 +1,61 @@
+"""
+Modelo de avanço: simula um turno a partir de um instantâneo do jogo (Jogo.snapshot)
+e das ordens de todos os jogadores, sem mexer no jogo de verdade.
+
+A simulação roda as mesmas regras de Jogo.processar_turno (e de Jogo.aplicar_ordens,
+para as ordens), em um jogo de rascunho que não grava arquivos e guarda os eventos
+em memória em vez de imprimi-los.
+
+    modelo = ModeloDeAvanco()
+    inicio = estado_do_jogo.instantaneo()
+    for ordens in candidatas:  # ordens no formato do parser, para todos os jogadores
+        resultado = modelo.simular(inicio, ordens)
+        ...                    # resultado.instantaneo, resultado.eventos, modelo.estado(resultado.instantaneo)
+"""
+from collections import namedtuple
+from engine import Jogo
+from eventos import EmissorDeEventos, DestinoMemoria, DEPURACAO
+
+ResultadoDaSimulacao = namedtuple('ResultadoDaSimulacao', ['instantaneo', 'eventos', 'terminou'])
+ResultadoDaSimulacao.__doc__ = """
+Resultado de um turno simulado: o instantâneo do turno seguinte, a lista de eventos
+(eventos.Evento) e se o jogo terminou nesse turno.
+"""
+
+class ModeloDeAvanco:
+    """
+    Simula turnos sobre instantâneos. Um mesmo modelo pode ser usado para muitas
+    simulações seguidas (o jogo de rascunho é reaproveitado); 'tipos' e 'nivel_minimo'
+    limitam os eventos guardados, e tipos=() descarta todos sem montá-los.
+    """
+    def __init__(self, tipos=None, nivel_minimo=DEPURACAO):
+        self._eventos = DestinoMemoria(capacidade=None, nivel_minimo=nivel_minimo, tipos=tipos)
+        self._jogo = Jogo(EmissorDeEventos(self._eventos))
+        self._jogo.salvar_estados = False
+
+    def simular(self, instantaneo, ordens_por_jogador):
+        """
+        Aplica as ordens ({jogador_id: ordens do parser}) sobre o instantâneo e processa
+        um turno. Retorna um ResultadoDaSimulacao; o instantâneo recebido não muda.
+        """
+        jogo = self._jogo
+        jogo.restore(instantaneo)
+        self._eventos.eventos.clear()
+        jogo.aplicar_ordens({jogador_id: ordens for jogador_id, ordens in ordens_por_jogador.items()
+                             if jogador_id not in jogo.jogadores_derrotados})
+        turno = jogo.turno_atual
+        jogo.processar_turno()
+        return ResultadoDaSimulacao(jogo.snapshot(), list(self._eventos.eventos), jogo.turno_atual == turno)
+
+    def simular_varios(self, instantaneo, candidatas):
+        """Simula um turno para cada conjunto de ordens candidato, todos a partir do mesmo instantâneo."""
+        return [self.simular(instantaneo, ordens) for ordens in candidatas]
+
+    def estado(self, instantaneo):
+        """Estado de um instantâneo no formato de Jogo.gerar_estado_json, para avaliar a posição."""
+        self._jogo.restore(instantaneo)
+        return self._jogo.gerar_estado_json("", salvar_arquivo=False)
+
+def simular_turno(instantaneo, ordens_por_jogador):
+    """Atalho para uma simulação avulsa (para várias, crie um ModeloDeAvanco e reaproveite)."""
+    return ModeloDeAvanco().simular(instantaneo, ordens_por_jogador)
@@ -1,13 +1,20 @@
 import re
+from comandos import Comando, MOVER, ATACAR, PERMANECER, RECUAR, COLETAR, ENTREGAR
+from eventos import (
+    EmissorDeEventos, TROPA_MAL_FORMATADA, LINHA_DE_TROPA_INVALIDA, MISSAO_MAL_FORMATADA,
+    LINHA_DE_TRANSPORTE_INVALIDA, ORDENS_AUSENTES
+)
 
-def _parse_linha_tropa(linha):
+_SEM_EVENTOS = EmissorDeEventos()
+
+def _parse_linha_tropa(linha, eventos):
     """Traduz uma única linha de comando de tropa no formato '<id> <forca>: <rota>'."""
     try:
         parte_info, parte_rota = [p.strip() for p in linha.split(':')]
         info_tropa = parte_info.split()
         
         if len(info_tropa) != 2:
-            print(f"AVISO: Formato de info de tropa inválido: '{parte_info}'. Esperado '<id> <forca>'. Linha ignorada.")
+            eventos.emitir(TROPA_MAL_FORMATADA, linha=parte_info)
             return None
             
         id_tropa = info_tropa[0]
@@ -21,20 +28,20 @@ def _parse_linha_tropa(linha):
             comando_tipo = partes_passo[0]
             
             if comando_tipo == 'ataca' and len(partes_passo) > 1:
-                comandos.append({'tipo': 'ATACAR', 'alvo': partes_passo[1]})
+                comandos.append(Comando(ATACAR, partes_passo[1]))
             elif comando_tipo == 'permanece':
-                comandos.append({'tipo': 'PERMANECER'})
+                comandos.append(Comando(PERMANECER))
             elif comando_tipo == 'recua':
-                comandos.append({'tipo': 'RECUAR'})
+                comandos.append(Comando(RECUAR))
             else:
-                comandos.append({'tipo': 'MOVER', 'alvo': comando_tipo})
+                comandos.append(Comando(MOVER, comando_tipo))
         
         return {'id': id_tropa, 'forca': forca, 'comandos': comandos}
     except (ValueError, IndexError):
-        print(f"AVISO: Erro de formatação na linha de tropa: '{linha}'. Linha ignorada.")
+        eventos.emitir(LINHA_DE_TROPA_INVALIDA, linha=linha)
         return None
 
-def _parse_linha_transporte(linha):
+def _parse_linha_transporte(linha, eventos):
     """Traduz uma única linha de comando de transporte."""
     try:
         # Expressão regular para capturar os dados da missão de forma robusta
@@ -42,28 +49,29 @@ def _parse_linha_transporte(linha):
         match = padrao.match(linha)
         
         if not match:
-            print(f"AVISO: Formato de missão de transporte inválido: '{linha}'. Linha ignorada.")
+            eventos.emitir(MISSAO_MAL_FORMATADA, linha=linha)
             return None
         
         quantidade_str, origem, destino = match.groups()
         quantidade = 'MAX' if quantidade_str.upper() == 'MAX' else int(quantidade_str)
         
         fila_de_comandos = [
-            {'tipo': 'COLETAR', 'alvo': origem, 'quantidade': quantidade},
-            {'tipo': 'ENTREGAR', 'alvo': destino}
+            Comando(COLETAR, origem, quantidade),
+            Comando(ENTREGAR, destino)
         ]
         return fila_de_comandos
     except (ValueError, IndexError):
-        print(f"AVISO: Erro de formatação na linha de transporte: '{linha}'. Linha ignorada.")
+        eventos.emitir(LINHA_DE_TRANSPORTE_INVALIDA, linha=linha)
         return None
 
-def parse_string_de_ordens(texto_das_ordens):
+def parse_string_de_ordens(texto_das_ordens, eventos=_SEM_EVENTOS):
     """
     Função principal do parser. Recebe uma STRING com as ordens de um jogador
-    e a traduz para um dicionário estruturado.
+    e a traduz para um dicionário estruturado. Avisos sobre linhas inválidas
+    são emitidos em 'eventos' (ver eventos.py).
     """
     if not isinstance(texto_das_ordens, str):
-        print("AVISO: A IA não retornou uma string de ordens. Ignorando.")
+        eventos.emitir(ORDENS_AUSENTES)
         return {"novas_tropas": [], "transporte": None}
 
     ordens = {"novas_tropas": [], "transporte": None}
@@ -82,11 +90,11 @@ def parse_string_de_ordens(texto_das_ordens):
             continue
 
         if secao_atual == "TROPAS":
-            ordem_tropa = _parse_linha_tropa(linha)
+            ordem_tropa = _parse_linha_tropa(linha, eventos)
             if ordem_tropa:
                 ordens["novas_tropas"].append(ordem_tropa)
         elif secao_atual == "TRANSPORTE":
-            ordem_transporte = _parse_linha_transporte(linha)
+            ordem_transporte = _parse_linha_transporte(linha, eventos)
             if ordem_transporte:
                 ordens["transporte"] = ordem_transporte
     
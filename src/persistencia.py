@@ -0,0 +1,128 @@
+import atexit
+import json
+import os
+import threading
+import weakref
+from collections import OrderedDict
+
+class GravadorDeEstados:
+    """
+    Grava os arquivos de estado em uma thread separada, fora do laço de turnos.
+
+    Os pedidos ficam em uma fila limitada, indexada pelo caminho do arquivo: se o
+    mesmo arquivo for pedido de novo antes de ser gravado (a engine grava o
+    estado_turno_N duas vezes por turno), só a versão mais recente é escrita.
+    Com a fila cheia, quem pede espera (backpressure) em vez de acumular memória.
+    Os estados são gravados em JSON compacto, sem indentação.
+
+    A thread termina sozinha depois de 'ocioso' segundos sem pedidos (e volta no
+    próximo pedido), então um gravador esquecido não a mantém viva para sempre.
+    """
+    def __init__(self, max_pendentes=4, indentacao=None, ocioso=1.0):
+        self.max_pendentes = max_pendentes
+        self.indentacao = indentacao
+        self.ocioso = ocioso
+        self._pendentes = OrderedDict()  # caminho -> estado, na ordem dos pedidos
+        self._gravando = 0
+        self._condicao = threading.Condition()
+        self._diretorios_criados = set()
+        self._erro = None
+        self._fechado = False
+        self._thread = None
+
+    def gravar(self, caminho, estado):
+        """
+        Agenda a gravação do estado: o dicionário, que passa a pertencer ao gravador e não
+        deve ser alterado depois desta chamada, ou uma função sem argumentos que o monta,
+        chamada na thread do gravador (a engine passa uma que monta o estado de um instantâneo).
+        """
+        with self._condicao:
+            self._levantar_erro()
+            if self._fechado:
+                raise RuntimeError("O gravador de estados já foi fechado.")
+            if caminho in self._pendentes:
+                self._pendentes[caminho] = estado  # Substitui a versão antiga, mantendo a posição na fila
+            else:
+                while len(self._pendentes) >= self.max_pendentes and self._erro is None:
+                    self._condicao.wait()
+                self._levantar_erro()
+                self._pendentes[caminho] = estado
+            self._iniciar_thread()
+            self._condicao.notify_all()
+
+    def esperar(self):
+        """Bloqueia até que todos os estados pedidos tenham sido gravados."""
+        with self._condicao:
+            while (self._pendentes or self._gravando) and self._erro is None:
+                self._condicao.wait()
+            self._levantar_erro()
+
+    def fechar(self):
+        """Grava o que falta e encerra a thread."""
+        with self._condicao:
+            if self._fechado:
+                return
+        try:
+            self.esperar()
+        finally:
+            with self._condicao:
+                self._fechado = True
+                self._condicao.notify_all()
+                thread = self._thread
+            if thread is not None:
+                thread.join()
+
+    def _iniciar_thread(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._trabalhar, name="gravador-de-estados", daemon=True)
+            self._thread.start()
+            # A thread é daemon: garante que nada pendente se perca ao fim do programa
+            _ABERTOS.add(self)
+
+    def _levantar_erro(self):
+        if self._erro is not None:
+            erro, self._erro = self._erro, None
+            raise erro
+
+    def _trabalhar(self):
+        while True:
+            with self._condicao:
+                if not self._pendentes and not self._fechado:
+                    self._condicao.wait(self.ocioso)
+                if not self._pendentes:
+                    self._thread = None  # Fechado, ou ocioso: um novo pedido inicia outra thread
+                    return
+                caminho, estado = self._pendentes.popitem(last=False)
+                self._gravando += 1
+                self._condicao.notify_all()  # Abriu espaço na fila
+            try:
+                self._escrever(caminho, estado)
+            except Exception as erro:
+                with self._condicao:
+                    self._erro = erro
+            finally:
+                with self._condicao:
+                    self._gravando -= 1
+                    self._condicao.notify_all()
+
+    def _escrever(self, caminho, estado):
+        if callable(estado):
+            estado = estado()
+        if self.indentacao is None:
+            texto = json.dumps(estado, separators=(',', ':'))
+        else:
+            texto = json.dumps(estado, indent=self.indentacao)
+        diretorio = os.path.dirname(caminho)
+        if diretorio and diretorio not in self._diretorios_criados:
+            os.makedirs(diretorio, exist_ok=True)
+            self._diretorios_criados.add(diretorio)
+        with open(caminho, 'w', encoding='utf-8') as f:
+            f.write(texto)
+
+# Gravadores com thread, fechados ao fim do programa (sem impedir que os esquecidos sejam liberados)
+_ABERTOS = weakref.WeakSet()
+
+@atexit.register
+def _fechar_no_fim():
+    for gravador in list(_ABERTOS):
+        gravador.fechar()
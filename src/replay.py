@@ -0,0 +1,337 @@
+"""
+Replay de uma partida em um único arquivo, só com acréscimos (append-only).
+
+Formato:
+    MAGICA
+    quadros: [tipo (1 byte)][tamanho (4 bytes, big-endian)][JSON comprimido com zlib]
+    rodapé:  [posição do quadro de índice (8 bytes)][FIM]
+
+Tipos de quadro:
+    M  mapa estático (cidades na ordem original e arestas), gravado uma vez
+    K  quadro-chave: estado dinâmico completo de um turno
+    D  delta: só o que mudou desde o quadro anterior
+    I  índice: [[turno, posição, é_quadro_chave], ...] de todos os quadros de turno
+
+A cada 'intervalo_quadros_chave' turnos é gravado um quadro-chave, então
+reconstruir qualquer turno custa um quadro-chave mais, no máximo, esse número
+de deltas. Se o arquivo ficou sem rodapé (partida interrompida), o leitor
+reconstrói o índice percorrendo os quadros.
+
+Uso como ferramenta, para converter os estados antigos de uma pasta:
+    python src/replay.py estados partida.replay
+"""
+import glob
+import json
+import os
+import re
+import struct
+import sys
+import zlib
+from eventos import (
+    CONQUISTA, CONQUISTA_FALHOU, COMBATE, VITORIA_NO_COMBATE, DEFESA_VITORIOSA, RECUO, ISOLAMENTO,
+    FALENCIA, TRANSPORTE_DESTRUIDO
+)
+
+MAGICA = b"REPLAY1\n"
+FIM = b"RPLYFIM\n"
+_CABECALHO_QUADRO = struct.Struct(">cI")
+_RODAPE = struct.Struct(">Q8s")
+
+# Eventos guardados junto com cada turno quando o replay é gravado pelo Simulador
+TIPOS_DE_EVENTO_NO_REPLAY = (
+    CONQUISTA, CONQUISTA_FALHOU, COMBATE, VITORIA_NO_COMBATE, DEFESA_VITORIOSA, RECUO, ISOLAMENTO,
+    FALENCIA, TRANSPORTE_DESTRUIDO
+)
+
+MAPA = b"M"
+QUADRO_CHAVE = b"K"
+DELTA = b"D"
+INDICE = b"I"
+
+def mapa_estatico(estado):
+    """Parte do estado que não muda durante a partida: IDs das cidades (na ordem do mapa) e arestas."""
+    return {"cidades": [c["id"] for c in estado["mapa"]["cidades"]],
+            "arestas": [[a["de"], a["para"], a["peso"]] for a in estado["mapa"]["arestas"]]}
+
+def estado_dinamico(estado):
+    """
+    Converte um estado de Jogo.gerar_estado_json para a forma usada no replay:
+    só a parte que muda, em dicionários indexados por ID (a ordem é preservada).
+    """
+    tropas = {j["id"]: {} for j in estado["jogadores"]}
+    for tropa in estado["tropas_em_campo"]:
+        tropas.setdefault(tropa["dono"], {})[tropa["id"]] = [tropa["forca"], tropa["localizacao"]]
+    return {
+        "turno": estado["turno_atual"],
+        "cidades": {c["id"]: [c["populacao"], c["dono"], [[t["id"], t["forca"]] for t in c["tropas_estacionadas"]]]
+                    for c in estado["mapa"]["cidades"]},
+        "jogadores": {j["id"]: [j["tropas_na_base"], j["cidades_possuidas"]] for j in estado["jogadores"]},
+        "tropas": tropas,
+        "transportes": {t["dono"]: [t["localizacao"], t["carga_populacao"], t["estado"]] for t in estado["transportes"]},
+    }
+
+def montar_estado(mapa, dinamico):
+    """Faz o caminho inverso de estado_dinamico, devolvendo o estado no formato de gerar_estado_json."""
+    cidades = dinamico["cidades"]
+    return {
+        "turno_atual": dinamico["turno"],
+        "mapa": {
+            "cidades": [{"id": cidade_id, "populacao": cidades[cidade_id][0], "dono": cidades[cidade_id][1],
+                         "tropas_estacionadas": [{"id": t, "forca": f} for t, f in cidades[cidade_id][2]]}
+                        for cidade_id in mapa["cidades"]],
+            "arestas": [{"de": de, "para": para, "peso": peso} for de, para, peso in mapa["arestas"]],
+        },
+        "jogadores": [{"id": jogador_id, "tropas_na_base": base, "cidades_possuidas": possuidas}
+                      for jogador_id, (base, possuidas) in dinamico["jogadores"].items()],
+        "tropas_em_campo": [{"id": tropa_id, "dono": dono, "forca": forca, "localizacao": localizacao}
+                            for dono, tropas in dinamico["tropas"].items()
+                            for tropa_id, (forca, localizacao) in tropas.items()],
+        "transportes": [{"dono": dono, "localizacao": localizacao, "carga_populacao": carga, "estado": estado}
+                        for dono, (localizacao, carga, estado) in dinamico["transportes"].items()],
+    }
+
+def calcular_delta(anterior, atual):
+    """
+    Diferença entre dois estados dinâmicos: para cidades, jogadores e transportes,
+    só as entradas que mudaram; para as tropas de cada dono, as alteradas ou novas
+    ('+') e as removidas ('-'), ou a lista inteira ('=') quando só isso preserva a ordem.
+    """
+    delta = {"turno": atual["turno"]}
+    for secao in ("cidades", "jogadores", "transportes"):
+        antes = anterior[secao]
+        mudancas = {k: v for k, v in atual[secao].items() if antes.get(k) != v}
+        removidas = [k for k in antes if k not in atual[secao]]
+        if mudancas:
+            delta[secao] = mudancas
+        if removidas:
+            delta[secao + "-"] = removidas
+
+    tropas = {}
+    for dono, atuais in atual["tropas"].items():
+        antes = anterior["tropas"].get(dono, {})
+        if antes == atuais and list(antes) == list(atuais):
+            continue
+        mudanca = {}
+        removidas = [t for t in antes if t not in atuais]
+        alteradas = {t: v for t, v in atuais.items() if antes.get(t) != v}
+        if removidas: mudanca["-"] = removidas
+        if alteradas: mudanca["+"] = alteradas
+        # Confere se aplicar a mudança mantém a ordem das tropas; se não, manda a lista inteira
+        if list(_aplicar_tropas(antes, mudanca)) != list(atuais):
+            mudanca = {"=": atuais}
+        tropas[dono] = mudanca
+    if tropas:
+        delta["tropas"] = tropas
+    return delta
+
+def _aplicar_tropas(tropas, mudanca):
+    if "=" in mudanca:
+        return dict(mudanca["="])
+    tropas = dict(tropas)
+    for tropa_id in mudanca.get("-", ()):
+        del tropas[tropa_id]
+    tropas.update(mudanca.get("+", {}))
+    return tropas
+
+def aplicar_delta(dinamico, delta):
+    """Aplica um delta de calcular_delta sobre um estado dinâmico, devolvendo um novo."""
+    novo = {"turno": delta["turno"]}
+    for secao in ("cidades", "jogadores", "transportes"):
+        if secao in delta or secao + "-" in delta:
+            valores = dict(dinamico[secao])
+            for chave in delta.get(secao + "-", ()):
+                del valores[chave]
+            valores.update(delta.get(secao, {}))
+            novo[secao] = valores
+        else:
+            novo[secao] = dinamico[secao]
+    tropas = dict(dinamico["tropas"])
+    for dono, mudanca in delta.get("tropas", {}).items():
+        tropas[dono] = _aplicar_tropas(tropas.get(dono, {}), mudanca)
+    novo["tropas"] = tropas
+    return novo
+
+class EscritorDeReplay:
+    """Grava uma partida, turno a turno, em um arquivo de replay."""
+    def __init__(self, caminho, intervalo_quadros_chave=50, nivel_compressao=6):
+        self.caminho = caminho
+        self.intervalo_quadros_chave = intervalo_quadros_chave
+        self.nivel_compressao = nivel_compressao
+        diretorio = os.path.dirname(caminho)
+        if diretorio:
+            os.makedirs(diretorio, exist_ok=True)
+        self._arquivo = open(caminho, "wb")
+        self._arquivo.write(MAGICA)
+        self._indice = []  # [turno, posição, é_quadro_chave]
+        self._mapa = None
+        self._anterior = None
+        self._deltas_desde_quadro_chave = 0
+
+    def _escrever_quadro(self, tipo, dados):
+        posicao = self._arquivo.tell()
+        conteudo = zlib.compress(json.dumps(dados, separators=(",", ":")).encode("utf-8"), self.nivel_compressao)
+        self._arquivo.write(_CABECALHO_QUADRO.pack(tipo, len(conteudo)))
+        self._arquivo.write(conteudo)
+        return posicao
+
+    def registrar_turno(self, estado, eventos=None):
+        """
+        Acrescenta um estado (no formato de Jogo.gerar_estado_json). O primeiro grava
+        também o mapa estático. 'eventos', se houver, é uma lista de dicionários
+        (ver Evento.para_dict) guardada junto com o quadro.
+        """
+        if self._mapa is None:
+            self._mapa = mapa_estatico(estado)
+            self._escrever_quadro(MAPA, self._mapa)
+
+        atual = estado_dinamico(estado)
+        quadro_chave = self._anterior is None or self._deltas_desde_quadro_chave + 1 >= self.intervalo_quadros_chave
+        dados = atual if quadro_chave else calcular_delta(self._anterior, atual)
+        if eventos:
+            dados = dict(dados, eventos=eventos)
+        posicao = self._escrever_quadro(QUADRO_CHAVE if quadro_chave else DELTA, dados)
+        self._indice.append([atual["turno"], posicao, quadro_chave])
+        self._deltas_desde_quadro_chave = 0 if quadro_chave else self._deltas_desde_quadro_chave + 1
+        self._anterior = atual
+
+    def fechar(self):
+        """Grava o índice e o rodapé. Depois disso o arquivo não aceita mais turnos."""
+        if self._arquivo.closed:
+            return
+        posicao_indice = self._escrever_quadro(INDICE, self._indice)
+        self._arquivo.write(_RODAPE.pack(posicao_indice, FIM))
+        self._arquivo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.fechar()
+
+class LeitorDeReplay:
+    """Lê um arquivo de replay, permitindo ir direto a qualquer turno."""
+    def __init__(self, caminho):
+        self._arquivo = open(caminho, "rb")
+        if self._arquivo.read(len(MAGICA)) != MAGICA:
+            self._arquivo.close()
+            raise ValueError(f"'{caminho}' não é um arquivo de replay.")
+        tipo, self.mapa = self._ler_quadro(len(MAGICA))
+        if tipo != MAPA:
+            raise ValueError(f"'{caminho}' não começa pelo mapa estático.")
+        self.indice = self._ler_indice()
+
+    def _ler_quadro(self, posicao):
+        self._arquivo.seek(posicao)
+        cabecalho = self._arquivo.read(_CABECALHO_QUADRO.size)
+        if len(cabecalho) < _CABECALHO_QUADRO.size:
+            return None, None
+        tipo, tamanho = _CABECALHO_QUADRO.unpack(cabecalho)
+        conteudo = self._arquivo.read(tamanho)
+        if len(conteudo) < tamanho:
+            return None, None  # Quadro incompleto (gravação interrompida)
+        return tipo, json.loads(zlib.decompress(conteudo))
+
+    def _ler_indice(self):
+        self._arquivo.seek(0, os.SEEK_END)
+        tamanho = self._arquivo.tell()
+        if tamanho >= len(MAGICA) + _RODAPE.size:
+            self._arquivo.seek(tamanho - _RODAPE.size)
+            posicao_indice, fim = _RODAPE.unpack(self._arquivo.read(_RODAPE.size))
+            if fim == FIM:
+                tipo, indice = self._ler_quadro(posicao_indice)
+                if tipo == INDICE:
+                    return indice
+
+        # Sem rodapé: percorre os quadros para montar o índice
+        indice = []
+        self._arquivo.seek(len(MAGICA))
+        posicao = len(MAGICA)
+        while True:
+            self._arquivo.seek(posicao)
+            cabecalho = self._arquivo.read(_CABECALHO_QUADRO.size)
+            if len(cabecalho) < _CABECALHO_QUADRO.size:
+                break
+            tipo, tamanho = _CABECALHO_QUADRO.unpack(cabecalho)
+            if tipo in (QUADRO_CHAVE, DELTA):
+                tipo, dados = self._ler_quadro(posicao)
+                if tipo is None:
+                    break
+                indice.append([dados["turno"], posicao, tipo == QUADRO_CHAVE])
+            posicao += _CABECALHO_QUADRO.size + tamanho
+        return indice
+
+    @property
+    def turnos(self):
+        """Turnos gravados, em ordem (um turno pode aparecer mais de uma vez)."""
+        return [turno for turno, _, _ in self.indice]
+
+    def _dinamico_do_quadro(self, i):
+        inicio = i
+        while not self.indice[inicio][2]:
+            inicio -= 1
+        _, dinamico = self._ler_quadro(self.indice[inicio][1])
+        for j in range(inicio + 1, i + 1):
+            _, delta = self._ler_quadro(self.indice[j][1])
+            dinamico = aplicar_delta(dinamico, delta)
+        return dinamico
+
+    def estado(self, turno):
+        """Estado completo (formato de gerar_estado_json) do último quadro gravado para o turno."""
+        for i in range(len(self.indice) - 1, -1, -1):
+            if self.indice[i][0] == turno:
+                return montar_estado(self.mapa, self._dinamico_do_quadro(i))
+        raise KeyError(turno)
+
+    def eventos(self, i):
+        """Eventos guardados junto com o i-ésimo quadro."""
+        _, dados = self._ler_quadro(self.indice[i][1])
+        return dados.get("eventos", [])
+
+    def __iter__(self):
+        """Percorre todos os estados em ordem, aplicando cada delta uma única vez."""
+        dinamico = None
+        for _, posicao, quadro_chave in self.indice:
+            _, dados = self._ler_quadro(posicao)
+            dinamico = dados if quadro_chave else aplicar_delta(dinamico, dados)
+            yield montar_estado(self.mapa, dinamico)
+
+    def fechar(self):
+        self._arquivo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.fechar()
+
+def converter_estados(diretorio, caminho_replay, intervalo_quadros_chave=50):
+    """
+    Converte os arquivos estado_turno_N.json (e estado_final_turno_N.json, se houver)
+    de um diretório em um único replay. Retorna o número de turnos gravados.
+
+    O replay gravado pelo simulador guarda em cada turno o estado em que as IAs dão as
+    ordens. O arquivo estado_turno_N.json tem o estado do fim do turno N, que é o do
+    início do turno N + 1: ele entra no replay como turno N + 1, e estado(t) é o mesmo
+    nos dois replays. O turno 0 não tem arquivo, e com avanco_rapido os turnos depois de
+    um trecho quieto aparecem no turno seguinte ao último arquivo gravado.
+    """
+    def numero(caminho):
+        return int(re.search(r"(\d+)\.json$", caminho).group(1))
+
+    arquivos = [(caminho, 1) for caminho in sorted(glob.glob(os.path.join(diretorio, "estado_turno_*.json")), key=numero)]
+    # O estado final já é o do turno em que a partida acabou, como no replay do simulador
+    arquivos += [(caminho, 0) for caminho in sorted(glob.glob(os.path.join(diretorio, "estado_final_turno_*.json")), key=numero)]
+    with EscritorDeReplay(caminho_replay, intervalo_quadros_chave) as escritor:
+        for caminho, avanco in arquivos:
+            with open(caminho, "r", encoding="utf-8") as f:
+                estado = json.load(f)
+            estado["turno_atual"] += avanco
+            escritor.registrar_turno(estado)
+    return len(arquivos)
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Uso: python src/replay.py <diretorio_de_estados> <arquivo.replay>")
+        sys.exit(1)
+    total = converter_estados(sys.argv[1], sys.argv[2])
+    print(f"{total} estados convertidos para '{sys.argv[2]}' ({os.path.getsize(sys.argv[2])} bytes).")
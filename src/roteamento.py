@@ -0,0 +1,173 @@
+from array import array
+from collections import OrderedDict, deque
+
+NAO_ALCANCADA = -2
+RAIZ = -1
+
+class TabelaDeRotas:
+    """
+    Tabelas de roteamento (distância em saltos e próximo passo) calculadas
+    sobre o núcleo CSR do mapa (Mapa.grafo).
+
+    Como a topologia não muda depois de carregar o mundo, cada busca em largura
+    é feita uma única vez por cidade de origem e guardada em cache. O cache é
+    limitado (LRU) para que mapas muito grandes não guardem N² entradas.
+    """
+    def __init__(self, mapa, max_origens=256):
+        self._mapa = mapa
+        self.max_origens = max_origens
+        self._arvores = OrderedDict()
+
+    def invalidar(self):
+        """Descarta todas as tabelas calculadas (usado quando a topologia muda)."""
+        self._arvores.clear()
+
+    def _arvore(self, origem):
+        """
+        Retorna a árvore de BFS a partir do índice de uma origem: (pai, distancia, primeiro_passo),
+        arrays indexados pelo índice da cidade. Os vizinhos são visitados na ordem da lista de
+        adjacência, então os caminhos são exatamente os mesmos que a BFS por chamada produzia.
+        """
+        arvore = self._arvores.get(origem)
+        if arvore is not None:
+            self._arvores.move_to_end(origem)
+            return arvore
+
+        grafo = self._mapa.grafo
+        inicio, vizinhos = grafo.inicio, grafo.vizinhos
+        n = len(grafo)
+        pai = array('i', [NAO_ALCANCADA]) * n
+        distancia = array('i', [-1]) * n
+        primeiro_passo = array('i', [-1]) * n
+        pai[origem] = RAIZ
+        distancia[origem] = 0
+        fila = deque([origem])
+        while fila:
+            atual = fila.popleft()
+            dist_vizinho = distancia[atual] + 1
+            passo = primeiro_passo[atual]
+            for k in range(inicio[atual], inicio[atual + 1]):
+                vizinho = vizinhos[k]
+                if pai[vizinho] == NAO_ALCANCADA:
+                    pai[vizinho] = atual
+                    distancia[vizinho] = dist_vizinho
+                    primeiro_passo[vizinho] = vizinho if passo == -1 else passo
+                    fila.append(vizinho)
+
+        arvore = (pai, distancia, primeiro_passo)
+        self._arvores[origem] = arvore
+        if len(self._arvores) > self.max_origens:
+            self._arvores.popitem(last=False)
+        return arvore
+
+    def distancia(self, inicio_id, fim_id):
+        """Número de saltos entre duas cidades, ou None se não houver caminho."""
+        indice = self._mapa.grafo.indice
+        inicio, fim = indice.get(inicio_id), indice.get(fim_id)
+        if inicio is None or fim is None:
+            return None
+        _, distancia, _ = self._arvore(inicio)
+        return None if distancia[fim] < 0 else distancia[fim]
+
+    def proximo_passo(self, inicio_id, fim_id):
+        """Primeira cidade do caminho mais curto de inicio_id até fim_id (None se já chegou ou não há caminho)."""
+        grafo = self._mapa.grafo
+        inicio, fim = grafo.indice.get(inicio_id), grafo.indice.get(fim_id)
+        if inicio is None or fim is None:
+            return None
+        _, _, primeiro_passo = self._arvore(inicio)
+        return None if primeiro_passo[fim] < 0 else grafo.ids[primeiro_passo[fim]]
+
+    def caminho(self, inicio_id, fim_id):
+        """Caminho mais curto (incluindo as duas pontas) ou None. Custa O(tamanho do caminho)."""
+        if inicio_id == fim_id: return [inicio_id]
+        grafo = self._mapa.grafo
+        inicio, fim = grafo.indice.get(inicio_id), grafo.indice.get(fim_id)
+        if inicio is None or fim is None:
+            return None
+        pai, _, _ = self._arvore(inicio)
+        return _reconstruir_caminho(pai, fim, grafo.ids)
+
+def _reconstruir_caminho(pai, fim, ids):
+    if pai[fim] == NAO_ALCANCADA:
+        return None
+    caminho = []
+    no = fim
+    while no != RAIZ:
+        caminho.append(ids[no])
+        no = pai[no]
+    caminho.reverse()
+    return caminho
+
+class RotasDeTerritorio:
+    """
+    Rotas restritas ao território de um único dono: todas as cidades do caminho,
+    exceto a de origem, precisam pertencer a ele.
+
+    O território vem do dono de cada cidade no Mapa (atualizado por Mapa.definir_dono),
+    que avisa esta classe a cada mudança. As árvores de BFS em cache são invalidadas
+    de forma incremental: ao perder uma cidade, só caem as árvores que passavam por
+    ela; ao ganhar uma cidade, só as que alcançavam algum vizinho dela.
+    """
+    def __init__(self, mapa, dono, max_origens=64):
+        self._mapa = mapa
+        self.dono = dono
+        self.max_origens = max_origens
+        self._arvores = OrderedDict()
+
+    @property
+    def territorio(self):
+        return self._mapa.get_cidades_do_dono(self.dono)
+
+    def invalidar(self):
+        self._arvores.clear()
+
+    def adicionar(self, cidade_id):
+        """Avisa que a cidade entrou no território e descarta as árvores que podem ter mudado."""
+        grafo = self._mapa.grafo
+        i = grafo.indice[cidade_id]
+        vizinhos = grafo.vizinhos[grafo.inicio[i]:grafo.inicio[i + 1]]
+        for origem in [o for o, pai in self._arvores.items()
+                       if any(pai[v] != NAO_ALCANCADA for v in vizinhos)]:
+            del self._arvores[origem]
+
+    def remover(self, cidade_id):
+        """Avisa que a cidade saiu do território e descarta as árvores que passavam por ela."""
+        i = self._mapa.grafo.indice[cidade_id]
+        for origem in [o for o, pai in self._arvores.items() if o != i and pai[i] != NAO_ALCANCADA]:
+            del self._arvores[origem]
+
+    def _arvore(self, origem):
+        pai = self._arvores.get(origem)
+        if pai is not None:
+            self._arvores.move_to_end(origem)
+            return pai
+
+        grafo = self._mapa.grafo
+        inicio, vizinhos = grafo.inicio, grafo.vizinhos
+        dono_por_indice = self._mapa.dono_por_indice
+        dono = self.dono
+        pai = array('i', [NAO_ALCANCADA]) * len(grafo)
+        pai[origem] = RAIZ
+        fila = deque([origem])
+        while fila:
+            atual = fila.popleft()
+            for k in range(inicio[atual], inicio[atual + 1]):
+                vizinho = vizinhos[k]
+                if pai[vizinho] == NAO_ALCANCADA and dono_por_indice[vizinho] == dono:
+                    pai[vizinho] = atual
+                    fila.append(vizinho)
+
+        self._arvores[origem] = pai
+        if len(self._arvores) > self.max_origens:
+            self._arvores.popitem(last=False)
+        return pai
+
+    def caminho(self, inicio_id, fim_id):
+        """Caminho mais curto que fica dentro do território, ou None se não existir."""
+        if inicio_id == fim_id: return [inicio_id]
+        grafo = self._mapa.grafo
+        inicio, fim = grafo.indice.get(inicio_id), grafo.indice.get(fim_id)
+        if inicio is None or fim is None:
+            return None
+        return _reconstruir_caminho(self._arvore(inicio), fim, grafo.ids)
@@ -0,0 +1,389 @@
+"""
+IAs isoladas: cada IA roda no seu próprio processo, e o simulador pede as ordens de
+todas ao mesmo tempo, esperando cada uma no máximo o seu prazo (ver Simulador,
+parâmetro prazo_por_turno). Uma IA lenta ou travada não segura mais a partida: se
+não responder a tempo, o jogador fica sem ordens naquele turno.
+
+O processo da IA tem uma cópia do jogo, restaurada a cada turno a partir do
+instantâneo do jogo de verdade (Jogo.snapshot), então a IA recebe o mesmo
+EstadoDoJogo e o mesmo MapaSomenteLeitura que receberia no processo do simulador.
+IAs com PROTOCOLO_DELTA recebem o instantâneo só no primeiro turno; depois, só o
+delta calculado pelo simulador, aplicado também à cópia do jogo (ver _aplicar_delta).
+Com um PoolDeIAs, os processos (e as IAs) são reaproveitados de uma partida para outra.
+
+Exceções da IA são levantadas no simulador como ErroNaIA, como aconteceria se ela
+rodasse no mesmo processo.
+"""
+import asyncio
+import inspect
+import math
+import multiprocessing
+import pickle
+import random
+import threading
+import time
+import traceback
+import weakref
+from collections import deque
+import checkpoint
+import replay
+from engine import Jogo, Tropa
+from ias.ia_interface import PROTOCOLO_DELTA
+
+# Mensagens entre o simulador e o processo da IA
+_NOVA_PARTIDA = 'nova_partida'  # (_NOVA_PARTIDA, jogador_id, caminho do mapa, semente)
+_TURNO = 'turno'        # (_TURNO, pedido, instantâneo serializado ou None, delta ou None)
+_CHAMADA = 'chamada'    # (_CHAMADA, nome do método, argumentos)
+_ENCERRAR = 'encerrar'
+_PRONTA = 'pronta'      # (_PRONTA,), depois de _NOVA_PARTIDA
+_ORDENS = 'ordens'      # (_ORDENS, pedido, ordens, segundos pensando, turno_para_acordar)
+_RESPOSTA = 'resposta'  # (_RESPOSTA, valor)
+_ERRO = 'erro'          # (_ERRO, traceback em texto)
+
+class ErroNaIA(RuntimeError):
+    """Exceção levantada pela IA no seu processo (ou o processo dela terminou)."""
+
+def serializar_instantaneo(jogo):
+    """Instantâneo do jogo pronto para ser enviado, uma vez por turno, a todas as IAs isoladas."""
+    return pickle.dumps(checkpoint.instantaneo_para_dict(jogo.snapshot()), protocol=pickle.HIGHEST_PROTOCOL)
+
+def _aplicar_delta(jogo, delta):
+    """
+    Leva a cópia do jogo de uma IA com PROTOCOLO_DELTA ao turno do delta (replay.calcular_delta),
+    sem o instantâneo: donos, populações e guarnições das cidades, tropas (força e localização),
+    tropas na base e transportes ficam como no jogo de verdade, que é o que o MapaSomenteLeitura
+    mostra. Os comandos e caminhos das tropas não vêm no delta.
+    """
+    mapa = jogo.mapa
+    jogo.turno_atual = delta["turno"]
+    for jogador_id, (tropas_na_base, _) in delta.get("jogadores", {}).items():
+        jogo.jogadores[jogador_id].tropas_na_base = tropas_na_base
+    for jogador_id, (localizacao, carga, estado) in delta.get("transportes", {}).items():
+        transporte = jogo.jogadores[jogador_id].transporte
+        transporte.localizacao, transporte.carga_populacao, transporte.estado = localizacao, carga, estado
+
+    for jogador_id, mudanca in delta.get("tropas", {}).items():
+        jogador = jogo.jogadores[jogador_id]
+        registro = jogador.tropas
+        atuais = replay._aplicar_tropas({tropa.id: (tropa.forca, tropa.localizacao) for tropa in registro}, mudanca)
+        for tropa in list(registro):
+            if tropa.id not in atuais or "=" in mudanca:  # Com '=', as tropas voltam na nova ordem
+                registro.remove(tropa)
+                mapa.remover_tropa(tropa)
+        for tropa_id, (forca, localizacao) in atuais.items():
+            tropa = registro.get(tropa_id)
+            if tropa is None:
+                tropa = Tropa(tropa_id, jogador, forca)
+                registro.append(tropa)
+                mapa.registrar_tropa(tropa)
+            tropa.forca = forca
+            if tropa.localizacao != localizacao:
+                mapa.mover_tropa(tropa, localizacao)
+
+    for cidade_id, (populacao, dono, estacionadas) in delta.get("cidades", {}).items():
+        cidade = mapa.cidades[cidade_id]
+        cidade.populacao = populacao
+        mapa.definir_dono(cidade_id, dono)
+        presentes = {tropa.id: tropa for tropa in mapa.get_tropas_em(cidade_id)}
+        for tropa in cidade.tropas_estacionadas:
+            if tropa.estado == 'estacionada':
+                tropa.estado = 'movendo'
+        cidade.tropas_estacionadas = [presentes[tropa_id] for tropa_id, _ in estacionadas]
+        for tropa in cidade.tropas_estacionadas:
+            tropa.estado = 'estacionada'
+
+def _hospedar(conexao, classe_ia):
+    """
+    Laço do processo da IA: prepara a IA para cada partida, restaura a cópia do jogo a
+    cada turno e devolve as ordens. O processo (e a IA) pode servir a várias partidas.
+    """
+    pendentes, disponivel = deque(), threading.Condition()
+    threading.Thread(target=_ler_mensagens, args=(conexao, pendentes, disponivel), daemon=True).start()
+    jogo = Jogo()
+    jogo.salvar_estados = False
+    topologia, ia, com_delta, laco = None, None, False, None
+    while True:
+        with disponivel:
+            while not pendentes:
+                disponivel.wait()
+            mensagem = pendentes.popleft()
+            tipo = mensagem[0]
+            # Se a IA se atrasou e já há um turno mais novo (ou outra partida), o turno atrasado
+            # não interessa mais; IAs com delta precisam de todos os turnos da partida
+            superada = tipo == _TURNO and pendentes and (
+                pendentes[0][0] == _NOVA_PARTIDA or (not com_delta and pendentes[0][0] == _TURNO))
+        if tipo == _ENCERRAR:
+            return
+        if superada:
+            continue
+        try:
+            if tipo == _TURNO:
+                _, pedido, instantaneo, delta = mensagem
+                inicio = time.perf_counter()
+                if instantaneo is not None:
+                    jogo.restore(checkpoint.instantaneo_do_dict(pickle.loads(instantaneo), topologia))
+                else:
+                    _aplicar_delta(jogo, delta)  # IA com delta: o instantâneo veio só no primeiro turno
+                if com_delta:
+                    entrada = delta
+                elif getattr(ia, 'estado_sob_demanda', False):
+                    entrada = jogo.estado_do_jogo()
+                else:
+                    entrada = jogo.gerar_estado_json("", salvar_arquivo=False)
+                ordens = ia.decidir_acoes(entrada, jogo.mapa_somente_leitura)
+                del entrada
+                if inspect.isawaitable(ordens):  # decidir_acoes assíncrono: um laço de eventos para a IA
+                    laco = laco or asyncio.new_event_loop()
+                    ordens = laco.run_until_complete(ordens)
+                turno_para_acordar = getattr(ia, 'turno_para_acordar', None)
+                conexao.send((_ORDENS, pedido, ordens, time.perf_counter() - inicio,
+                              None if turno_para_acordar is None else turno_para_acordar()))
+            elif tipo == _NOVA_PARTIDA:
+                _, jogador_id, caminho_mapa, semente = mensagem
+                if semente is not None:
+                    random.seed(semente)
+                jogo.carregar_mundo(caminho_mapa)  # A topologia fica em cache entre partidas no mesmo mapa
+                topologia = jogo.mapa.congelar_topologia()
+                nova_partida = getattr(ia, 'nova_partida', None)
+                if nova_partida is None:  # Primeira partida, ou IA fora da interface: criada do zero
+                    ia = classe_ia(jogador_id)
+                else:
+                    nova_partida(jogador_id, jogo.mapa_somente_leitura)
+                com_delta = getattr(ia, 'protocolo', None) == PROTOCOLO_DELTA
+                conexao.send((_PRONTA,))
+            else:
+                _, nome, argumentos = mensagem
+                metodo = getattr(ia, nome, None)  # Os métodos opcionais podem não existir em IAs fora da interface
+                conexao.send((_RESPOSTA, None if metodo is None else metodo(*argumentos)))
+        except Exception:
+            conexao.send((_ERRO, traceback.format_exc()))
+
+def _ler_mensagens(conexao, pendentes, disponivel):
+    """
+    Thread do processo da IA que esvazia o pipe o tempo todo, mesmo com a IA ocupada,
+    para que o simulador nunca fique bloqueado ao enviar um turno.
+    """
+    while True:
+        try:
+            mensagem = conexao.recv()
+        except (EOFError, OSError):  # O simulador foi embora
+            mensagem = (_ENCERRAR,)
+        with disponivel:
+            pendentes.append(mensagem)
+            disponivel.notify()
+        if mensagem[0] == _ENCERRAR:
+            return
+
+def _terminar(processo, conexao):
+    """Pede ao processo da IA que termine e, se ele estiver ocupado, o encerra à força."""
+    try:
+        conexao.send((_ENCERRAR,))
+    except (OSError, ValueError):
+        pass
+    processo.join(timeout=1)
+    if processo.is_alive():
+        processo.terminate()
+        processo.join()
+    conexao.close()
+
+class IAIsolada:
+    """
+    No processo do simulador, ocupa o lugar da IA que roda em outro processo. Os
+    pedidos de ordens não bloqueiam (pedir_ordens); as respostas são esperadas até o
+    prazo (receber_ordens). Os métodos opcionais da IA (iniciar_partida, salvar_estado,
+    restaurar_estado) são repassados a ela e esperados sem prazo.
+
+    O processo pode ser reaproveitado em outras partidas (preparar; ver PoolDeIAs).
+    """
+    def __init__(self, classe_ia, jogador_id, caminho_mapa, semente=None, contexto=None):
+        self.classe = classe_ia
+        self.protocolo = getattr(classe_ia, 'protocolo', None)
+        self._pedido = 0
+        self._respondida = True
+
+        contexto = contexto or multiprocessing.get_context()
+        self._conexao, conexao_do_processo = contexto.Pipe()
+        self._processo = contexto.Process(target=_hospedar, name=f"ia-{classe_ia.__name__}", daemon=True,
+                                          args=(conexao_do_processo, classe_ia))
+        self._processo.start()
+        conexao_do_processo.close()
+        self._finalizador = weakref.finalize(self, _terminar, self._processo, self._conexao)
+        self.preparar(jogador_id, caminho_mapa, semente)
+
+    def preparar(self, jogador_id, caminho_mapa, semente=None):
+        """
+        Começa uma partida no processo da IA, sem esperar (ver aguardar_preparo). Num processo
+        já usado, a IA continua a mesma e recebe nova_partida (ver IAInterface).
+        """
+        self.jogador_id = jogador_id
+        self.latencias = []  # Segundos entre o pedido e a resposta, nos turnos respondidos no prazo
+        self.turnos_sem_resposta = []
+        self._turno_para_acordar = None
+        self._turno_pedido = None
+        self._pedido_em = None
+        self._conexao.send((_NOVA_PARTIDA, jogador_id, caminho_mapa, semente))
+
+    def aguardar_preparo(self):
+        """Espera a IA ficar pronta para a partida (sem prazo). Erros da IA aparecem aqui."""
+        while self._receber()[0] != _PRONTA:
+            pass  # Ordens atrasadas da partida anterior
+
+    @property
+    def viva(self):
+        return self._processo.is_alive()
+
+    @property
+    def ocupada(self):
+        """Se a IA ainda está pensando no último turno pedido (atrasada ou travada)."""
+        while not self._respondida and self._conexao.poll(0):
+            mensagem = self._receber()
+            if mensagem[0] == _ORDENS and mensagem[1] == self._pedido:
+                self._respondida = True
+        return not self._respondida
+
+    def _receber(self):
+        try:
+            mensagem = self._conexao.recv()
+        except EOFError:
+            raise ErroNaIA(f"O processo da IA do jogador {self.jogador_id} terminou.") from None
+        if mensagem[0] == _ERRO:
+            raise ErroNaIA(f"A IA do jogador {self.jogador_id} falhou:\n{mensagem[1]}")
+        return mensagem
+
+    def _chamar(self, nome, *argumentos):
+        self._conexao.send((_CHAMADA, nome, argumentos))
+        while True:
+            mensagem = self._receber()
+            if mensagem[0] == _RESPOSTA:
+                return mensagem[1]
+            # Ordens atrasadas de um turno que já passou: descartadas
+
+    def pedir_ordens(self, turno, instantaneo, delta=None):
+        """
+        Envia o turno à IA ('instantaneo' de serializar_instantaneo) sem esperar a resposta.
+        Uma IA com PROTOCOLO_DELTA que já recebeu o instantâneo nesta partida pode receber None e só o delta.
+        """
+        self._pedido += 1
+        self._respondida = False
+        self._turno_pedido = turno
+        self._pedido_em = time.perf_counter()
+        self._conexao.send((_TURNO, self._pedido, instantaneo, delta))
+
+    def receber_ordens(self, prazo):
+        """
+        Ordens do último turno pedido, ou None se não chegarem até o instante 'prazo'
+        (em time.perf_counter()). Respostas atrasadas de turnos anteriores são descartadas.
+        """
+        while True:
+            espera = None if prazo == math.inf else max(prazo - time.perf_counter(), 0)
+            if not self._conexao.poll(espera):
+                self.turnos_sem_resposta.append(self._turno_pedido)
+                return None
+            ordens = self._ler_ordens()
+            if ordens is not None:
+                return ordens
+
+    def tentar_receber_ordens(self):
+        """
+        Ordens do último turno pedido, se já chegaram, ou None, sem esperar e sem contar o
+        turno como sem resposta. Para esperar a IA de fora (select, asyncio), use fileno.
+        """
+        while not self._respondida and self._conexao.poll(0):
+            ordens = self._ler_ordens()
+            if ordens is not None:
+                return ordens
+        return None
+
+    def _ler_ordens(self):
+        """Lê uma mensagem; devolve as ordens se forem a resposta do último turno pedido."""
+        mensagem = self._receber()
+        if mensagem[0] == _ORDENS and mensagem[1] == self._pedido:
+            self._respondida = True
+            _, _, ordens, _, self._turno_para_acordar = mensagem
+            self.latencias.append(time.perf_counter() - self._pedido_em)
+            return ordens
+        return None
+
+    def fileno(self):
+        """Descritor da conexão com o processo da IA: fica legível quando ela manda alguma coisa."""
+        return self._conexao.fileno()
+
+    def turno_para_acordar(self):
+        """O que a IA respondeu depois de decidir as ações do último turno em que respondeu."""
+        return self._turno_para_acordar
+
+    def iniciar_partida(self, mapa_estatico, estado_inicial):
+        return self._chamar('iniciar_partida', mapa_estatico, estado_inicial)
+
+    def salvar_estado(self):
+        return self._chamar('salvar_estado')
+
+    def restaurar_estado(self, estado):
+        return self._chamar('restaurar_estado', estado)
+
+    def encerrar(self):
+        """
+        Termina o processo da IA (também acontece quando este objeto é descartado). Uma IA
+        ainda ocupada com um turno não teria como atender ao pedido: é terminada na hora.
+        """
+        try:
+            ocupada = self._finalizador.alive and self._processo.is_alive() and self.ocupada
+        except ErroNaIA:
+            ocupada = False
+        if ocupada:
+            self._processo.terminate()
+        self._finalizador()
+
+class PoolDeIAs:
+    """
+    Processos de IAs mantidos entre partidas. Cada processo continua com os módulos
+    importados, os mapas já carregados e a própria IA, que a cada partida recebe
+    nova_partida em vez de ser criada de novo: o que ela calculou e não depende do
+    mapa (tabelas, livros de abertura) pode ser reaproveitado.
+
+        with PoolDeIAs() as pool:
+            for partida in partidas:
+                Simulador(mapa, bots, pool_de_ias=pool).run()
+    """
+    def __init__(self, contexto=None):
+        self._contexto = contexto
+        self._livres = {}  # classe da IA -> [IAIsolada]
+        self.criadas = 0
+        self.reaproveitadas = 0
+
+    def obter(self, classe_ia, jogador_id, caminho_mapa, semente=None):
+        """Uma IA da classe, pronta para começar a partida (ver IAIsolada.aguardar_preparo)."""
+        livres = self._livres.get(classe_ia)
+        while livres:
+            ia = livres.pop()
+            if ia.viva:
+                ia.preparar(jogador_id, caminho_mapa, semente)
+                self.reaproveitadas += 1
+                return ia
+            ia.encerrar()
+        self.criadas += 1
+        return IAIsolada(classe_ia, jogador_id, caminho_mapa, semente, self._contexto)
+
+    def devolver(self, ia):
+        """Guarda a IA para as próximas partidas; uma IA travada ou que falhou é encerrada."""
+        try:
+            reaproveitavel = ia.viva and not ia.ocupada
+        except ErroNaIA:
+            reaproveitavel = False
+        if reaproveitavel:
+            self._livres.setdefault(ia.classe, []).append(ia)
+        else:
+            ia.encerrar()
+
+    def fechar(self):
+        """Encerra os processos guardados."""
+        for livres in self._livres.values():
+            for ia in livres:
+                ia.encerrar()
+        self._livres = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excecao):
+        self.fechar()
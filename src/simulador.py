@@ -1,21 +1,62 @@
-from engine import Jogo, Jogador, Tropa, Transporte 
+import asyncio
+import concurrent.futures
+import inspect
+import math
+import random
+import time
+from engine import Jogo, Jogador, Transporte 
 import parser 
-from ias.ia_interface import IAInterface
+import checkpoint
+import sandbox
+from replay import EscritorDeReplay, TIPOS_DE_EVENTO_NO_REPLAY, mapa_estatico, estado_dinamico, calcular_delta
+from eventos import (
+    EmissorDeEventos, DestinoConsole, DestinoMemoria, MENSAGEM, JOGADOR_CRIADO, VEZ_DO_JOGADOR, CHECKPOINT_SALVO,
+    PARTIDA_RETOMADA, IA_RESPONDEU, IA_SEM_RESPOSTA
+)
+from ias.ia_interface import IAInterface, PROTOCOLO_DELTA
 from ias.ia_perseus import Perseus # Exemplo de import de uma IA personalizada
 
 class Simulador:
-    def __init__(self, mapa_json_path, bots, turno_maximo=50):
+    def __init__(self, mapa_json_path, bots, turno_maximo=50, avanco_rapido=False, eventos=None,
+                 arquivo_replay=None, salvar_estados=True, diretorio_checkpoints=None, intervalo_checkpoint=100,
+                 manter_checkpoints=2, retomar=False, prazo_por_turno=None, pool_de_ias=None):
         """
         Inicializa o simulador.
-        :param mapa_json_path: Caminho para o arquivo JSON do mapa.
+        :param mapa_json_path: Caminho para o arquivo do mapa (JSON ou compilado, ver mapa_binario.py).
         :param bots: Dicionário mapeando ID de jogador para a CLASSE da IA.
                      Ex: {'j0': IADummy, 'j1': IABotOutro}
+        :param avanco_rapido: Se True, trechos de turnos em que nada além da manutenção muda
+                              (e nenhuma IA quer ser consultada) são avançados de uma vez,
+                              sem gerar os arquivos de estado intermediários.
+        :param eventos: EmissorDeEventos que recebe o que acontece no jogo. O padrão não
+                        tem destinos (nada é impresso); use DestinoConsole para ver o jogo.
+                        Um emissor informado continua de quem o passou: o simulador não o fecha.
+        :param arquivo_replay: Se informado, grava a partida nesse arquivo de replay (ver replay.py).
+        :param salvar_estados: Se False, não grava um estado_turno_N.json por turno (útil junto com o replay).
+        :param diretorio_checkpoints: Se informado, grava ali um checkpoint (ver checkpoint.py) a cada
+                                      'intervalo_checkpoint' turnos, mantendo os 'manter_checkpoints' mais recentes.
+        :param retomar: Se True, continua a partida do checkpoint mais recente de 'diretorio_checkpoints'
+                        (se houver algum). O replay, se pedido, começa no turno retomado.
+        :param prazo_por_turno: Se informado, cada IA roda no seu próprio processo (ver sandbox.py) e todas
+                                pensam ao mesmo tempo; quem não responder em tantos segundos fica sem ordens
+                                no turno. Aceita um número para todas ou um dicionário por jogador.
+        :param pool_de_ias: sandbox.PoolDeIAs de onde tirar as IAs (também em processos separados, sem prazo
+                            se prazo_por_turno não for informado). Ao fim da partida, elas voltam para o pool.
         """
-        print("--- Inicializando o Simulador ---")
-        self.jogo = Jogo()
+        self._fechar_eventos = eventos is None  # Só fecha o emissor que ele mesmo criou
+        self.eventos = eventos if eventos is not None else EmissorDeEventos()
+        self.eventos.emitir(MENSAGEM, texto="--- Inicializando o Simulador ---")
+        self.avanco_rapido = avanco_rapido
+        self.jogo = Jogo(self.eventos)
         self.jogo.turno_maximo = turno_maximo  # Define o número máximo de turnos
+        self.jogo.salvar_estados = salvar_estados
         self.jogo.carregar_mundo(mapa_json_path)
         self.ias = {} # Dicionário para armazenar as instâncias das IAs
+        self.prazo_por_turno = prazo_por_turno
+        self.pool_de_ias = pool_de_ias
+        self._ias_isoladas = prazo_por_turno is not None or pool_de_ias is not None
+        self._laco = None  # Laço de eventos das IAs com decidir_acoes assíncrono, criado no primeiro uso
+        inicio = time.perf_counter()
         
         # Cria os jogadores e instancia as IAs
         for i, (jogador_id, classe_ia) in enumerate(bots.items()):
@@ -24,69 +65,345 @@ class Simulador:
             jogador = Jogador(id=jogador_id, id_base=base_id)
             self.jogo.jogadores[jogador_id] = jogador
             if base_id in self.jogo.mapa.cidades:
-                self.jogo.mapa.cidades[base_id].dono = jogador.id
+                self.jogo.mapa.definir_dono(base_id, jogador.id)
             
-            self.ias[jogador_id] = classe_ia(jogador_id)
-            print(f"Jogador '{jogador_id}' criado e controlado por '{classe_ia.__name__}'.")
+            if not self._ias_isoladas:
+                self.ias[jogador_id] = classe_ia(jogador_id)
+            else:
+                # A semente vem do gerador global, para que a partida continue reproduzível a partir da semente dele
+                semente = random.getrandbits(64)
+                if pool_de_ias is not None:
+                    self.ias[jogador_id] = pool_de_ias.obter(classe_ia, jogador_id, mapa_json_path, semente)
+                else:
+                    self.ias[jogador_id] = sandbox.IAIsolada(classe_ia, jogador_id, mapa_json_path, semente)
+            self.eventos.emitir(JOGADOR_CRIADO, jogador=jogador_id, ia=classe_ia.__name__)
+        if self._ias_isoladas:
+            for ia_obj in self.ias.values():  # As IAs se preparam ao mesmo tempo, cada uma no seu processo
+                ia_obj.aguardar_preparo()
+        # Segundos para criar (ou reaproveitar) as IAs e, no fim de run, para encerrá-las (ou devolvê-las ao pool)
+        self.tempo_de_preparo_das_ias = time.perf_counter() - inicio
+        self.tempo_de_encerramento_das_ias = 0.0
         
-        print("Simulador inicializado.")
+        self.replay = EscritorDeReplay(arquivo_replay) if arquivo_replay is not None else None
+        # IAs que recebem só o que mudou a cada turno, e o último estado enviado a elas
+        self.ias_com_delta = [jogador_id for jogador_id, ia_obj in self.ias.items()
+                              if getattr(ia_obj, 'protocolo', None) == PROTOCOLO_DELTA]
+        # As outras recebem o dicionário do estado ou, se pediram (IAInterface.estado_sob_demanda), o EstadoDoJogo.
+        # As isoladas recebem o estado do processo delas (ver sandbox.py)
+        self.ias_com_estado_sob_demanda = [jogador_id for jogador_id, ia_obj in self.ias.items()
+                                           if jogador_id not in self.ias_com_delta
+                                           and getattr(ia_obj, 'estado_sob_demanda', False)]
+        self._ias_com_estado_completo = not self._ias_isoladas and any(
+            jogador_id not in self.ias_com_delta and jogador_id not in self.ias_com_estado_sob_demanda
+            for jogador_id in self.ias)
+        self._estado_enviado = None
+        self._ias_com_instantaneo = set()  # IAs isoladas com delta que já têm a cópia do jogo (ver sandbox.py)
+        self._eventos_do_turno = None
+        if self.replay is not None or self.ias_com_delta:
+            # Guarda os eventos de combate de cada turno para o replay e para as IAs com delta
+            self._eventos_do_turno = DestinoMemoria(capacidade=None, tipos=TIPOS_DE_EVENTO_NO_REPLAY)
+            self.eventos.adicionar_destino(self._eventos_do_turno)
+
+        self.diretorio_checkpoints = diretorio_checkpoints
+        self.intervalo_checkpoint = intervalo_checkpoint
+        self.manter_checkpoints = manter_checkpoints
+        self.tempo_em_checkpoints = 0.0  # Segundos gastos gravando checkpoints, para medir o custo do intervalo escolhido
+        self._turno_do_ultimo_checkpoint = self.jogo.turno_atual
+        if retomar:
+            if diretorio_checkpoints is None:
+                raise ValueError("Para retomar uma partida, informe o diretorio_checkpoints.")
+            dados = checkpoint.ultimo_checkpoint(diretorio_checkpoints)
+            if dados is not None:
+                self._retomar(dados)
+
+        self.eventos.emitir(MENSAGEM, texto="Simulador inicializado.")
+
+    def _salvar_checkpoint(self):
+        """Grava o estado completo da partida (engine, simulador e IAs) no diretório de checkpoints."""
+        inicio = time.perf_counter()
+        turno = self.jogo.turno_atual
+        dados = {
+            "versao": checkpoint.VERSAO,
+            "cidades": tuple(self.jogo.mapa.cidades),
+            "jogo": checkpoint.instantaneo_para_dict(self.jogo.snapshot()),
+            "simulador": {
+                "estado_enviado": self._estado_enviado,
+                "eventos_do_turno": None if self._eventos_do_turno is None else list(self._eventos_do_turno.eventos),
+                "random": random.getstate(),  # As IAs costumam usar o gerador global
+            },
+            "ias": {jogador_id: self._estado_da_ia(ia_obj) for jogador_id, ia_obj in self.ias.items()},
+        }
+        caminho = checkpoint.caminho_do_checkpoint(self.diretorio_checkpoints, turno)
+        tamanho = checkpoint.gravar_checkpoint(caminho, dados)
+        checkpoint.remover_antigos(self.diretorio_checkpoints, self.manter_checkpoints)
+        self._turno_do_ultimo_checkpoint = turno
+        self.tempo_em_checkpoints += time.perf_counter() - inicio
+        self.eventos.emitir(CHECKPOINT_SALVO, turno=turno, arquivo=caminho, tamanho=tamanho)
+
+    def _estado_da_ia(self, ia_obj):
+        salvar_estado = getattr(ia_obj, 'salvar_estado', None)  # Hook opcional (ver IAInterface)
+        return None if salvar_estado is None else salvar_estado()
+
+    def _retomar(self, dados):
+        """Restaura a partida a partir dos dados de um checkpoint."""
+        if tuple(self.jogo.mapa.cidades) != dados["cidades"]:
+            raise ValueError("O checkpoint é de uma partida em outro mapa.")
+        turno_maximo = self.jogo.turno_maximo
+        self.jogo.restore(checkpoint.instantaneo_do_dict(dados["jogo"], self.jogo.mapa.congelar_topologia()))
+        self.jogo.turno_maximo = turno_maximo  # Vale o limite pedido agora, que pode ter sido estendido
+
+        estado_do_simulador = dados["simulador"]
+        self._estado_enviado = estado_do_simulador["estado_enviado"]
+        if self._eventos_do_turno is not None and estado_do_simulador["eventos_do_turno"]:
+            self._eventos_do_turno.eventos.extend(estado_do_simulador["eventos_do_turno"])
+        random.setstate(estado_do_simulador["random"])
+
+        estados_das_ias = dados["ias"]
+        for jogador_id, ia_obj in self.ias.items():
+            estado = estados_das_ias.get(jogador_id)
+            if estado is not None and hasattr(ia_obj, 'restaurar_estado'):
+                ia_obj.restaurar_estado(estado)
+            elif jogador_id in self.ias_com_delta:
+                # Uma IA com delta recriada do zero precisa receber o estado inteiro de novo
+                self._estado_enviado = None
+        self._turno_do_ultimo_checkpoint = self.jogo.turno_atual
+        self.eventos.emitir(PARTIDA_RETOMADA, turno=self.jogo.turno_atual)
 
     def _preparar_turno(self, todas_as_ordens):
-        """Valida e injeta as ordens dos bots no estado do jogo."""
-        for jogador_id, ordens in todas_as_ordens.items():
-            jogador = self.jogo.jogadores[jogador_id]
-
-            # Injeta ordens de novas tropas de forma segura
-            for ordem_tropa in ordens.get("novas_tropas", []):
-                forca_desejada = ordem_tropa['forca']
-                if jogador.tropas_na_base >= forca_desejada:
-                    jogador.tropas_na_base -= forca_desejada
-                    nova_tropa = Tropa(
-                        id=ordem_tropa['id'], dono=jogador,
-                        forca=forca_desejada, fila_de_comandos=ordem_tropa['comandos']
-                    )
-                    jogador.tropas.append(nova_tropa)
-                    print(f"Jogador {jogador_id}: Nova tropa {nova_tropa.id} (Força: {forca_desejada}) criada.")
-                else:
-                    print(f"AVISO: Jogador {jogador_id} com poucas tropas para criar {ordem_tropa['id']}. Ordem ignorada.")
+        """Valida e injeta as ordens dos bots no estado do jogo (ver Jogo.aplicar_ordens)."""
+        self.jogo.aplicar_ordens(todas_as_ordens)
 
-            # Injeta ordens do transporte
-            ordem_transporte = ordens.get("transporte")
-            if ordem_transporte:
-                jogador.transporte.fila_de_comandos = ordem_transporte
-                comando_coleta = ordem_transporte[0] 
-                jogador.transporte.quantidade_solicitada = comando_coleta.get('quantidade', 'MAX')
+    def _turno_para_acordar_ias(self):
+        """
+        Retorna o primeiro turno em que alguma IA ativa quer voltar a dar ordens,
+        ou None se alguma delas precisa ser consultada já neste turno. Uma IA sem o gancho
+        turno_para_acordar (não herda de IAInterface) é consultada todo turno, como no sandbox.
+        """
+        turno_para_acordar = self.jogo.turno_maximo
+        for jogador_id, ia_obj in self.ias.items():
+            if jogador_id in self.jogo.jogadores_derrotados:
+                continue
+            gancho = getattr(ia_obj, 'turno_para_acordar', None)
+            turno_da_ia = None if gancho is None else gancho()
+            if turno_da_ia is None or turno_da_ia <= self.jogo.turno_atual:
+                return None
+            turno_para_acordar = min(turno_para_acordar, turno_da_ia)
+        return turno_para_acordar
 
-    def run(self):
-        """Roda a simulação completa do jogo."""
-        print("\n--- INICIANDO SIMULAÇÃO ---")
+    def _coletar_eventos_do_turno(self):
+        """Eventos de combate desde a última coleta, como dicionários."""
+        if self._eventos_do_turno is None:
+            return []
+        eventos = [evento.para_dict() for evento in self._eventos_do_turno.eventos]
+        self._eventos_do_turno.eventos.clear()
+        return eventos
+
+    def _calcular_delta_do_turno(self, estado, eventos):
+        """
+        Delta enviado às IAs com PROTOCOLO_DELTA. No primeiro turno, entrega antes
+        o mapa estático e o estado inicial a cada uma delas (iniciar_partida).
+        """
+        atual = estado_dinamico(estado)
+        if self._estado_enviado is None:
+            estatico = mapa_estatico(estado)
+            for jogador_id in self.ias_com_delta:
+                self.ias[jogador_id].iniciar_partida(estatico, atual)
+            self._estado_enviado = atual
+        delta = calcular_delta(self._estado_enviado, atual)
+        if eventos:
+            delta["eventos"] = eventos
+        self._estado_enviado = atual
+        return delta
+
+    def _prazo_da_ia(self, jogador_id):
+        if isinstance(self.prazo_por_turno, dict):
+            return self.prazo_por_turno.get(jogador_id, math.inf)
+        return math.inf if self.prazo_por_turno is None else self.prazo_por_turno
+
+    def _pedir_ordens_as_ias_isoladas(self, delta_do_turno):
+        """
+        Envia o turno a todas as IAs isoladas ativas de uma vez, sem esperar as respostas.
+        Retorna (instante do envio, [(jogador_id, ia)]); os prazos contam desse instante.
+        O instantâneo do jogo só é montado se alguma IA precisa dele: as IAs com delta o
+        recebem no primeiro turno e depois só o delta.
+        """
+        ativas = [(jogador_id, ia_obj) for jogador_id, ia_obj in self.ias.items()
+                  if jogador_id not in self.jogo.jogadores_derrotados]
+        com_instantaneo = {jogador_id for jogador_id, _ in ativas
+                           if jogador_id not in self.ias_com_delta or jogador_id not in self._ias_com_instantaneo}
+        instantaneo = sandbox.serializar_instantaneo(self.jogo) if com_instantaneo else None
+        self._ias_com_instantaneo.update(com_instantaneo)
+        inicio = time.perf_counter()
+        for jogador_id, ia_obj in ativas:
+            self.eventos.emitir(VEZ_DO_JOGADOR, jogador=jogador_id, ia=ia_obj.classe.__name__)
+            ia_obj.pedir_ordens(self.jogo.turno_atual, instantaneo if jogador_id in com_instantaneo else None,
+                                delta_do_turno if jogador_id in self.ias_com_delta else None)
+        return inicio, ativas
+
+    def _registrar_resposta(self, jogador_id, ia_obj, ordens_em_texto, prazo):
+        """Emite o evento da resposta (ou da falta dela) e retorna as ordens, vazias se não vieram."""
+        if ordens_em_texto is None:
+            self.eventos.emitir(IA_SEM_RESPOSTA, jogador=jogador_id, prazo=prazo)
+            return ""
+        self.eventos.emitir(IA_RESPONDEU, jogador=jogador_id, latencia=ia_obj.latencias[-1])
+        return ordens_em_texto
+
+    def _ordens_das_ias_isoladas(self, delta_do_turno):
+        """
+        Pede as ordens a todas as IAs isoladas de uma vez e espera cada uma até o seu prazo,
+        contado do mesmo instante: o turno dura no máximo o maior prazo, não a soma deles.
+        Quem não responde a tempo fica sem ordens (texto vazio).
+        """
+        inicio, ativas = self._pedir_ordens_as_ias_isoladas(delta_do_turno)
+        ordens = {}
+        for jogador_id, ia_obj in ativas:
+            prazo = self._prazo_da_ia(jogador_id)
+            ordens[jogador_id] = self._registrar_resposta(jogador_id, ia_obj, ia_obj.receber_ordens(inicio + prazo),
+                                                          prazo)
+        return ordens
+
+    def _esperar_ia_assincrona(self, aguardavel):
+        """
+        Roda até o fim o decidir_acoes assíncrono de uma IA no laço de eventos do simulador,
+        o mesmo em todos os turnos (e fechado no fim da partida), como no processo de uma IA isolada.
+        """
+        if self._laco is None:
+            self._laco = asyncio.new_event_loop()
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return self._laco.run_until_complete(aguardavel)
+        # Chamado de dentro de um laço em andamento, que fica bloqueado até a IA responder (o
+        # SimuladorAssincrono não bloqueia): o laço do simulador roda em outra thread
+        with concurrent.futures.ThreadPoolExecutor(1) as executor:
+            return executor.submit(self._laco.run_until_complete, aguardavel).result()
+
+    def _fechar_laco(self):
+        if self._laco is not None:
+            self._laco.close()
+            self._laco = None
+
+    def _encerrar_ias(self):
+        """Encerra os processos das IAs isoladas, ou os devolve ao pool para a próxima partida."""
+        inicio = time.perf_counter()
+        if self._ias_isoladas:
+            for ia_obj in self.ias.values():
+                if self.pool_de_ias is not None:
+                    self.pool_de_ias.devolver(ia_obj)
+                else:
+                    ia_obj.encerrar()
+        self.tempo_de_encerramento_das_ias = time.perf_counter() - inicio
+
+    def _proximo_turno(self):
+        """
+        Avança até o próximo turno em que as IAs dão ordens (gravando os checkpoints e pulando os
+        turnos quietos) e retorna (estado_completo, estado_sob_demanda, delta_do_turno) desse turno,
+        ou None se a partida acabou. O estado_completo (dicionário de gerar_estado_json) é None se
+        nada precisa dele (estados gravados, replay ou alguma IA que o recebe); o estado_sob_demanda
+        (EstadoDoJogo), se nenhuma IA o pediu; e o delta_do_turno, se nenhuma IA usa PROTOCOLO_DELTA.
+        """
         while True:
             # Verifica se o jogo deve terminar antes de solicitar novas ordens
             vencedor = self.jogo.verificar_vencedor()
             if vencedor or self.jogo.turno_atual >= self.jogo.turno_maximo:
-                break
+                return None
 
-            # Gera o estado do jogo (pode salvar, se necessário)
-            estado_do_jogo_atual = self.jogo.gerar_estado_json(
-                f"estado_turno_{self.jogo.turno_atual}.json", 
-                salvar_arquivo=True # Mantenha True se desejar debugar estados intermediários
-            )
-            
-            # Coleta as ordens de todos os jogadores
-            ordens_parseadas = {}
+            if (self.diretorio_checkpoints is not None
+                    and self.jogo.turno_atual - self._turno_do_ultimo_checkpoint >= self.intervalo_checkpoint):
+                self._salvar_checkpoint()
+
+            # Avanço rápido: pula os turnos em que nada muda além da manutenção
+            if self.avanco_rapido and self.jogo.turno_quieto():
+                turno_para_acordar = self._turno_para_acordar_ias()
+                if turno_para_acordar is not None and self.jogo.avancar_turnos_quietos(turno_para_acordar):
+                    continue
+
+            # Gera o estado do jogo (pode salvar, se necessário). O dicionário completo só é montado
+            # se algo precisa dele; as IAs que pediram recebem o estado montado sob demanda (ver estado_do_jogo.py)
+            estado_completo = estado_sob_demanda = None
+            if self.jogo.salvar_estados or self.replay is not None or self._ias_com_estado_completo:
+                estado_completo = self.jogo.gerar_estado_json(
+                    f"estado_turno_{self.jogo.turno_atual}.json", 
+                    salvar_arquivo=self.jogo.salvar_estados # Mantenha True se desejar debugar estados intermediários
+                )
+            if self.ias_com_estado_sob_demanda:
+                estado_sob_demanda = self.jogo.estado_do_jogo(estado_completo)
+
+            eventos_do_turno = self._coletar_eventos_do_turno()
+            if self.replay is not None:
+                self.replay.registrar_turno(estado_completo, eventos_do_turno)
+            delta_do_turno = None
+            if self.ias_com_delta:
+                estado = estado_completo if estado_completo is not None else estado_sob_demanda or self.jogo.estado_do_jogo()
+                delta_do_turno = self._calcular_delta_do_turno(estado, eventos_do_turno)
+            return estado_completo, estado_sob_demanda, delta_do_turno
+
+    def _entrada_da_ia(self, jogador_id, estado_completo, estado_sob_demanda, delta_do_turno):
+        """O que a IA recebe em decidir_acoes neste turno."""
+        if jogador_id in self.ias_com_delta:
+            return delta_do_turno
+        if jogador_id in self.ias_com_estado_sob_demanda:
+            return estado_sob_demanda
+        return estado_completo
+
+    def _ordens_das_ias(self, estado_completo, estado_sob_demanda, delta_do_turno):
+        """Coleta as ordens de todos os jogadores ativos, já traduzidas pelo parser."""
+        ordens_parseadas = {}
+        if self._ias_isoladas:
+            for jogador_id, ordens_em_texto in self._ordens_das_ias_isoladas(delta_do_turno).items():
+                ordens_parseadas[jogador_id] = parser.parse_string_de_ordens(ordens_em_texto, self.eventos)
+        else:
             for jogador_id, ia_obj in self.ias.items():
                 if jogador_id not in self.jogo.jogadores_derrotados:
-                    print(f"--- Vez do Jogador {jogador_id} ({ia_obj.__class__.__name__}) ---")
-                    ordens_em_texto = ia_obj.decidir_acoes(estado_do_jogo_atual, self.jogo.mapa_somente_leitura)
+                    self.eventos.emitir(VEZ_DO_JOGADOR, jogador=jogador_id, ia=ia_obj.__class__.__name__)
+                    entrada = self._entrada_da_ia(jogador_id, estado_completo, estado_sob_demanda, delta_do_turno)
+                    ordens_em_texto = ia_obj.decidir_acoes(entrada, self.jogo.mapa_somente_leitura)
+                    if inspect.isawaitable(ordens_em_texto):  # IA com decidir_acoes assíncrono (async def)
+                        ordens_em_texto = self._esperar_ia_assincrona(ordens_em_texto)
                     # O parser traduz o comando que a IA retorna em um formato que o simulador entende
-                    ordens_parseadas[jogador_id] = parser.parse_string_de_ordens(ordens_em_texto)
+                    ordens_parseadas[jogador_id] = parser.parse_string_de_ordens(ordens_em_texto, self.eventos)
+        return ordens_parseadas
 
-            self._preparar_turno(ordens_parseadas)
-            self.jogo.processar_turno() 
-        
-        print("\n--- SIMULAÇÃO ENCERRADA ---")
+    def _encerrar_partida(self):
+        """Anuncia o fim e grava o último turno no replay (os recursos são liberados em _liberar_partida)."""
+        self.eventos.emitir(MENSAGEM, texto="\n--- SIMULAÇÃO ENCERRADA ---")
         self.jogo.verificar_vencedor(anunciar_fim=True)
+        if self.replay is not None:
+            self.replay.registrar_turno(self.jogo.gerar_estado_json("", salvar_arquivo=False),
+                                        self._coletar_eventos_do_turno())
 
+    def _liberar_partida(self):
+        """
+        Fecha o replay e os estados gravados, libera as IAs e o laço de eventos e solta o emissor.
+        Roda uma vez no fim de toda partida, também da que falhou (ErroNaIA, Ctrl+C): nada fica para trás.
+        """
+        try:
+            if self.replay is not None:
+                self.replay.fechar()  # Grava o índice e o rodapé, mesmo de uma partida interrompida
+            self.jogo.gravador.fechar()  # Grava o que falta e encerra a thread do gravador
+        finally:
+            self._encerrar_ias()
+            self._fechar_laco()
+            if self._eventos_do_turno is not None:
+                self.eventos.remover_destino(self._eventos_do_turno)
+            if self._fechar_eventos:
+                self.eventos.fechar()
+
+    def run(self):
+        """Roda a simulação completa do jogo."""
+        self.eventos.emitir(MENSAGEM, texto="\n--- INICIANDO SIMULAÇÃO ---")
+        try:
+            while True:
+                turno = self._proximo_turno()
+                if turno is None:
+                    break
+                ordens_parseadas = self._ordens_das_ias(*turno)
+                del turno  # Um estado que ninguém mais guarda não precisa ser congelado quando a engine avançar
+                self._preparar_turno(ordens_parseadas)
+                self.jogo.processar_turno() 
+            self._encerrar_partida()
+        finally:
+            self._liberar_partida()
 
 if __name__ == "__main__":
     # Parâmetros de inicialização do simulador
@@ -100,5 +417,6 @@ if __name__ == "__main__":
     }
 
     # Inicia a simulação
-    simulador = Simulador(mapa_json_path=mapa_path, bots=bots, turno_maximo=turno_maximo)
+    simulador = Simulador(mapa_json_path=mapa_path, bots=bots, turno_maximo=turno_maximo,
+                          eventos=EmissorDeEventos(DestinoConsole()))
     simulador.run()
\ No newline at end of file
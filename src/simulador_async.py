@@ -0,0 +1,221 @@
+"""
+Simulador assíncrono: cada partida é uma corrotina (SimuladorAssincrono.rodar), e um só
+laço de eventos do asyncio avança muitas partidas ao mesmo tempo (rodar_partidas).
+Enquanto uma partida espera as suas IAs, as outras processam os seus turnos.
+
+Compensa quando a partida passa a maior parte do tempo esperando: IAs com decidir_acoes
+assíncrono (async def), que consultam serviços ou processos externos, e IAs isoladas
+(prazo_por_turno, pool_de_ias; ver sandbox.py), esperadas sem bloquear o laço. As IAs
+comuns rodam no próprio laço, e a partida cede a vez às outras a cada turno.
+
+As partidas dividem o processo. Cada uma tem o seu estado do gerador global random,
+posto no lugar enquanto ela roda: com IAs comuns ou isoladas, o resultado é o mesmo de
+rodar a partida sozinha depois de random.seed(semente). Uma IA assíncrona, porém, volta
+de cada await com o gerador de outra partida e deve usar o seu próprio random.Random.
+O diretório de trabalho também é um só: em partidas simultâneas, use salvar_estados=False
+e arquivos de replay e diretórios de checkpoint diferentes.
+
+    resultados = asyncio.run(rodar_partidas(
+        [{"mapa_json_path": "src/mapa_debug.json", "bots": {'0': Perseus, '1': Perseus},
+          "salvar_estados": False, "semente": semente} for semente in range(500)],
+        simultaneas=200))
+"""
+import asyncio
+import contextlib
+import inspect
+import math
+import os
+import random
+import sys
+import time
+from collections import namedtuple
+import parser
+from eventos import MENSAGEM, VEZ_DO_JOGADOR
+from simulador import Simulador
+from ias.ia_perseus import Perseus # Exemplo de import de uma IA personalizada
+
+Andamento = namedtuple('Andamento', ['indice', 'turno', 'turno_maximo', 'concluida', 'vencedor', 'erro'])
+Andamento.__doc__ = "Progresso de uma partida de rodar_partidas, depois de cada turno e ao fim ('concluida')."
+
+ResultadoDaSimulacao = namedtuple('ResultadoDaSimulacao', ['indice', 'vencedor', 'turnos', 'duracao', 'erro',
+                                                           'simulador'])
+ResultadoDaSimulacao.__doc__ = "'erro' é o texto da exceção se a partida falhou ('simulador' é None se nem começou)."
+
+class SimuladorAssincrono(Simulador):
+    """
+    Simulador cuja partida roda como corrotina: await simulador.rodar(). Recebe os mesmos
+    parâmetros do Simulador e mais 'semente', a do gerador random da partida (ver o início
+    do módulo); sem ela, a partida usa uma semente tirada do gerador global.
+
+    A criação (o mapa e o preparo das IAs) não é assíncrona. Com IAs isoladas, um
+    PoolDeIAs deixa o preparo rápido, e o processo de cada IA é reaproveitado.
+    """
+    def __init__(self, *args, semente=None, **kwargs):
+        self._estado_do_random = random.Random(random.getrandbits(64) if semente is None else semente).getstate()
+        with self._gerador_da_partida():
+            super().__init__(*args, **kwargs)
+
+    @contextlib.contextmanager
+    def _gerador_da_partida(self):
+        """Põe no lugar do gerador global o estado do gerador desta partida enquanto ela roda."""
+        estado_global = random.getstate()
+        random.setstate(self._estado_do_random)
+        try:
+            yield
+        finally:
+            self._estado_do_random = random.getstate()
+            random.setstate(estado_global)
+
+    async def _ordens_das_ias_async(self, estado_completo, estado_sob_demanda, delta_do_turno):
+        """
+        Como Simulador._ordens_das_ias, mas esperando as IAs assíncronas (todas as da partida
+        ao mesmo tempo) e as isoladas sem bloquear o laço de eventos.
+        """
+        if self._ias_isoladas:
+            with self._gerador_da_partida():
+                inicio, ativas = self._pedir_ordens_as_ias_isoladas(delta_do_turno)
+            respostas = await _reunir(*(_esperar_ordens(ia_obj, inicio + self._prazo_da_ia(jogador_id))
+                                        for jogador_id, ia_obj in ativas))
+            ordens_parseadas = {}
+            for (jogador_id, ia_obj), ordens_em_texto in zip(ativas, respostas):
+                ordens_em_texto = self._registrar_resposta(jogador_id, ia_obj, ordens_em_texto,
+                                                           self._prazo_da_ia(jogador_id))
+                ordens_parseadas[jogador_id] = parser.parse_string_de_ordens(ordens_em_texto, self.eventos)
+            return ordens_parseadas
+
+        ordens_parseadas, pendentes = {}, {}
+        with self._gerador_da_partida():
+            for jogador_id, ia_obj in self.ias.items():
+                if jogador_id not in self.jogo.jogadores_derrotados:
+                    self.eventos.emitir(VEZ_DO_JOGADOR, jogador=jogador_id, ia=ia_obj.__class__.__name__)
+                    entrada = self._entrada_da_ia(jogador_id, estado_completo, estado_sob_demanda, delta_do_turno)
+                    ordens_em_texto = ia_obj.decidir_acoes(entrada, self.jogo.mapa_somente_leitura)
+                    if inspect.isawaitable(ordens_em_texto):
+                        pendentes[jogador_id] = ordens_em_texto
+                        ordens_parseadas[jogador_id] = None  # Guarda a ordem dos jogadores
+                    else:
+                        ordens_parseadas[jogador_id] = parser.parse_string_de_ordens(ordens_em_texto, self.eventos)
+        if pendentes:
+            for jogador_id, ordens_em_texto in zip(pendentes, await _reunir(*pendentes.values())):
+                ordens_parseadas[jogador_id] = parser.parse_string_de_ordens(ordens_em_texto, self.eventos)
+        return ordens_parseadas
+
+    async def rodar(self, ao_fim_do_turno=None):
+        """
+        Roda a partida até o fim, cedendo a vez às outras partidas enquanto espera as IAs e
+        a cada turno. 'ao_fim_do_turno', se informado, é chamado com o simulador depois de cada turno.
+        """
+        with self._gerador_da_partida():
+            self.eventos.emitir(MENSAGEM, texto="\n--- INICIANDO SIMULAÇÃO ---")
+        try:
+            while True:
+                with self._gerador_da_partida():
+                    turno = self._proximo_turno()
+                if turno is None:
+                    break
+                ordens_parseadas = await self._ordens_das_ias_async(*turno)
+                del turno  # Ver Simulador.run
+                with self._gerador_da_partida():
+                    self._preparar_turno(ordens_parseadas)
+                    self.jogo.processar_turno()
+                if ao_fim_do_turno is not None:
+                    ao_fim_do_turno(self)
+                await asyncio.sleep(0)  # Mesmo sem esperar nenhuma IA, a partida não segura o laço por mais de um turno
+            with self._gerador_da_partida():
+                self._encerrar_partida()
+        finally:
+            self._liberar_partida()  # Também de uma partida que falhou ou foi cancelada (ver Simulador.run)
+
+async def _reunir(*aguardaveis):
+    """
+    Como asyncio.gather, mas se um deles falha os outros são cancelados (e terminam)
+    antes de o erro seguir: nenhuma espera fica para trás, presa às IAs da partida.
+    """
+    tarefas = [asyncio.ensure_future(aguardavel) for aguardavel in aguardaveis]
+    try:
+        return await asyncio.gather(*tarefas)
+    except BaseException:
+        for tarefa in tarefas:
+            tarefa.cancel()
+        await asyncio.gather(*tarefas, return_exceptions=True)
+        raise
+
+async def _esperar_ordens(ia_obj, limite):
+    """Como IAIsolada.receber_ordens(limite), mas esperando a IA sem bloquear o laço de eventos."""
+    laco = asyncio.get_running_loop()
+    while True:
+        ordens = ia_obj.tentar_receber_ordens()
+        if ordens is not None:
+            return ordens
+        espera = limite - time.perf_counter()
+        if espera <= 0 or not await _esperar_leitura(laco, ia_obj.fileno(), espera):
+            return ia_obj.receber_ordens(limite)  # O prazo passou: só o que já chegou, ou o turno fica sem resposta
+
+async def _esperar_leitura(laco, descritor, espera):
+    """Espera até 'espera' segundos que o descritor fique legível; retorna se ficou."""
+    legivel = laco.create_future()
+    laco.add_reader(descritor, lambda: legivel.done() or legivel.set_result(True))
+    try:
+        await asyncio.wait_for(legivel, None if espera == math.inf else espera)
+        return True
+    except asyncio.TimeoutError:
+        return False
+    finally:
+        laco.remove_reader(descritor)
+
+async def _jogar(indice, configuracao, ao_progredir):
+    """Cria e roda uma partida de rodar_partidas, avisando o andamento."""
+    inicio = time.perf_counter()
+    simulador, vencedor, erro = None, None, None
+    avisar = None
+    if ao_progredir is not None:
+        def avisar(simulador):
+            ao_progredir(Andamento(indice, simulador.jogo.turno_atual, simulador.jogo.turno_maximo, False, None, None))
+    try:
+        simulador = SimuladorAssincrono(**configuracao)
+        await simulador.rodar(avisar)
+        vencedor = simulador.jogo.verificar_vencedor()
+    except Exception as excecao:
+        erro = f"{type(excecao).__name__}: {excecao}"
+    turnos = None if simulador is None else simulador.jogo.turno_atual
+    if ao_progredir is not None:
+        ao_progredir(Andamento(indice, turnos, None if simulador is None else simulador.jogo.turno_maximo, True,
+                               vencedor, erro))
+    return ResultadoDaSimulacao(indice, vencedor, turnos, time.perf_counter() - inicio, erro, simulador)
+
+async def rodar_partidas(configuracoes, simultaneas=100, ao_progredir=None):
+    """
+    Roda as partidas no laço de eventos atual, no máximo 'simultaneas' de cada vez. Cada
+    configuração é um dicionário de argumentos do SimuladorAssincrono. 'ao_progredir', se
+    informado, recebe um Andamento depois de cada turno de cada partida e ao fim dela.
+    Retorna os ResultadoDaSimulacao na ordem das configurações; uma partida que falha
+    não interrompe as outras.
+    """
+    fila = enumerate(configuracoes)  # Consumida aos poucos: só as partidas em andamento existem de cada vez
+    resultados = []
+
+    async def trabalhador():
+        for indice, configuracao in fila:
+            resultados.append(await _jogar(indice, configuracao, ao_progredir))
+
+    await asyncio.gather(*(trabalhador() for _ in range(simultaneas)))
+    return sorted(resultados, key=lambda resultado: resultado.indice)
+
+
+if __name__ == "__main__":
+    # 200 partidas no mesmo processo, 50 de cada vez
+    concluidas = []
+
+    def ao_progredir(andamento):
+        if andamento.concluida:
+            concluidas.append(andamento)
+            # As IAs falam no console (redirecionado abaixo); o andamento vai direto para o terminal
+            print(f"Partida {andamento.indice} terminou no turno {andamento.turno}: "
+                  f"{andamento.erro or andamento.vencedor or 'sem vencedor'} ({len(concluidas)}/200)", file=sys.__stdout__)
+
+    configuracoes = [{"mapa_json_path": "src/mapa_debug.json", "bots": {'0': Perseus, '1': Perseus},
+                      "turno_maximo": 50, "salvar_estados": False, "semente": semente} for semente in range(200)]
+    inicio = time.perf_counter()
+    with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+        resultados = asyncio.run(rodar_partidas(configuracoes, simultaneas=50, ao_progredir=ao_progredir))
+    print(f"{len(resultados)} partidas em {time.perf_counter() - inicio:.1f}s")
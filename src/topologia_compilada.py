@@ -0,0 +1,157 @@
+"""
+Visões do mapa compilado (mapa_binario.MapaCompilado) com a interface dos dicionários
+da Topologia: arestas, lista de adjacência e arestas por par de índices do CSR. Leem
+os arrays do arquivo sem copiá-los, montando cada Aresta e cada linha na primeira
+consulta. Usadas por engine.Topologia.do_compilado.
+"""
+from array import array
+from collections.abc import Mapping, ItemsView, ValuesView
+from engine import Aresta
+from eventos import ARESTA_DUPLICADA
+
+def _posicao_no_csr(grafo, i, j):
+    """Posição de j na linha de i do CSR (a primeira, como em GrafoCSR._posicoes), ou None."""
+    vizinhos = grafo.vizinhos
+    for k in range(grafo.inicio[i], grafo.inicio[i + 1]):
+        if vizinhos[k] == j:
+            return k
+    return None
+
+class ArestasCompiladas(Mapping):
+    """
+    Arestas de um mapa compilado, como o dicionário Mapa.arestas ((cidade1_id, cidade2_id)
+    em ordem -> Aresta), mas lidas dos arrays do arquivo. Só o índice posição do CSR ->
+    aresta é montado na criação; cada Aresta é criada na primeira consulta.
+    """
+    def __init__(self, compilado, grafo, eventos):
+        self._compilado = compilado
+        self._grafo = grafo
+        self._criadas = [None] * len(compilado.arestas_de)  # índice da aresta no arquivo -> Aresta
+        self._aresta_da_posicao = array('i', [-1]) * len(grafo.vizinhos)
+        self._fora_do_csr = {}  # Chave -> índice, para arestas entre cidades que não são vizinhas no CSR
+        self._validas = bytearray(len(compilado.arestas_de))  # 0 para as repetidas, que a engine ignora
+        ids, n = compilado.ids, len(grafo)
+        for e, (de, para) in enumerate(zip(compilado.arestas_de, compilado.arestas_para)):
+            posicoes = [k for k in (_posicao_no_csr(grafo, de, para), _posicao_no_csr(grafo, para, de))
+                        if k is not None] if de < n and para < n else []
+            cidade1_id, cidade2_id = ids[de], ids[para]
+            chave = (cidade1_id, cidade2_id) if cidade1_id <= cidade2_id else (cidade2_id, cidade1_id)
+            if any(self._aresta_da_posicao[k] >= 0 for k in posicoes) or chave in self._fora_do_csr:
+                eventos.emitir(ARESTA_DUPLICADA, aresta=chave)
+                continue
+            self._validas[e] = 1
+            if posicoes:
+                for k in posicoes:
+                    self._aresta_da_posicao[k] = e
+            else:
+                self._fora_do_csr[chave] = e
+        self._quantidade = sum(self._validas)
+
+    def _aresta(self, e):
+        aresta = self._criadas[e]
+        if aresta is None:
+            compilado = self._compilado
+            aresta = self._criadas[e] = Aresta(compilado.ids[compilado.arestas_de[e]],
+                                               compilado.ids[compilado.arestas_para[e]], compilado.arestas_peso[e])
+        return aresta
+
+    def aresta_entre(self, i, j):
+        """Aresta entre as cidades de índice i e j do CSR, ou None."""
+        k = _posicao_no_csr(self._grafo, i, j)
+        if k is None:
+            k = _posicao_no_csr(self._grafo, j, i)
+        e = -1 if k is None else self._aresta_da_posicao[k]
+        if e < 0:
+            ids = self._grafo.ids
+            chave = (ids[i], ids[j]) if ids[i] <= ids[j] else (ids[j], ids[i])
+            e = self._fora_do_csr.get(chave, -1)
+        return None if e < 0 else self._aresta(e)
+
+    def __getitem__(self, chave):
+        indice = self._grafo.indice
+        i, j = indice.get(chave[0]), indice.get(chave[1])
+        if i is not None and j is not None and chave[0] <= chave[1]:
+            aresta = self.aresta_entre(i, j)
+        else:
+            e = self._fora_do_csr.get(chave)
+            aresta = None if e is None else self._aresta(e)
+        if aresta is None:
+            raise KeyError(chave)
+        return aresta
+
+    def __iter__(self):
+        for aresta in self._em_ordem():
+            cidade1_id, cidade2_id = aresta.cidades
+            yield (cidade1_id, cidade2_id) if cidade1_id <= cidade2_id else (cidade2_id, cidade1_id)
+
+    def __len__(self):
+        return self._quantidade
+
+    def _em_ordem(self):
+        """Arestas válidas na ordem do arquivo (a mesma do dicionário montado a partir do JSON)."""
+        for e, valida in enumerate(self._validas):
+            if valida:
+                yield self._aresta(e)
+
+    # Percorrer as arestas (estado_do_jogo faz isso a cada estado) não passa pela busca de cada chave
+    def values(self):
+        return _ValoresDasArestas(self)
+
+    def items(self):
+        return _ItensDasArestas(self)
+
+class _ValoresDasArestas(ValuesView):
+    def __iter__(self):
+        return self._mapping._em_ordem()
+
+class _ItensDasArestas(ItemsView):
+    def __iter__(self):
+        return zip(iter(self._mapping), self._mapping._em_ordem())
+
+class ArestasPorParCompiladas:
+    """Topologia.arestas_por_par (i * n + j -> Aresta) sobre ArestasCompiladas, guardando os pares já consultados."""
+    def __init__(self, arestas, n):
+        self._arestas = arestas
+        self._n = n
+        self._consultados = {}
+
+    def get(self, chave, padrao=None):
+        aresta = self._consultados.get(chave)
+        if aresta is None:
+            aresta = self._arestas.aresta_entre(*divmod(chave, self._n))
+            if aresta is None:
+                return padrao
+            self._consultados[chave] = aresta
+        return aresta
+
+class AdjacenciaCompilada(Mapping):
+    """Lista de adjacência de um mapa compilado, como Mapa.lista_adjacencia; cada linha é montada do CSR na primeira consulta."""
+    def __init__(self, compilado, grafo):
+        self._compilado = compilado
+        self._indice = grafo.indice
+        self._tem_linha = bytearray(len(grafo))
+        for i in compilado.ordem_adjacencia:
+            self._tem_linha[i] = 1
+        self._linhas = {}
+
+    def __getitem__(self, cidade_id):
+        linha = self._linhas.get(cidade_id)
+        if linha is None:
+            if cidade_id not in self:
+                raise KeyError(cidade_id)
+            i, compilado = self._indice[cidade_id], self._compilado
+            ids, vizinhos, pesos = compilado.ids, compilado.vizinhos, compilado.pesos
+            linha = self._linhas[cidade_id] = [(ids[vizinhos[k]], pesos[k])
+                                               for k in range(compilado.inicio[i], compilado.inicio[i + 1])]
+        return linha
+
+    def __contains__(self, cidade_id):
+        i = self._indice.get(cidade_id)
+        return i is not None and self._tem_linha[i] == 1
+
+    def __iter__(self):
+        ids = self._compilado.ids
+        return (ids[i] for i in self._compilado.ordem_adjacencia)
+
+    def __len__(self):
+        return len(self._compilado.ordem_adjacencia)
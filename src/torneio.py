@@ -0,0 +1,213 @@
+"""
+Torneio entre IAs: roda uma matriz de partidas (mapas x sementes x combinações de
+participantes x ordem dos assentos) em paralelo, em um pool de processos, e soma
+vitórias, empates e derrotas de cada participante.
+
+Cada partida roda em silêncio (sem eventos e sem arquivos de estado), em um diretório
+de trabalho próprio e com a sua semente. Com vários processos, cada mapa é lido uma vez
+só, pelo coordenador, e publicado em memória compartilhada (mapa_compartilhado.py);
+os processos do pool montam as partidas sobre ele, sem cópias próprias da topologia.
+
+Uso como ferramenta:
+    python src/torneio.py --mapas src/mapa_debug.json --bots ias.ia_perseus:Perseus ias.ia_perseus:Perseus \\
+                          --sementes 20 --turnos 100 --processos 4
+"""
+import argparse
+import contextlib
+import importlib
+import itertools
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import mapa_binario
+import mapa_compartilhado
+import sandbox
+from simulador import Simulador
+
+EMPATE = "EMPATE"
+
+Partida = namedtuple('Partida', ['indice', 'mapa', 'semente', 'assentos', 'turno_maximo'])
+Partida.__doc__ = "Uma partida da matriz. 'assentos' é a tupla de (nome, classe da IA), na ordem dos jogadores 0, 1, ..."
+
+ResultadoDaPartida = namedtuple('ResultadoDaPartida', ['indice', 'mapa', 'semente', 'nomes', 'vencedor', 'turnos',
+                                                       'duracao', 'erro'])
+ResultadoDaPartida.__doc__ = "'vencedor' é o nome do participante, EMPATE, ou None se a partida falhou (ver 'erro')."
+
+def numero_de_jogadores(caminho_mapa):
+    """Quantidade de jogadores para a qual o mapa foi gerado."""
+    if mapa_binario.eh_mapa_binario(caminho_mapa):
+        return mapa_binario.carregar(caminho_mapa).configs["num_jogadores"]
+    with open(caminho_mapa, 'r') as f:
+        return json.load(f)["configs"]["num_jogadores"]
+
+def montar_partidas(mapas, participantes, sementes, turno_maximo=100, rodizio=True):
+    """
+    Matriz de partidas. 'participantes' é uma lista de (nome, classe da IA). Em cada mapa,
+    cada combinação de participantes do tamanho do mapa joga com cada semente e, com
+    'rodizio', em cada rotação dos assentos (para que ninguém fique sempre com a mesma base).
+    """
+    partidas = []
+    for mapa in mapas:
+        mapa = os.path.abspath(mapa)
+        n = numero_de_jogadores(mapa)
+        if len(participantes) < n:
+            raise ValueError(f"O mapa '{mapa}' é para {n} jogadores, mas só há {len(participantes)} participantes.")
+        for grupo in itertools.combinations(participantes, n):
+            ordens = [grupo[k:] + grupo[:k] for k in range(n)] if rodizio else [grupo]
+            for semente in sementes:
+                for assentos in ordens:
+                    partidas.append(Partida(len(partidas), mapa, semente, tuple(assentos), turno_maximo))
+    return partidas
+
+# IAs aquecidas deste processo, mantidas entre as partidas que ele joga (ver sandbox.PoolDeIAs)
+_POOL_DE_IAS = None
+
+def _pool_de_ias():
+    global _POOL_DE_IAS
+    if _POOL_DE_IAS is None:
+        _POOL_DE_IAS = sandbox.PoolDeIAs()
+    return _POOL_DE_IAS
+
+def jogar_partida(partida, diretorio_base=None, ias_aquecidas=False):
+    """
+    Roda uma partida em silêncio, em um diretório de trabalho temporário, e devolve o ResultadoDaPartida.
+    Com 'ias_aquecidas', as IAs rodam em processos reaproveitados de uma partida para outra.
+    """
+    nomes = tuple(nome for nome, _ in partida.assentos)
+    diretorio_original = os.getcwd()
+    diretorio = tempfile.mkdtemp(prefix=f"partida_{partida.indice}_", dir=diretorio_base)
+    inicio = time.perf_counter()
+    try:
+        os.chdir(diretorio)
+        random.seed(partida.semente)
+        bots = {str(i): classe for i, (_, classe) in enumerate(partida.assentos)}
+        # As IAs podem imprimir o que quiserem; nada disso deve chegar ao console do torneio
+        with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo), contextlib.redirect_stderr(nulo):
+            simulador = Simulador(partida.mapa, bots, turno_maximo=partida.turno_maximo, salvar_estados=False,
+                                  pool_de_ias=_pool_de_ias() if ias_aquecidas else None)
+            simulador.run()
+        vencedor = simulador.jogo.verificar_vencedor()
+        vencedor = EMPATE if vencedor in (None, EMPATE) else nomes[int(vencedor)]
+        return ResultadoDaPartida(partida.indice, partida.mapa, partida.semente, nomes, vencedor,
+                                  simulador.jogo.turno_atual, time.perf_counter() - inicio, None)
+    except Exception as erro:
+        return ResultadoDaPartida(partida.indice, partida.mapa, partida.semente, nomes, None, None,
+                                  time.perf_counter() - inicio, f"{type(erro).__name__}: {erro}")
+    finally:
+        os.chdir(diretorio_original)
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+def rodar_torneio(partidas, processos=None, diretorio_base=None, compartilhar_mapas=True, ias_aquecidas=False):
+    """
+    Roda as partidas em um pool de processos (processos=1 roda tudo no processo atual).
+    Com 'compartilhar_mapas', os processos do pool usam os mapas em memória compartilhada;
+    com 'ias_aquecidas', cada um deles mantém as suas IAs vivas entre as partidas (ver jogar_partida).
+    Retorna (resultados na ordem das partidas, segundos de relógio).
+    """
+    inicio = time.perf_counter()
+    if processos == 1:
+        resultados = [jogar_partida(partida, diretorio_base, ias_aquecidas) for partida in partidas]
+        if ias_aquecidas:
+            _pool_de_ias().fechar()
+        return resultados, time.perf_counter() - inicio
+
+    trabalhadores = processos or os.cpu_count() or 1
+    publicados = []
+    try:
+        if compartilhar_mapas:
+            for mapa in dict.fromkeys(partida.mapa for partida in partidas):
+                publicados.append(mapa_compartilhado.publicar_mapa(mapa))
+        referencias = [publicado.referencia() for publicado in publicados]
+        with ProcessPoolExecutor(max_workers=trabalhadores, initializer=mapa_compartilhado.anexar_mapas,
+                                 initargs=(referencias,)) as executor:
+            # Lotes grandes o bastante para diluir o custo de enviar cada partida, pequenos o bastante para balancear
+            lote = max(1, len(partidas) // (trabalhadores * 8))
+            resultados = list(executor.map(jogar_partida, partidas, itertools.repeat(diretorio_base),
+                                           itertools.repeat(ias_aquecidas), chunksize=lote))
+    finally:
+        for publicado in publicados:
+            publicado.liberar()
+    return resultados, time.perf_counter() - inicio
+
+def classificacao(resultados):
+    """
+    Soma por participante: {nome: {"partidas", "vitorias", "empates", "derrotas", "erros", "turnos_medios"}},
+    do melhor para o pior (mais vitórias, depois mais empates).
+    """
+    tabela = {}
+    for resultado in resultados:
+        for nome in resultado.nomes:
+            linha = tabela.setdefault(nome, {"partidas": 0, "vitorias": 0, "empates": 0, "derrotas": 0, "erros": 0,
+                                             "turnos": 0})
+            linha["partidas"] += 1
+            if resultado.erro is not None:
+                linha["erros"] += 1
+                continue
+            linha["turnos"] += resultado.turnos
+            if resultado.vencedor == EMPATE:
+                linha["empates"] += 1
+            elif resultado.vencedor == nome:
+                linha["vitorias"] += 1
+            else:
+                linha["derrotas"] += 1
+    for linha in tabela.values():
+        validas = linha["partidas"] - linha["erros"]
+        turnos = linha.pop("turnos")
+        linha["turnos_medios"] = turnos / validas if validas else 0
+    return dict(sorted(tabela.items(), key=lambda item: (-item[1]["vitorias"], -item[1]["empates"], item[0])))
+
+def _carregar_classe(especificacao):
+    """'modulo:Classe' -> classe da IA."""
+    modulo, _, nome = especificacao.partition(":")
+    if not nome:
+        raise ValueError(f"Use o formato modulo:Classe para as IAs (recebido '{especificacao}').")
+    return getattr(importlib.import_module(modulo), nome)
+
+def _participantes(especificacoes):
+    """Nomeia as IAs pela classe, numerando as repetidas (Perseus, Perseus#2, ...)."""
+    participantes, vistos = [], {}
+    for especificacao in especificacoes:
+        classe = _carregar_classe(especificacao)
+        vistos[classe.__name__] = vistos.get(classe.__name__, 0) + 1
+        nome = classe.__name__ if vistos[classe.__name__] == 1 else f"{classe.__name__}#{vistos[classe.__name__]}"
+        participantes.append((nome, classe))
+    return participantes
+
+if __name__ == "__main__":
+    argumentos = argparse.ArgumentParser(description="Torneio entre IAs em paralelo.")
+    argumentos.add_argument("--mapas", nargs="+", required=True, help="Arquivos de mapa (JSON ou compilados).")
+    argumentos.add_argument("--bots", nargs="+", required=True, help="IAs no formato modulo:Classe.")
+    argumentos.add_argument("--sementes", type=int, default=10, help="Quantidade de sementes por combinação.")
+    argumentos.add_argument("--semente-inicial", type=int, default=0)
+    argumentos.add_argument("--turnos", type=int, default=100, help="Turno máximo de cada partida.")
+    argumentos.add_argument("--processos", type=int, default=None, help="Processos no pool (padrão: um por núcleo).")
+    argumentos.add_argument("--sem-rodizio", action="store_true", help="Não alterna a ordem dos assentos.")
+    argumentos.add_argument("--sem-memoria-compartilhada", action="store_true",
+                            help="Cada processo lê os mapas por conta própria.")
+    argumentos.add_argument("--ias-aquecidas", action="store_true",
+                            help="Mantém as IAs em processos reaproveitados entre as partidas (ver sandbox.PoolDeIAs).")
+    opcoes = argumentos.parse_args()
+
+    partidas = montar_partidas(opcoes.mapas, _participantes(opcoes.bots),
+                               range(opcoes.semente_inicial, opcoes.semente_inicial + opcoes.sementes),
+                               turno_maximo=opcoes.turnos, rodizio=not opcoes.sem_rodizio)
+    print(f"{len(partidas)} partidas, {opcoes.processos or os.cpu_count()} processos...")
+    resultados, duracao = rodar_torneio(partidas, opcoes.processos,
+                                        compartilhar_mapas=not opcoes.sem_memoria_compartilhada,
+                                        ias_aquecidas=opcoes.ias_aquecidas)
+
+    print(f"\n{'Participante':<20}{'Partidas':>9}{'V':>6}{'E':>6}{'D':>6}{'Erros':>7}{'Turnos':>8}")
+    for nome, linha in classificacao(resultados).items():
+        print(f"{nome:<20}{linha['partidas']:>9}{linha['vitorias']:>6}{linha['empates']:>6}{linha['derrotas']:>6}"
+              f"{linha['erros']:>7}{linha['turnos_medios']:>8.1f}")
+    for resultado in resultados:
+        if resultado.erro is not None:
+            print(f"Partida {resultado.indice} ({os.path.basename(resultado.mapa)}, semente {resultado.semente}) falhou: {resultado.erro}",
+                  file=sys.stderr)
+    print(f"\n{len(resultados)} partidas em {duracao:.1f}s: {len(resultados) / duracao:.1f} partidas/s")
@@ -0,0 +1,130 @@
+"""
+Equivalência de Jogo.snapshot/restore/fork e do ModeloDeAvanco com o jogo de verdade:
+uma partida com semente, em um mapa gerado, tira um instantâneo antes de cada turno e
+confere que todas as formas de voltar a ele (e de simular o turno a partir dele) dão o
+mesmo estado que a engine.
+
+Uso: python -m pytest tests  (ou python tests/test_instantaneo.py)
+"""
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import parser
+from engine import Jogo
+from gerador_tabuleiro import Grafo, exportar_mapa_para_json
+from modelo_de_avanco import ModeloDeAvanco
+from simulador import Simulador
+from ias.ia_perseus import Perseus
+
+TURNOS = 60
+
+class _Aleatoria:
+    """IA que sorteia tropas, ataques, recuos e missões de transporte, para passar por todas as regras."""
+    def __init__(self, jogador_id):
+        self.jogador_id = jogador_id
+        self.random = random.Random(jogador_id)
+        self.criadas = 0
+
+    def decidir_acoes(self, estado, mapa):
+        base = f"basej_{self.jogador_id}"
+        jogador = next(j for j in estado["jogadores"] if j["id"] == self.jogador_id)
+        populacao = {cidade["id"]: cidade["populacao"] for cidade in estado["mapa"]["cidades"]}
+        minhas = [cidade_id for cidade_id in jogador["cidades_possuidas"] if cidade_id != base]
+
+        def mais_fraca_perto(cidade_id):
+            return min(mapa.get_vizinhos(cidade_id), key=lambda vizinho: (populacao[vizinho], vizinho))
+
+        linhas = ["Novas Tropas:"]
+        if jogador["tropas_na_base"] > 80 and self.random.random() < 0.5:
+            self.criadas += 1
+            rotas = [f"{base} -> ataca {mais_fraca_perto(base)} -> permanece"]
+            if minhas:
+                cidade = self.random.choice(minhas)
+                rotas += [f"{base} -> {cidade} -> ataca {mais_fraca_perto(cidade)}",
+                          f"{base} -> {cidade} -> permanece", f"{base} -> {cidade} -> recua"]
+            forca = jogador["tropas_na_base"] - self.random.randint(0, 20)
+            linhas.append(f"{self.jogador_id}_{self.criadas} {forca}: {self.random.choice(rotas)}")
+        linhas += ["", "Transporte:"]
+        if self.random.random() < 0.4:
+            quantidade = self.random.choice(["MAX", "20"])
+            linhas.append(f"missao: COLETAR {quantidade} DE {self.random.choice(minhas or [base])}, "
+                          f"ENTREGAR EM {self.random.choice([base] + minhas)}")
+        return "\n".join(linhas) + "\n"
+
+def _estado(jogo):
+    return jogo.gerar_estado_json("", salvar_arquivo=False)
+
+def _jogar(diretorio, ao_iniciar_turno):
+    """
+    Joga uma partida com semente e chama ao_iniciar_turno(jogo, instantaneo, ordens)
+    antes de cada turno; o retorno é chamado com o jogo depois de processar o turno.
+    """
+    grafo = Grafo()
+    grafo.gerar_grafo(camadas=[6, 8, 6], seed=11, num_jogadores=3)
+    caminho = os.path.join(diretorio, "mapa.json")
+    with contextlib.redirect_stdout(io.StringIO()):  # O exportador avisa no console
+        exportar_mapa_para_json(grafo, caminho)
+
+    random.seed(3)
+    simulador = Simulador(caminho, {'0': _Aleatoria, '1': _Aleatoria, '2': Perseus}, turno_maximo=TURNOS,
+                          salvar_estados=False)
+    jogo = simulador.jogo
+    turnos = 0
+    with contextlib.redirect_stdout(io.StringIO()):  # As IAs falam no console
+        while jogo.turno_atual < TURNOS and not jogo.verificar_vencedor():
+            estado = jogo.estado_do_jogo()
+            ordens = {jogador_id: parser.parse_string_de_ordens(
+                          ia.decidir_acoes(estado, jogo.mapa_somente_leitura), simulador.eventos)
+                      for jogador_id, ia in simulador.ias.items() if jogador_id not in jogo.jogadores_derrotados}
+            depois_do_turno = ao_iniciar_turno(jogo, jogo.snapshot(), ordens)
+            jogo.aplicar_ordens(ordens)
+            jogo.processar_turno()
+            depois_do_turno(jogo)
+            turnos += 1
+    return turnos
+
+def test_restore_fork_e_outro_jogo_voltam_ao_estado_do_jogo():
+    outro = Jogo()
+    outro.salvar_estados = False
+
+    def conferir(jogo, instantaneo, ordens):
+        esperado = _estado(jogo)
+        assert _estado(jogo.fork()) == esperado
+        outro.restore(instantaneo)
+        assert _estado(outro) == esperado
+
+        # Restaurar no próprio jogo, depois de avançar um turno na cópia, também volta ao mesmo ponto
+        copia = jogo.fork()
+        copia.aplicar_ordens(ordens)
+        copia.processar_turno()
+        jogo.restore(copia.snapshot())
+        jogo.restore(instantaneo)
+        assert _estado(jogo) == esperado
+        return lambda jogo: None
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        assert _jogar(diretorio, conferir) > 10
+
+def test_modelo_de_avanco_simula_o_mesmo_turno_que_o_jogo():
+    modelo = ModeloDeAvanco(tipos=())
+
+    def conferir(jogo, instantaneo, ordens):
+        resultado = modelo.simular(instantaneo, ordens)
+
+        def depois_do_turno(jogo):
+            assert modelo.estado(resultado.instantaneo) == _estado(jogo), f"Divergiu no turno {jogo.turno_atual}."
+        return depois_do_turno
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        assert _jogar(diretorio, conferir) > 10
+
+if __name__ == "__main__":
+    test_restore_fork_e_outro_jogo_voltam_ao_estado_do_jogo()
+    test_modelo_de_avanco_simula_o_mesmo_turno_que_o_jogo()
+    print("ok")